@@ -0,0 +1,363 @@
+import grpc
+import logging
+import queue
+import random
+import threading
+import time
+import uuid
+import log
+import tracing
+from battleships_pb2 import Attack, Request, Response, Ship, Status
+from battleships_pb2_grpc import BattleshipsStub
+from client_interface import ClientInterface
+
+
+logger = logging.getLogger(__name__)
+logger.setLevel(log.level())
+
+
+class BattleshipClient(ClientInterface):
+    # The gRPC turn types mapped onto handler method names
+    RESPONSES = {
+        Response.State.BEGIN: 'begin',
+        Response.State.START_TURN: 'start_turn',
+        Response.State.STOP_TURN: 'end_turn',
+        Response.State.WIN: 'win',
+        Response.State.LOSE: 'lose',
+    }
+
+    # The gRPC report states mapped onto handler method names
+    STATES = {
+        Status.State.MISS: 'miss',
+        Status.State.HIT: 'hit',
+    }
+
+    # Attempts to join while the server is full, and the base and the
+    # maximum of the (exponential) delay between them in seconds
+    JOIN_ATTEMPTS = 5
+    JOIN_BACKOFF = 0.5
+    JOIN_BACKOFF_MAX = 8.0
+
+    # Trailing metadata in which a full server says when to join again
+    RETRY_AFTER_KEY = 'retry-after-ms'
+
+    __supported_events = [
+        'begin', 'start_turn', 'end_turn', 'attack',
+        'hit', 'miss', 'win', 'lose'
+    ]
+
+    def __init__(self, grpc_host='localhost', grpc_port='50051'):
+        self.__handlers = {}
+
+        self.__host = grpc_host
+        self.__port = grpc_port
+
+        self.__player_id = ''
+        self.__game_id = ''
+        self.__queue = queue.Queue()
+
+        # Has the fleet been submitted at join? Then the server resolves
+        # the attacks on it and the reports are not sent.
+        self.__submitted = False
+
+        # Loggers with the player ID as context; the records of every
+        # message sent and received are sampled
+        self.__log = log.ContextAdapter(logger)
+        self.__moves = self.__log
+
+        # Spans of the game, of joining it, of the last attack (until
+        # the report on it) and of the report on the last received attack
+        self.__span = tracing.NOOP_SPAN
+        self.__join_span = tracing.NOOP_SPAN
+        self.__attack_span = tracing.NOOP_SPAN
+        self.__report_span = tracing.NOOP_SPAN
+
+        self.__channel = grpc.insecure_channel(f'{self.__host}:{self.__port}')
+        self.__stub = BattleshipsStub(self.__channel)
+
+    def __del__(self):
+        if self.__channel is not None:
+            self.__channel.close()
+
+    def on(self, event=None):
+        """A decorator that is used to register an event handler for a
+        given event. This does the same as :meth:`add_event_handler`
+        but is intended for decorator usage:
+
+        @client.on(event='attack')
+        def on_attack(vector):
+            pass
+
+        :param event: The event that the handler should listen for. If
+                      this parameter is None, the event is inferred from
+                      the handler's name. For instance, to add a handler
+                      for `attack` messages, you can simply write:
+
+                      @client.on()
+                      def attack(vector):
+                          pass
+
+        Handlers that are supported are `begin`, `start_turn`,
+        `end_turn`, `attack`, `hit`, `miss`, `defeat`.
+        """
+
+        def decorator(f):
+            self.add_event_listener(event, f)
+            return f
+
+        return decorator
+
+    def add_event_listener(self, event=None, handler=None):
+        """Method that is used to register an event handler for a
+        given event. See :meth:`on` for a detailed explanation.
+
+        :param event: Event to register handler for
+        :param handler: Handler for event
+        """
+        if event is None:
+            event = handler.__name__
+
+        if event not in self.__supported_events:
+            raise ValueError(f'Unable to register event {event}!')
+
+        logger.info('Registering %s for event "%s"', handler.__name__, event)
+
+        self.__handlers[event] = handler
+
+    def join(self, fleet=None):
+        """This method sets up the client for sending and receiving gRPC
+        messages to the server. It then sends a join message to the game
+        server to indicate we are ready to play a new game.
+
+        If the fleet is submitted, the server resolves the attacks on it
+        itself, which saves a round trip to this client per attack. The
+        `attack` event is still raised, but :meth:`hit`, :meth:`miss`
+        and :meth:`defeat` no longer send anything.
+
+        :param fleet: List of ships as tuples of the vector of the
+                      ship's first cell (leftmost or topmost), its size
+                      and whether it is horizontal, e.g., ("B3", 4, True),
+                      or None to report on the attacks
+        """
+        self.__player_id = str(uuid.uuid4())
+        self.__game_id = ''
+        self.__submitted = bool(fleet)
+
+        self.__log = log.ContextAdapter(logger, player=self.__player_id)
+        self.__moves = self.__log.sampled()
+        self.__log.info('New player')
+
+        self.__span = tracing.tracer.start_span('client.game',
+                                                player=self.__player_id)
+        self.__join_span = tracing.tracer.start_span('client.join',
+                                                     self.__span)
+
+        # Everything's set up, so we can now join a game
+        ships = [Ship(vector=vector, size=size, horizontal=horizontal)
+                 for vector, size, horizontal in fleet or ()]
+        join = Request(join=Request.Player(id=self.__player_id, fleet=ships))
+        threading.Thread(target=self.__receive_responses, args=(join,),
+                         daemon=True).start()
+
+    @property
+    def game_id(self):
+        """Get the ID of the game this client plays, by which the game
+        can be watched.
+
+        :return: Game ID, or an empty string until the game has begun
+        """
+        return self.__game_id
+
+    def close(self):
+        """End the stream of outgoing messages. A client that has played
+        its game should be closed, so the threads serving its stream can
+        finish. The channel stays open, so the client can join another
+        game; it is closed when the client is deleted.
+        """
+        self.__queue.put(None)
+
+    def __send(self, msg):
+        """Convience method that places a message in the queue for
+        transmission to the game server.
+        """
+        self.__queue.put(msg)
+
+    def __report(self, state):
+        """Send a report on the last received attack, unless the server
+        resolves the attacks.
+
+        :param state: Status.State of the attack
+        """
+        if not self.__submitted:
+            self.__send(Request(report=Status(state=state)))
+
+    def attack(self, vector):
+        """This method sends an Attack message with the associated vector
+        to the game server. This method does not do any validation on the
+        provided vector, other than that is must be a string. It is up to
+        the caller to determine what the vector should look like.
+
+        :param vector: Vector to send to game server, e.g., "G4"
+        :raise ValueError: if vector is None or not a string
+        """
+        if vector is None or type(vector) is not str:
+            raise ValueError('Parameter vector must be a string!')
+
+        self.__attack_span = tracing.tracer.start_span(
+            'client.attack', self.__span, vector=vector)
+        self.__send(Request(move=Attack(vector=vector)))
+
+    def hit(self):
+        """This method indicates to the game server that the received
+        attack was a HIT. Oh no!
+        """
+        self.__report_span.finish(state='hit')
+        self.__report(Status.State.HIT)
+
+    def miss(self):
+        """This method indicates to the game server that the received
+        attack was a MISS. Phew!
+        """
+        self.__report_span.finish(state='miss')
+        self.__report(Status.State.MISS)
+
+    def defeat(self):
+        """This method indicates to the game serve that the received
+        attack was a HIT, which sunk the last of the remaining ships.
+        In other words: Game Over. Too bad.
+        """
+        self.__report_span.finish(state='defeat')
+        self.__report(Status.State.DEFEAT)
+
+    def __stream(self, requests):
+        """Return a generator of outgoing gRPC messages.
+
+        :param requests: Queue of the messages, ended by None
+        :return: a gRPC message generator
+        """
+        while True:
+            s = requests.get()
+            if s is not None:
+                self.__moves.info('Sending %s', s)
+                yield s
+            else:
+                return
+
+    def __receive_responses(self, join):
+        """Receive response from the gRPC in-channel. While the server
+        is full, the game is joined again after a delay.
+
+        :param join: Join message that starts the stream
+        """
+        # The trace context of the game goes to the server, so its spans
+        # end up in the same trace
+        metadata = None
+        if self.__span.context is not None:
+            metadata = [(tracing.METADATA_KEY, self.__span.context)]
+
+        received = False
+        for attempt in range(1, self.JOIN_ATTEMPTS + 1):
+            # Every attempt gets its own queue, so the stream of a
+            # rejected attempt cannot take messages of the next one
+            requests = queue.Queue()
+            requests.put(join)
+            self.__queue = requests
+
+            try:
+                responses = self.__stub.Game(self.__stream(requests),
+                                             metadata=metadata)
+                for response in responses:
+                    received = True
+                    self.__moves.info('Received %s', response)
+
+                    self.__handle_response(response)
+                break
+            except grpc.RpcError as e:
+                requests.put(None)
+                delay = None if received else self.__join_delay(e, attempt)
+                if delay is None:
+                    self.__log.error('RPC error: %s', e.code())
+                    break
+
+                self.__log.warning('Server is full, joining again in %.1f s',
+                                   delay)
+                time.sleep(delay)
+
+    def __join_delay(self, error, attempt):
+        """Get the delay before joining again after the server
+        rejected the stream.
+
+        The delay grows exponentially with the number of attempts and is
+        random (jitter), so rejected clients do not all come back at
+        once. It is at least what the server asked for.
+
+        :param error: gRPC error that ended the stream
+        :param attempt: Number of attempts so far
+        :return: Delay in seconds, or None if not joining again
+        """
+        if error.code() != grpc.StatusCode.RESOURCE_EXHAUSTED \
+                or attempt >= self.JOIN_ATTEMPTS:
+            return None
+
+        delay = random.uniform(0, min(self.JOIN_BACKOFF_MAX,
+                                      self.JOIN_BACKOFF * 2 ** (attempt - 1)))
+        for key, value in error.trailing_metadata() or ():
+            if key == self.RETRY_AFTER_KEY:
+                delay += int(value) / 1000
+        return delay
+
+    def __handle_response(self, msg):
+        """This method handles the actual response coming from the game
+        server.
+
+        :param msg: Message received from the game server
+        """
+        which = msg.WhichOneof('event')
+        if which == 'turn':
+            if msg.turn == Response.State.BEGIN:
+                self.__game_id = msg.game_id
+                self.__log.info('Game %s has begun', msg.game_id)
+
+            if msg.turn in self.RESPONSES:
+                self.__trace_turn(msg.turn)
+                self.__exc_callback(self.RESPONSES[msg.turn])
+            else:
+                self.__log.error('Response contains unknown state!')
+
+        elif which == 'move':
+            self.__report_span = tracing.tracer.start_span(
+                'client.report', self.__span, vector=msg.move.vector)
+            self.__exc_callback('attack', msg.move.vector)
+
+        elif which == 'report':
+            if msg.report.state in self.STATES:
+                self.__attack_span.finish(
+                    state=self.STATES[msg.report.state])
+                self.__exc_callback(self.STATES[msg.report.state])
+            else:
+                self.__log.error('Report contains unknown state!')
+
+        else:
+            self.__log.error('Got unknown response type!')
+
+    def __trace_turn(self, turn):
+        """Finish the spans that end with a change of turn.
+
+        :param turn: Turn state received from the game server
+        """
+        if turn == Response.State.BEGIN:
+            self.__join_span.finish()
+        elif turn == Response.State.WIN:
+            # The defeat of the opponent is the report on the last attack
+            self.__attack_span.finish(state='defeat')
+            self.__span.finish(result='win')
+        elif turn == Response.State.LOSE:
+            self.__span.finish(result='lose')
+
+    def __exc_callback(self, *args):
+        """Convenience method that calls the appropriate callback
+        function if it has been registered.
+        """
+        cmd = args[0]
+        if cmd in self.__handlers:
+            self.__handlers[cmd](*args[1:])
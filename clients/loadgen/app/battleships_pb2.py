@@ -0,0 +1,692 @@
+# -*- coding: utf-8 -*-
+# Generated by the protocol buffer compiler.  DO NOT EDIT!
+# source: battleships.proto
+"""Generated protocol buffer code."""
+from google.protobuf import descriptor as _descriptor
+from google.protobuf import message as _message
+from google.protobuf import reflection as _reflection
+from google.protobuf import symbol_database as _symbol_database
+# @@protoc_insertion_point(imports)
+
+_sym_db = _symbol_database.Default()
+
+
+
+
+DESCRIPTOR = _descriptor.FileDescriptor(
+  name='battleships.proto',
+  package='battleships',
+  syntax='proto3',
+  serialized_options=None,
+  create_key=_descriptor._internal_create_key,
+  serialized_pb=b'\n\x11\x62\x61ttleships.proto\x12\x0b\x62\x61ttleships\"\xc3\x01\n\x07Request\x12+\n\x04join\x18\x01 \x01(\x0b\x32\x1b.battleships.Request.PlayerH\x00\x12#\n\x04move\x18\x02 \x01(\x0b\x32\x13.battleships.AttackH\x00\x12%\n\x06report\x18\x03 \x01(\x0b\x32\x13.battleships.StatusH\x00\x1a\x36\n\x06Player\x12\n\n\x02id\x18\x01 \x01(\t\x12 \n\x05\x66leet\x18\x02 \x03(\x0b\x32\x11.battleships.ShipB\x07\n\x05\x65vent\"\xe3\x01\n\x08Response\x12+\n\x04turn\x18\x01 \x01(\x0e\x32\x1b.battleships.Response.StateH\x00\x12#\n\x04move\x18\x02 \x01(\x0b\x32\x13.battleships.AttackH\x00\x12%\n\x06report\x18\x03 \x01(\x0b\x32\x13.battleships.StatusH\x00\x12\x0f\n\x07game_id\x18\x04 \x01(\t\"D\n\x05State\x12\t\n\x05\x42\x45GIN\x10\x00\x12\x0e\n\nSTART_TURN\x10\x01\x12\r\n\tSTOP_TURN\x10\x02\x12\x07\n\x03WIN\x10\x03\x12\x08\n\x04LOSE\x10\x04\x42\x07\n\x05\x65vent\"8\n\x04Ship\x12\x0e\n\x06vector\x18\x01 \x01(\t\x12\x0c\n\x04size\x18\x02 \x01(\r\x12\x12\n\nhorizontal\x18\x03 \x01(\x08\"\x18\n\x06\x41ttack\x12\x0e\n\x06vector\x18\x01 \x01(\t\"Z\n\x06Status\x12(\n\x05state\x18\x01 \x01(\x0e\x32\x19.battleships.Status.State\"&\n\x05State\x12\x08\n\x04MISS\x10\x00\x12\x07\n\x03HIT\x10\x01\x12\n\n\x06\x44\x45\x46\x45\x41T\x10\x02\"\x1f\n\x0cWatchRequest\x12\x0f\n\x07game_id\x18\x01 \x01(\t\"\x85\x02\n\tGameEvent\x12\x10\n\x08sequence\x18\x01 \x01(\x04\x12)\n\x04type\x18\x02 \x01(\x0e\x32\x1b.battleships.GameEvent.Type\x12\x0e\n\x06player\x18\x03 \x01(\t\x12\x0e\n\x06vector\x18\x04 \x01(\t\x12(\n\x05state\x18\x05 \x01(\x0e\x32\x19.battleships.Status.State\x12 \n\x05shots\x18\x06 \x03(\x0b\x32\x11.battleships.Shot\"O\n\x04Type\x12\x0c\n\x08SNAPSHOT\x10\x00\x12\t\n\x05\x42\x45GIN\x10\x01\x12\n\n\x06\x41TTACK\x10\x02\x12\n\n\x06REPORT\x10\x03\x12\r\n\tSTOP_TURN\x10\x04\x12\x07\n\x03\x45ND\x10\x05\"P\n\x04Shot\x12\x0e\n\x06player\x18\x01 \x01(\t\x12\x0e\n\x06vector\x18\x02 \x01(\t\x12(\n\x05state\x18\x03 \x01(\x0e\x32\x19.battleships.Status.State2\x88\x01\n\x0b\x42\x61ttleships\x12\x39\n\x04Game\x12\x14.battleships.Request\x1a\x15.battleships.Response\"\x00(\x01\x30\x01\x12>\n\x05Watch\x12\x19.battleships.WatchRequest\x1a\x16.battleships.GameEvent\"\x00\x30\x01\x62\x06proto3'
+)
+
+
+
+_RESPONSE_STATE = _descriptor.EnumDescriptor(
+  name='State',
+  full_name='battleships.Response.State',
+  filename=None,
+  file=DESCRIPTOR,
+  create_key=_descriptor._internal_create_key,
+  values=[
+    _descriptor.EnumValueDescriptor(
+      name='BEGIN', index=0, number=0,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='START_TURN', index=1, number=1,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='STOP_TURN', index=2, number=2,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='WIN', index=3, number=3,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='LOSE', index=4, number=4,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+  ],
+  containing_type=None,
+  serialized_options=None,
+  serialized_start=383,
+  serialized_end=451,
+)
+_sym_db.RegisterEnumDescriptor(_RESPONSE_STATE)
+
+_STATUS_STATE = _descriptor.EnumDescriptor(
+  name='State',
+  full_name='battleships.Status.State',
+  filename=None,
+  file=DESCRIPTOR,
+  create_key=_descriptor._internal_create_key,
+  values=[
+    _descriptor.EnumValueDescriptor(
+      name='MISS', index=0, number=0,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='HIT', index=1, number=1,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='DEFEAT', index=2, number=2,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+  ],
+  containing_type=None,
+  serialized_options=None,
+  serialized_start=598,
+  serialized_end=636,
+)
+_sym_db.RegisterEnumDescriptor(_STATUS_STATE)
+
+_GAMEEVENT_TYPE = _descriptor.EnumDescriptor(
+  name='Type',
+  full_name='battleships.GameEvent.Type',
+  filename=None,
+  file=DESCRIPTOR,
+  create_key=_descriptor._internal_create_key,
+  values=[
+    _descriptor.EnumValueDescriptor(
+      name='SNAPSHOT', index=0, number=0,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='BEGIN', index=1, number=1,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='ATTACK', index=2, number=2,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='REPORT', index=3, number=3,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='STOP_TURN', index=4, number=4,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+    _descriptor.EnumValueDescriptor(
+      name='END', index=5, number=5,
+      serialized_options=None,
+      type=None,
+      create_key=_descriptor._internal_create_key),
+  ],
+  containing_type=None,
+  serialized_options=None,
+  serialized_start=854,
+  serialized_end=933,
+)
+_sym_db.RegisterEnumDescriptor(_GAMEEVENT_TYPE)
+
+
+_REQUEST_PLAYER = _descriptor.Descriptor(
+  name='Player',
+  full_name='battleships.Request.Player',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='id', full_name='battleships.Request.Player.id', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='fleet', full_name='battleships.Request.Player.fleet', index=1,
+      number=2, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=167,
+  serialized_end=221,
+)
+
+_REQUEST = _descriptor.Descriptor(
+  name='Request',
+  full_name='battleships.Request',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='join', full_name='battleships.Request.join', index=0,
+      number=1, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='move', full_name='battleships.Request.move', index=1,
+      number=2, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='report', full_name='battleships.Request.report', index=2,
+      number=3, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[_REQUEST_PLAYER, ],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+    _descriptor.OneofDescriptor(
+      name='event', full_name='battleships.Request.event',
+      index=0, containing_type=None,
+      create_key=_descriptor._internal_create_key,
+    fields=[]),
+  ],
+  serialized_start=35,
+  serialized_end=230,
+)
+
+
+_RESPONSE = _descriptor.Descriptor(
+  name='Response',
+  full_name='battleships.Response',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='turn', full_name='battleships.Response.turn', index=0,
+      number=1, type=14, cpp_type=8, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='move', full_name='battleships.Response.move', index=1,
+      number=2, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='report', full_name='battleships.Response.report', index=2,
+      number=3, type=11, cpp_type=10, label=1,
+      has_default_value=False, default_value=None,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='game_id', full_name='battleships.Response.game_id', index=3,
+      number=4, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+    _RESPONSE_STATE,
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+    _descriptor.OneofDescriptor(
+      name='event', full_name='battleships.Response.event',
+      index=0, containing_type=None,
+      create_key=_descriptor._internal_create_key,
+    fields=[]),
+  ],
+  serialized_start=233,
+  serialized_end=460,
+)
+
+
+_SHIP = _descriptor.Descriptor(
+  name='Ship',
+  full_name='battleships.Ship',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='vector', full_name='battleships.Ship.vector', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='size', full_name='battleships.Ship.size', index=1,
+      number=2, type=13, cpp_type=3, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='horizontal', full_name='battleships.Ship.horizontal', index=2,
+      number=3, type=8, cpp_type=7, label=1,
+      has_default_value=False, default_value=False,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=462,
+  serialized_end=518,
+)
+
+
+_ATTACK = _descriptor.Descriptor(
+  name='Attack',
+  full_name='battleships.Attack',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='vector', full_name='battleships.Attack.vector', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=520,
+  serialized_end=544,
+)
+
+
+_STATUS = _descriptor.Descriptor(
+  name='Status',
+  full_name='battleships.Status',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='state', full_name='battleships.Status.state', index=0,
+      number=1, type=14, cpp_type=8, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+    _STATUS_STATE,
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=546,
+  serialized_end=636,
+)
+
+
+_WATCHREQUEST = _descriptor.Descriptor(
+  name='WatchRequest',
+  full_name='battleships.WatchRequest',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='game_id', full_name='battleships.WatchRequest.game_id', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=638,
+  serialized_end=669,
+)
+
+
+_GAMEEVENT = _descriptor.Descriptor(
+  name='GameEvent',
+  full_name='battleships.GameEvent',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='sequence', full_name='battleships.GameEvent.sequence', index=0,
+      number=1, type=4, cpp_type=4, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='type', full_name='battleships.GameEvent.type', index=1,
+      number=2, type=14, cpp_type=8, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='player', full_name='battleships.GameEvent.player', index=2,
+      number=3, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='vector', full_name='battleships.GameEvent.vector', index=3,
+      number=4, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='state', full_name='battleships.GameEvent.state', index=4,
+      number=5, type=14, cpp_type=8, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='shots', full_name='battleships.GameEvent.shots', index=5,
+      number=6, type=11, cpp_type=10, label=3,
+      has_default_value=False, default_value=[],
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+    _GAMEEVENT_TYPE,
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=672,
+  serialized_end=933,
+)
+
+
+_SHOT = _descriptor.Descriptor(
+  name='Shot',
+  full_name='battleships.Shot',
+  filename=None,
+  file=DESCRIPTOR,
+  containing_type=None,
+  create_key=_descriptor._internal_create_key,
+  fields=[
+    _descriptor.FieldDescriptor(
+      name='player', full_name='battleships.Shot.player', index=0,
+      number=1, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='vector', full_name='battleships.Shot.vector', index=1,
+      number=2, type=9, cpp_type=9, label=1,
+      has_default_value=False, default_value=b"".decode('utf-8'),
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+    _descriptor.FieldDescriptor(
+      name='state', full_name='battleships.Shot.state', index=2,
+      number=3, type=14, cpp_type=8, label=1,
+      has_default_value=False, default_value=0,
+      message_type=None, enum_type=None, containing_type=None,
+      is_extension=False, extension_scope=None,
+      serialized_options=None, file=DESCRIPTOR,  create_key=_descriptor._internal_create_key),
+  ],
+  extensions=[
+  ],
+  nested_types=[],
+  enum_types=[
+  ],
+  serialized_options=None,
+  is_extendable=False,
+  syntax='proto3',
+  extension_ranges=[],
+  oneofs=[
+  ],
+  serialized_start=935,
+  serialized_end=1015,
+)
+
+_REQUEST_PLAYER.fields_by_name['fleet'].message_type = _SHIP
+_REQUEST_PLAYER.containing_type = _REQUEST
+_REQUEST.fields_by_name['join'].message_type = _REQUEST_PLAYER
+_REQUEST.fields_by_name['move'].message_type = _ATTACK
+_REQUEST.fields_by_name['report'].message_type = _STATUS
+_REQUEST.oneofs_by_name['event'].fields.append(
+  _REQUEST.fields_by_name['join'])
+_REQUEST.fields_by_name['join'].containing_oneof = _REQUEST.oneofs_by_name['event']
+_REQUEST.oneofs_by_name['event'].fields.append(
+  _REQUEST.fields_by_name['move'])
+_REQUEST.fields_by_name['move'].containing_oneof = _REQUEST.oneofs_by_name['event']
+_REQUEST.oneofs_by_name['event'].fields.append(
+  _REQUEST.fields_by_name['report'])
+_REQUEST.fields_by_name['report'].containing_oneof = _REQUEST.oneofs_by_name['event']
+_RESPONSE.fields_by_name['turn'].enum_type = _RESPONSE_STATE
+_RESPONSE.fields_by_name['move'].message_type = _ATTACK
+_RESPONSE.fields_by_name['report'].message_type = _STATUS
+_RESPONSE_STATE.containing_type = _RESPONSE
+_RESPONSE.oneofs_by_name['event'].fields.append(
+  _RESPONSE.fields_by_name['turn'])
+_RESPONSE.fields_by_name['turn'].containing_oneof = _RESPONSE.oneofs_by_name['event']
+_RESPONSE.oneofs_by_name['event'].fields.append(
+  _RESPONSE.fields_by_name['move'])
+_RESPONSE.fields_by_name['move'].containing_oneof = _RESPONSE.oneofs_by_name['event']
+_RESPONSE.oneofs_by_name['event'].fields.append(
+  _RESPONSE.fields_by_name['report'])
+_RESPONSE.fields_by_name['report'].containing_oneof = _RESPONSE.oneofs_by_name['event']
+_STATUS.fields_by_name['state'].enum_type = _STATUS_STATE
+_STATUS_STATE.containing_type = _STATUS
+_GAMEEVENT.fields_by_name['type'].enum_type = _GAMEEVENT_TYPE
+_GAMEEVENT.fields_by_name['state'].enum_type = _STATUS_STATE
+_GAMEEVENT.fields_by_name['shots'].message_type = _SHOT
+_GAMEEVENT_TYPE.containing_type = _GAMEEVENT
+_SHOT.fields_by_name['state'].enum_type = _STATUS_STATE
+DESCRIPTOR.message_types_by_name['Request'] = _REQUEST
+DESCRIPTOR.message_types_by_name['Response'] = _RESPONSE
+DESCRIPTOR.message_types_by_name['Ship'] = _SHIP
+DESCRIPTOR.message_types_by_name['Attack'] = _ATTACK
+DESCRIPTOR.message_types_by_name['Status'] = _STATUS
+DESCRIPTOR.message_types_by_name['WatchRequest'] = _WATCHREQUEST
+DESCRIPTOR.message_types_by_name['GameEvent'] = _GAMEEVENT
+DESCRIPTOR.message_types_by_name['Shot'] = _SHOT
+_sym_db.RegisterFileDescriptor(DESCRIPTOR)
+
+Request = _reflection.GeneratedProtocolMessageType('Request', (_message.Message,), {
+
+  'Player' : _reflection.GeneratedProtocolMessageType('Player', (_message.Message,), {
+    'DESCRIPTOR' : _REQUEST_PLAYER,
+    '__module__' : 'battleships_pb2'
+    # @@protoc_insertion_point(class_scope:battleships.Request.Player)
+    })
+  ,
+  'DESCRIPTOR' : _REQUEST,
+  '__module__' : 'battleships_pb2'
+  # @@protoc_insertion_point(class_scope:battleships.Request)
+  })
+_sym_db.RegisterMessage(Request)
+_sym_db.RegisterMessage(Request.Player)
+
+Response = _reflection.GeneratedProtocolMessageType('Response', (_message.Message,), {
+  'DESCRIPTOR' : _RESPONSE,
+  '__module__' : 'battleships_pb2'
+  # @@protoc_insertion_point(class_scope:battleships.Response)
+  })
+_sym_db.RegisterMessage(Response)
+
+Ship = _reflection.GeneratedProtocolMessageType('Ship', (_message.Message,), {
+  'DESCRIPTOR' : _SHIP,
+  '__module__' : 'battleships_pb2'
+  # @@protoc_insertion_point(class_scope:battleships.Ship)
+  })
+_sym_db.RegisterMessage(Ship)
+
+Attack = _reflection.GeneratedProtocolMessageType('Attack', (_message.Message,), {
+  'DESCRIPTOR' : _ATTACK,
+  '__module__' : 'battleships_pb2'
+  # @@protoc_insertion_point(class_scope:battleships.Attack)
+  })
+_sym_db.RegisterMessage(Attack)
+
+Status = _reflection.GeneratedProtocolMessageType('Status', (_message.Message,), {
+  'DESCRIPTOR' : _STATUS,
+  '__module__' : 'battleships_pb2'
+  # @@protoc_insertion_point(class_scope:battleships.Status)
+  })
+_sym_db.RegisterMessage(Status)
+
+WatchRequest = _reflection.GeneratedProtocolMessageType('WatchRequest', (_message.Message,), {
+  'DESCRIPTOR' : _WATCHREQUEST,
+  '__module__' : 'battleships_pb2'
+  # @@protoc_insertion_point(class_scope:battleships.WatchRequest)
+  })
+_sym_db.RegisterMessage(WatchRequest)
+
+GameEvent = _reflection.GeneratedProtocolMessageType('GameEvent', (_message.Message,), {
+  'DESCRIPTOR' : _GAMEEVENT,
+  '__module__' : 'battleships_pb2'
+  # @@protoc_insertion_point(class_scope:battleships.GameEvent)
+  })
+_sym_db.RegisterMessage(GameEvent)
+
+Shot = _reflection.GeneratedProtocolMessageType('Shot', (_message.Message,), {
+  'DESCRIPTOR' : _SHOT,
+  '__module__' : 'battleships_pb2'
+  # @@protoc_insertion_point(class_scope:battleships.Shot)
+  })
+_sym_db.RegisterMessage(Shot)
+
+
+
+_BATTLESHIPS = _descriptor.ServiceDescriptor(
+  name='Battleships',
+  full_name='battleships.Battleships',
+  file=DESCRIPTOR,
+  index=0,
+  serialized_options=None,
+  create_key=_descriptor._internal_create_key,
+  serialized_start=1018,
+  serialized_end=1154,
+  methods=[
+  _descriptor.MethodDescriptor(
+    name='Game',
+    full_name='battleships.Battleships.Game',
+    index=0,
+    containing_service=None,
+    input_type=_REQUEST,
+    output_type=_RESPONSE,
+    serialized_options=None,
+    create_key=_descriptor._internal_create_key,
+  ),
+  _descriptor.MethodDescriptor(
+    name='Watch',
+    full_name='battleships.Battleships.Watch',
+    index=1,
+    containing_service=None,
+    input_type=_WATCHREQUEST,
+    output_type=_GAMEEVENT,
+    serialized_options=None,
+    create_key=_descriptor._internal_create_key,
+  ),
+])
+_sym_db.RegisterServiceDescriptor(_BATTLESHIPS)
+
+DESCRIPTOR.services_by_name['Battleships'] = _BATTLESHIPS
+
+# @@protoc_insertion_point(module_scope)
@@ -0,0 +1,308 @@
+import logging
+import random
+import threading
+import time
+from battleship_client import BattleshipClient
+import log
+
+logger = log.get_logger(__name__)
+logger.setLevel(logging.INFO)
+
+# Board dimensions and the sizes of the ships of a bot's fleet
+COLUMNS = 'abcdefghij'
+ROWS = 10
+FLEET = (5, 4, 3, 3, 3, 3, 2, 2, 1, 1)
+
+# All cells of the board as attack vectors, e.g., "a1" or "j10"
+CELLS = [f'{c}{r}' for c in COLUMNS for r in range(1, ROWS + 1)]
+
+
+def place_fleet(rng=random):
+    """Place the ships of a fleet at random, in straight lines on the
+    board and without overlap.
+
+    :param rng: Random number generator to use
+    :return: Tuple of the fleet, as a list of (vector, size, horizontal)
+             tuples, and the set of cells the ships occupy
+    """
+    fleet = []
+    occupied = set()
+    for size in FLEET:
+        while True:
+            horizontal = rng.random() < 0.5
+            if horizontal:
+                column = rng.randrange(len(COLUMNS) - size + 1)
+                row = rng.randrange(ROWS)
+                cells = {f'{COLUMNS[column + i]}{row + 1}'
+                         for i in range(size)}
+            else:
+                column = rng.randrange(len(COLUMNS))
+                row = rng.randrange(ROWS - size + 1)
+                cells = {f'{COLUMNS[column]}{row + i + 1}'
+                         for i in range(size)}
+            if not cells & occupied:
+                break
+
+        fleet.append((f'{COLUMNS[column]}{row + 1}', size, horizontal))
+        occupied |= cells
+    return fleet, occupied
+
+
+def percentile(samples, p):
+    """Get a percentile of a list of samples (nearest rank).
+
+    :param samples: Sorted list of samples
+    :param p: Percentile, between 0 and 100
+    :return: Sample at the percentile, or None if there are no samples
+    """
+    if not samples:
+        return None
+    rank = max(1, round(p / 100 * len(samples)))
+    return samples[min(rank, len(samples)) - 1]
+
+
+class Stats:
+    """Thread-safe collection of the measurements of a load run.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.games = 0
+        self.moves = 0
+        self.failures = 0
+        self.unmatched = 0
+        self.finished_at = None
+        self.join_latencies = []
+        self.attack_latencies = []
+
+    def game_won(self):
+        """Count a finished game. Only the winner counts the game, so
+        every game is counted once.
+        """
+        with self.__lock:
+            self.games += 1
+            self.finished_at = time.perf_counter()
+
+    def game_failed(self, began):
+        """Count a bot that did not finish its game in time.
+
+        :param began: True if the game had begun, False if the bot was
+                      never matched with an opponent
+        """
+        with self.__lock:
+            if began:
+                self.failures += 1
+            else:
+                self.unmatched += 1
+
+    def joined(self, seconds):
+        """Record the time between joining and the start of a game.
+
+        :param seconds: Latency from join to BEGIN
+        """
+        with self.__lock:
+            self.join_latencies.append(seconds)
+
+    def attacked(self, seconds):
+        """Record the time between an attack and the report on it.
+
+        :param seconds: Latency from attack to report
+        """
+        with self.__lock:
+            self.moves += 1
+            self.attack_latencies.append(seconds)
+
+    def report(self, elapsed):
+        """Summarize the measurements.
+
+        :param elapsed: Duration of the run in seconds
+        :return: Dictionary with throughput and latency percentiles (ms)
+        """
+        with self.__lock:
+            summary = {
+                'games': self.games,
+                'moves': self.moves,
+                'failures': self.failures,
+                'unmatched': self.unmatched,
+                'seconds': elapsed,
+                'games_per_sec': self.games / elapsed if elapsed else 0,
+                'moves_per_sec': self.moves / elapsed if elapsed else 0,
+            }
+            for name, samples in (('join', self.join_latencies),
+                                  ('attack', self.attack_latencies)):
+                samples = sorted(samples)
+                for p in (50, 95, 99):
+                    value = percentile(samples, p)
+                    summary[f'{name}_p{p}_ms'] = None if value is None \
+                        else value * 1000
+        return summary
+
+
+class Bot:
+    """A headless player that plays a single game against another bot.
+
+    Its ships are placed at random. When it is its turn, it attacks a
+    random cell that it has not attacked yet; when attacked, it reports
+    a hit, a miss or its defeat, unless it has submitted its fleet to
+    the server, which then resolves the attacks itself.
+    """
+
+    def __init__(self, grpc_host, grpc_port, stats, rng=random,
+                 submit_fleet=False):
+        self.__stats = stats
+        self.__fleet, self.__ships = place_fleet(rng)
+        self.__submit_fleet = submit_fleet
+        self.__targets = rng.sample(CELLS, len(CELLS))
+        self.__joined_at = None
+        self.__began = False
+        self.__attacked_at = None
+        self.__done = threading.Event()
+
+        self.__client = BattleshipClient(grpc_host=grpc_host,
+                                         grpc_port=grpc_port)
+        self.__client.add_event_listener('begin', self.__begin)
+        self.__client.add_event_listener('start_turn', self.__start_turn)
+        self.__client.add_event_listener('attack', self.__attack)
+        self.__client.add_event_listener('hit', self.__hit)
+        self.__client.add_event_listener('miss', self.__miss)
+        self.__client.add_event_listener('win', self.__win)
+        self.__client.add_event_listener('lose', self.__lose)
+
+    def play(self, timeout):
+        """Join a game and wait until it has been played.
+
+        :param timeout: Maximum number of seconds to wait for the game
+        :return: True if the game finished, False otherwise
+        """
+        self.__joined_at = time.perf_counter()
+        self.__client.join(self.__fleet if self.__submit_fleet else None)
+        finished = self.__done.wait(timeout)
+        self.__client.close()
+        if not finished:
+            self.__stats.game_failed(self.__began)
+        return finished
+
+    def __begin(self):
+        self.__began = True
+        self.__stats.joined(time.perf_counter() - self.__joined_at)
+
+    def __start_turn(self):
+        vector = self.__targets.pop()
+        self.__attacked_at = time.perf_counter()
+        self.__client.attack(vector)
+
+    def __reported(self):
+        self.__stats.attacked(time.perf_counter() - self.__attacked_at)
+
+    def __hit(self):
+        self.__reported()
+
+    def __miss(self):
+        self.__reported()
+
+    def __attack(self, vector):
+        if vector not in self.__ships:
+            self.__client.miss()
+            return
+
+        self.__ships.remove(vector)
+        if self.__ships:
+            self.__client.hit()
+        else:
+            self.__client.defeat()
+
+    def __win(self):
+        # The defeat of the opponent is the report on the last attack
+        self.__reported()
+        self.__stats.game_won()
+        self.__done.set()
+
+    def __lose(self):
+        self.__done.set()
+
+
+class LoadGenerator:
+    """Play many concurrent bot-vs-bot games against Battleship servers.
+
+    Each of the 2 * concurrency player slots keeps joining games until
+    the requested number of games has been played. The servers pair the
+    bots up, so concurrency games are in progress at any time. Bots are
+    spread over the servers round-robin, so with more than one server
+    most games are played between servers.
+
+    Two players that join at the same moment may both create a game.
+    Near the end of a run, no other bot may come along to join them;
+    such bots are reported as unmatched rather than failed.
+    """
+
+    def __init__(self, servers, games, concurrency, timeout=60, seed=None,
+                 submit_fleet=False):
+        """Create a LoadGenerator.
+
+        :param servers: List of (host, port) tuples of game servers
+        :param games: Number of games to play
+        :param concurrency: Number of games to play at the same time
+        :param timeout: Maximum number of seconds a single game may take
+        :param seed: Seed for the random boards and moves
+        :param submit_fleet: True to let the servers resolve the attacks
+        """
+        self.__servers = servers
+        self.__games = games
+        self.__concurrency = concurrency
+        self.__timeout = timeout
+        self.__submit_fleet = submit_fleet
+        self.__rng = random.Random(seed)
+        self.__lock = threading.Lock()
+        self.__started = 0
+        self.stats = Stats()
+
+    def run(self):
+        """Play the games and wait until all of them are finished.
+
+        :return: Report as returned by :meth:`Stats.report`
+        """
+        logger.info(f'Playing {self.__games} games, {self.__concurrency} '
+                    f'at a time, on {len(self.__servers)} server(s)')
+
+        start = time.perf_counter()
+        threads = [
+            threading.Thread(target=self.__play, args=(i,), daemon=True)
+            for i in range(2 * self.__concurrency)
+        ]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+        # Bots that were left without an opponent wait until they time
+        # out, which does not count towards the duration of the run
+        end = self.stats.finished_at or time.perf_counter()
+        return self.stats.report(end - start)
+
+    def __next_game(self):
+        """Claim a player slot in one of the remaining games.
+
+        :return: True if there is a game left to play, False otherwise
+        """
+        with self.__lock:
+            if self.__started >= 2 * self.__games:
+                return False
+            self.__started += 1
+            return True
+
+    def __play(self, slot):
+        """Keep playing games from a player slot until all games have
+        been played.
+
+        :param slot: Number of the slot, used to pick a server
+        """
+        host, port = self.__servers[slot % len(self.__servers)]
+        while self.__next_game():
+            with self.__lock:
+                rng = random.Random(self.__rng.random())
+            try:
+                Bot(host, port, self.stats, rng,
+                    self.__submit_fleet).play(self.__timeout)
+            except Exception:
+                logger.exception('Bot failed')
+                self.stats.game_failed(True)
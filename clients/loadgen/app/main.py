@@ -0,0 +1,78 @@
+import argparse
+import json
+import logging
+import os
+import tracing
+from loadgen import LoadGenerator
+
+
+def parse_servers(s):
+    """Parse a comma separated list of game servers.
+
+    :param s: String like "localhost:50051,localhost:50052"
+    :return: List of (host, port) tuples
+    """
+    servers = []
+    for server in s.split(','):
+        host, _, port = server.strip().rpartition(':')
+        servers.append((host or 'localhost', port))
+    return servers
+
+
+def main():
+    grpc_host = os.getenv('GRPC_HOST', 'localhost')
+    grpc_port = os.getenv('GRPC_PORT', '50051')
+
+    parser = argparse.ArgumentParser(
+        description='Play concurrent bot-vs-bot games against Battleship '
+                    'servers and report throughput and latencies.')
+    parser.add_argument('--servers',
+                        default=os.getenv('GRPC_SERVERS',
+                                          f'{grpc_host}:{grpc_port}'),
+                        help='comma separated host:port list of servers')
+    parser.add_argument('--games', type=int, default=100,
+                        help='number of games to play')
+    parser.add_argument('--concurrency', type=int, default=10,
+                        help='number of games to play at the same time')
+    parser.add_argument('--timeout', type=float, default=60,
+                        help='maximum number of seconds per game')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for the random boards and moves')
+    parser.add_argument('--submit-fleet', action='store_true',
+                        help='submit the fleets at join, so the servers '
+                             'resolve the attacks')
+    parser.add_argument('--json', action='store_true',
+                        help='print the report as JSON')
+    args = parser.parse_args()
+
+    tracing.configure_from_env()
+
+    # Bots do not show what they send and receive, so unless asked for,
+    # the client does not even create those records
+    if 'LOG_LEVEL' not in os.environ:
+        logging.getLogger('battleship_client').setLevel(logging.WARNING)
+
+    generator = LoadGenerator(parse_servers(args.servers), args.games,
+                              args.concurrency, args.timeout, args.seed,
+                              args.submit_fleet)
+    report = generator.run()
+
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    print(f'Games:    {report["games"]} in {report["seconds"]:.1f} s '
+          f'({report["games_per_sec"]:.1f}/s), '
+          f'{report["failures"]} failed, {report["unmatched"]} unmatched')
+    print(f'Moves:    {report["moves"]} ({report["moves_per_sec"]:.1f}/s)')
+    for name, title in (('join', 'Join to BEGIN'),
+                        ('attack', 'Attack to report')):
+        latencies = ', '.join(
+            f'p{p} ' + ('-' if report[f'{name}_p{p}_ms'] is None
+                        else f'{report[f"{name}_p{p}_ms"]:.1f} ms')
+            for p in (50, 95, 99))
+        print(f'{title}: {latencies}')
+
+
+if __name__ == '__main__':
+    main()
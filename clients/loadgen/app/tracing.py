@@ -0,0 +1,240 @@
+import json
+import os
+import threading
+import time
+import uuid
+import log
+
+logger = log.get_logger(__name__)
+
+# Key of the gRPC metadata that carries the trace context
+METADATA_KEY = 'traceparent'
+
+# Exporters that can be selected with TRACE_EXPORTER
+FILE = 'file'
+MEMORY = 'memory'
+
+# File the spans are written to by the file exporter
+TRACE_FILE = 'spans.jsonl'
+
+
+def parse(traceparent):
+    """Parse a trace context in the W3C traceparent format, e.g.,
+    00-<32 hex digits trace ID>-<16 hex digits span ID>-01.
+
+    :param traceparent: Trace context, or None
+    :return: Tuple of trace ID and span ID, or None if not valid
+    """
+    if not traceparent:
+        return None
+    parts = traceparent.split('-')
+    if len(parts) != 4 or len(parts[1]) != 32 or len(parts[2]) != 16:
+        return None
+    return parts[1], parts[2]
+
+
+def from_metadata(context):
+    """Get the trace context from the metadata of a gRPC call.
+
+    :param context: gRPC context object
+    :return: Trace context, or None if the caller did not send one
+    """
+    metadata = getattr(context, 'invocation_metadata', None)
+    if metadata is None:
+        return None
+    for key, value in metadata() or ():
+        if key == METADATA_KEY:
+            return value
+    return None
+
+
+class Span:
+    """A timed step (hop) in the handling of a game or move.
+
+    Spans of the same trace share the trace ID; a span refers to the
+    span that caused it by its parent ID. The start and end of a span
+    are wall clock timestamps, so spans from different processes can be
+    lined up.
+    """
+    __slots__ = ('trace_id', 'span_id', 'parent_id', 'name', 'start', 'end',
+                 'attributes', '_exporter')
+
+    def __init__(self, exporter, name, trace_id, parent_id=None, start=None,
+                 attributes=None):
+        self._exporter = exporter
+        self.trace_id = trace_id
+        self.span_id = uuid.uuid4().hex[:16]
+        self.parent_id = parent_id
+        self.name = name
+        self.start = time.time() if start is None else start
+        self.end = None
+        self.attributes = attributes or {}
+
+    @property
+    def context(self):
+        """The trace context of this span, to be passed on to the hops
+        that it causes.
+        """
+        return f'00-{self.trace_id}-{self.span_id}-01'
+
+    def finish(self, **attributes):
+        """End the span and hand it to the exporter. Ending a span more
+        than once has no effect.
+
+        :param attributes: Attributes to add to the span
+        """
+        if self.end is not None:
+            return
+        self.end = time.time()
+        self.attributes.update(attributes)
+        try:
+            self._exporter.export(self)
+        except Exception:
+            logger.exception('Unable to export span %s', self.name)
+
+    def to_dict(self):
+        """Get the span as a dictionary, e.g., for JSON encoding.
+
+        :return: Dictionary describing the span
+        """
+        return {
+            'trace_id': self.trace_id,
+            'span_id': self.span_id,
+            'parent_id': self.parent_id,
+            'name': self.name,
+            'start': self.start,
+            'end': self.end,
+            'duration_ms': (self.end - self.start) * 1000,
+            'attributes': self.attributes,
+        }
+
+
+class _NoopSpan:
+    """The span that is used while tracing is off. It has no context,
+    so nothing is propagated either.
+    """
+    context = None
+
+    def finish(self, **attributes):
+        pass
+
+
+NOOP_SPAN = _NoopSpan()
+
+
+class InMemoryExporter:
+    """Keep finished spans in a list, e.g., for tests.
+    """
+
+    def __init__(self):
+        self.__lock = threading.Lock()
+        self.__spans = []
+
+    def export(self, span):
+        with self.__lock:
+            self.__spans.append(span)
+
+    @property
+    def spans(self):
+        """Copy of the list of finished spans.
+        """
+        with self.__lock:
+            return list(self.__spans)
+
+    def clear(self):
+        with self.__lock:
+            self.__spans.clear()
+
+
+class FileExporter:
+    """Append finished spans to a file, one JSON object per line.
+    """
+
+    def __init__(self, path=TRACE_FILE):
+        self.__lock = threading.Lock()
+        self.__file = open(path, 'a', encoding='utf-8')
+
+    def export(self, span):
+        line = json.dumps(span.to_dict()) + '\n'
+        with self.__lock:
+            self.__file.write(line)
+            self.__file.flush()
+
+    def close(self):
+        with self.__lock:
+            self.__file.close()
+
+
+class Tracer:
+    """Create spans and hand them to an exporter once they finish. A
+    tracer without an exporter creates no spans at all.
+    """
+
+    def __init__(self, exporter=None):
+        self.exporter = exporter
+
+    @property
+    def enabled(self):
+        return self.exporter is not None
+
+    def start_span(self, name, parent=None, start=None, **attributes):
+        """Start a span.
+
+        :param name: Name of the hop, e.g., "grpc.move"
+        :param parent: Span or trace context of the hop that caused this
+                       one, or None to start a new trace
+        :param start: Timestamp at which the span started, if not now
+        :param attributes: Attributes of the span
+        :return: Span, which must be finished by the caller
+        """
+        if self.exporter is None:
+            return NOOP_SPAN
+
+        if isinstance(parent, str):
+            parent = parse(parent)
+        elif parent is not None and parent.context is not None:
+            parent = parent.trace_id, parent.span_id
+        else:
+            parent = None
+
+        if parent is None:
+            trace_id, parent_id = uuid.uuid4().hex, None
+        else:
+            trace_id, parent_id = parent
+
+        return Span(self.exporter, name, trace_id, parent_id, start,
+                    attributes)
+
+
+# Tracer of this process, see configure()
+tracer = Tracer()
+
+
+def configure(exporter=None):
+    """Set the exporter of the tracer of this process.
+
+    :param exporter: Exporter, or None to turn tracing off
+    :return: The exporter
+    """
+    tracer.exporter = exporter
+    return exporter
+
+
+def configure_from_env():
+    """Set the exporter of the tracer of this process from the
+    environment variables TRACE_EXPORTER (file or memory) and
+    TRACE_FILE.
+
+    :return: The exporter, or None if tracing is off
+    :raise ValueError: if the exporter is unknown
+    """
+    name = os.getenv('TRACE_EXPORTER', '')
+    if not name:
+        return configure(None)
+    if name == FILE:
+        path = os.getenv('TRACE_FILE', TRACE_FILE)
+        logger.info('Writing spans to %s', path)
+        return configure(FileExporter(path))
+    if name == MEMORY:
+        return configure(InMemoryExporter())
+    raise ValueError(f'Unknown trace exporter {name}')
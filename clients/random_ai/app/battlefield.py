@@ -1,10 +1,27 @@
 import logging
-import random
 from colored import fg, attr
+from fleet import FleetGenerator
 
 logger = logging.getLogger(name=__name__)
 logger.setLevel(logging.INFO)
 
+# Columns of the cells in a row, by the mask of the row and the number
+# of columns, see BitboardBattlefield.cells
+_ROW_CELLS = {}
+
+
+def _row_cells(columns):
+    """
+    Get the table of the columns of the cells in the mask of a row,
+    for rows of {columns} cells.
+    """
+    table = _ROW_CELLS.get(columns)
+    if table is None:
+        table = [tuple(col for col in range(columns) if bits >> col & 1)
+                 for bits in range(1 << columns)]
+        _ROW_CELLS[columns] = table
+    return table
+
 
 class Battlefield:
     STANDARD_X = 10
@@ -148,6 +165,201 @@ class Battlefield:
         return s % (fg(self.__colour), attr(0))
 
 
+class BitboardBattlefield:
+    """
+    A Battlefield that keeps the grid in integer bitmasks instead of
+    a list of lists: one mask per value on the grid (the type of a
+    ship, or a state like a hit or a miss) and one of all occupied
+    cells. Cell (column, row) is bit {row * columns + column}.
+
+    It has the same API as Battlefield, but placing a ship, checking
+    for overlap, checking whether all ships are sunk and enumerating
+    the empty cells are a few bitwise operations instead of a walk
+    over the cells.
+    """
+    STANDARD_X = Battlefield.STANDARD_X
+    STANDARD_Y = Battlefield.STANDARD_Y
+
+    # Values that mark a cell that was attacked rather than a ship
+    HIT = 'X'
+    MISS = '\u25CB'
+
+    from_coords = staticmethod(Battlefield.from_coords)
+    to_coords = staticmethod(Battlefield.to_coords)
+
+    def __init__(self, columns=STANDARD_X, rows=STANDARD_Y, colour=193):
+        self.__columns = columns
+        self.__rows = rows
+
+        # Colour that the grid will be printed in
+        self.__colour = colour
+
+        # Masks of a vertical and a horizontal ship of each size, placed
+        # at the first cell
+        self.__lines = (
+            [sum(1 << (i * columns) for i in range(size))
+             for size in range(rows + 1)],
+            [(1 << size) - 1 for size in range(columns + 1)],
+        )
+
+        self.__masks = {}
+        self.__occupied = 0
+        self.__full = (1 << (columns * rows)) - 1
+
+    def clear(self):
+        """
+        Clear the data of the battlefield.
+        """
+        self.__masks = {}
+        self.__occupied = 0
+
+    def get(self, x, y):
+        """
+        Get the contents of the grid element at ({x}, {y})
+        """
+        return self.get_by_col_row(*self.from_coords(x, y))
+
+    def get_by_col_row(self, col, row):
+        """
+        Get element from grid using normal column/row indexes
+        """
+        bit = 1 << (row * self.__columns + col)
+        if self.__occupied & bit:
+            for val, mask in self.__masks.items():
+                if mask & bit:
+                    return val
+        return None
+
+    def set(self, x, y, val):
+        """
+        Set the contents of the grid element at ({x}, {y})
+        to the value {val}.
+        """
+        self.set_by_col_row(*self.from_coords(x, y), val)
+
+    def set_by_col_row(self, col, row, val):
+        """
+        Set the contents of the grid element at (col, row)
+        to the value {val}.
+        """
+        bit = 1 << (row * self.__columns + col)
+        if self.__occupied & bit:
+            for key, mask in self.__masks.items():
+                if mask & bit:
+                    self.__masks[key] = mask & ~bit
+                    break
+            self.__occupied &= ~bit
+
+        if val is not None:
+            self.__masks[val] = self.__masks.get(val, 0) | bit
+            self.__occupied |= bit
+
+    def mask(self, val):
+        """
+        Get the cells that hold the value {val} as a bitmask.
+        """
+        return self.__masks.get(val, 0)
+
+    @property
+    def occupied(self):
+        """
+        Bitmask of the cells that hold any value.
+        """
+        return self.__occupied
+
+    @property
+    def ships(self):
+        """
+        Bitmask of the cells that hold a ship that has not been hit.
+        """
+        return self.__occupied & ~(self.mask(self.HIT) | self.mask(self.MISS))
+
+    @property
+    def all_sunk(self):
+        """
+        Have all cells of all ships been hit?
+        """
+        return self.ships == 0
+
+    def empty_cells(self):
+        """
+        Get the (column, row) indexes of the cells that hold nothing,
+        e.g., the cells of the opponent that have not been attacked.
+        """
+        return self.cells(self.__full & ~self.__occupied)
+
+    def cells(self, mask):
+        """
+        Get the (column, row) indexes of the cells in the bitmask
+        {mask}, in order of their bit.
+        """
+        columns = self.__columns
+        row_mask = (1 << columns) - 1
+        table = _row_cells(columns)
+        cells = []
+        while mask:
+            # Skip to the row of the lowest cell, then take all of its
+            # cells at once
+            row = ((mask & -mask).bit_length() - 1) // columns
+            shift = row * columns
+            for col in table[mask >> shift & row_mask]:
+                cells.append((col, row))
+            mask &= ~(row_mask << shift)
+        return cells
+
+    def place_ship(self, ship_type, x, y, size, horizontal=True):
+        """
+        Place a ship on the provided coordinates. The X
+        coordinate is a letter (A, B, C, ...) while the Y
+        coordinate is a number (1, 2, 3, ...).
+        See Battlefield.place_ship.
+
+        :param ship_type: Type of ship
+        :param x: X-coordinate to place ship
+        :param y: Y-coordinate to place ship
+        :param size: Size of ship
+        :param horizontal: Orientation of the ship
+        :return: True if ship placed succesfully, False otherwise
+        """
+        column, row = self.from_coords(x, y)
+
+        # Make sure ship fits on board by tweaking starting position
+        if horizontal:
+            column = min(column, self.__columns - size)
+        else:
+            row = min(row, self.__rows - size)
+
+        mask = self.__lines[bool(horizontal)][size] \
+            << (row * self.__columns + column)
+        if self.__occupied & mask:
+            # Oops, there's already a ship here!
+            return None
+
+        self.__masks[ship_type] = self.__masks.get(ship_type, 0) | mask
+        self.__occupied |= mask
+        if horizontal:
+            return [(column + i, row) for i in range(size)]
+        return [(column, row + i) for i in range(size)]
+
+    def __str__(self):
+        s = '     '
+        s += '   '.join(chr(x + ord('A')) for x in range(self.__columns))
+        s += '\n   '
+        s += '+---' * self.__columns + '+\n'
+        for y in range(self.__rows):
+            s += f'{y + 1:2} |'
+            s += '|'.join(['   '
+                           if self.get_by_col_row(x, y) is None
+                           else f' {self.get_by_col_row(x, y)[0]} '
+                           for x in range(self.__columns)])
+            s += '|\n'
+            s += '   '
+            s += '+---' * self.__columns + '+\n'
+
+        s = '%s' + s + '%s'
+        return s % (fg(self.__colour), attr(0))
+
+
 def main():
     ships = {
         'A': 5,
@@ -163,14 +375,10 @@ def main():
     }
 
     bf = Battlefield()  # Assume 10x10 field
-    for ship in ships:
-        size = ships[ship]
-        while True:
-            x = random.choice('ABCDEFGHIJ')
-            y = random.randint(1, 10)
-            o = random.choice([False, True])
-            if bf.place_ship(ship, x, y, size, horizontal=o) is not None:
-                break
+    fleet = FleetGenerator(list(ships.values())).generate()
+    for ship, (_, col, row, o) in zip(ships, fleet):
+        x, y = bf.to_coords(col, row)
+        bf.place_ship(ship, x, y, ships[ship], horizontal=o)
 
     print(bf)
 
@@ -19,6 +19,11 @@ class BattleshipsStub(object):
                 request_serializer=battleships__pb2.Request.SerializeToString,
                 response_deserializer=battleships__pb2.Response.FromString,
                 )
+        self.Watch = channel.unary_stream(
+                '/battleships.Battleships/Watch',
+                request_serializer=battleships__pb2.WatchRequest.SerializeToString,
+                response_deserializer=battleships__pb2.GameEvent.FromString,
+                )
 
 
 class BattleshipsServicer(object):
@@ -30,6 +35,12 @@ class BattleshipsServicer(object):
         context.set_details('Method not implemented!')
         raise NotImplementedError('Method not implemented!')
 
+    def Watch(self, request, context):
+        """Missing associated documentation comment in .proto file."""
+        context.set_code(grpc.StatusCode.UNIMPLEMENTED)
+        context.set_details('Method not implemented!')
+        raise NotImplementedError('Method not implemented!')
+
 
 def add_BattleshipsServicer_to_server(servicer, server):
     rpc_method_handlers = {
@@ -38,6 +49,11 @@ def add_BattleshipsServicer_to_server(servicer, server):
                     request_deserializer=battleships__pb2.Request.FromString,
                     response_serializer=battleships__pb2.Response.SerializeToString,
             ),
+            'Watch': grpc.unary_stream_rpc_method_handler(
+                    servicer.Watch,
+                    request_deserializer=battleships__pb2.WatchRequest.FromString,
+                    response_serializer=battleships__pb2.GameEvent.SerializeToString,
+            ),
     }
     generic_handler = grpc.method_handlers_generic_handler(
             'battleships.Battleships', rpc_method_handlers)
@@ -64,3 +80,20 @@ class Battleships(object):
             battleships__pb2.Response.FromString,
             options, channel_credentials,
             insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
+
+    @staticmethod
+    def Watch(request,
+            target,
+            options=(),
+            channel_credentials=None,
+            call_credentials=None,
+            insecure=False,
+            compression=None,
+            wait_for_ready=None,
+            timeout=None,
+            metadata=None):
+        return grpc.experimental.unary_stream(request, target, '/battleships.Battleships/Watch',
+            battleships__pb2.WatchRequest.SerializeToString,
+            battleships__pb2.GameEvent.FromString,
+            options, channel_credentials,
+            insecure, call_credentials, compression, wait_for_ready, timeout, metadata)
@@ -7,7 +7,7 @@ class ClientInterface:
         pass
 
     @abstractmethod
-    def join(self):
+    def join(self, fleet=None):
         pass
 
     @abstractmethod
@@ -25,3 +25,7 @@ class ClientInterface:
     @abstractmethod
     def defeat(self):
         pass
+
+    @abstractmethod
+    def close(self):
+        pass
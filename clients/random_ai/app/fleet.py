@@ -0,0 +1,215 @@
+import numpy as np
+import random
+
+# Number of random picks from the placements of a ship before falling
+# back to a scan of the placements that are still free
+PICKS = 8
+
+# Number of times a fleet is started over because the ships placed so
+# far leave no room for the next one, before the ships are taken not to
+# fit on the board together
+ATTEMPTS = 100
+
+# Placements of a ship by size and board dimensions, see placements()
+_TABLES = {}
+
+
+def placements(size, columns=10, rows=10):
+    """Get every placement of a ship on a board. The table is computed
+    once per size and board dimensions.
+
+    A placement is a tuple of the bitmask of the ship's cells (cell
+    (column, row) is bit row * columns + column, as in
+    BitboardBattlefield), the column and row of its first cell and
+    whether it is horizontal.
+
+    :param size: Number of cells of the ship
+    :param columns: Number of columns of the board
+    :param rows: Number of rows of the board
+    :return: Tuple of the placements
+    """
+    key = size, columns, rows
+    table = _TABLES.get(key)
+    if table is None:
+        table = []
+        line = (1 << size) - 1
+        for row in range(rows):
+            for column in range(columns - size + 1):
+                table.append((line << (row * columns + column), column, row,
+                              True))
+        if size > 1:
+            line = sum(1 << (i * columns) for i in range(size))
+            for row in range(rows - size + 1):
+                for column in range(columns):
+                    table.append((line << (row * columns + column), column,
+                                  row, False))
+        table = _TABLES[key] = tuple(table)
+    return table
+
+
+class FleetGenerator:
+    """Generate random fleets from the placement tables, without trial
+    and error on a Battlefield.
+
+    Every ship is placed uniformly at random among its placements that
+    do not overlap the ships placed before it. A few random picks from
+    the table usually find such a placement; otherwise the free
+    placements are selected with a single scan of the table, so the cost
+    of a fleet is bounded.
+    """
+
+    def __init__(self, sizes, columns=10, rows=10, rng=random):
+        """Create a FleetGenerator.
+
+        :param sizes: Sizes of the ships of a fleet, in the order in
+                      which they are placed (largest first is best)
+        :param columns: Number of columns of the board
+        :param rows: Number of rows of the board
+        :param rng: Random number generator to use
+        :raise ValueError: if a ship does not fit on the board
+        """
+        self.__sizes = list(sizes)
+        self.__tables = [placements(size, columns, rows) for size in sizes]
+        if not all(self.__tables):
+            raise ValueError(f'Ships of sizes {sizes} do not fit on a '
+                             f'{columns}x{rows} board')
+        self.__cells = columns * rows
+        self.__rng = rng
+
+        # The placement masks as arrays of 64-bit words for batch()
+        self.__words = -(-self.__cells // 64)
+        self.__arrays = [
+            np.array([[mask >> (64 * w) & 0xFFFFFFFFFFFFFFFF
+                       for w in range(self.__words)]
+                      for mask, *_ in table], dtype=np.uint64)
+            for table in self.__tables
+        ]
+
+    @property
+    def tables(self):
+        """Get the placements of each ship, see :func:`placements`.
+        The indexes returned by :meth:`batch` point into these.
+
+        :return: List of the placement tables, in the order of the sizes
+        """
+        return list(self.__tables)
+
+    def generate(self):
+        """Generate a fleet.
+
+        :return: List of the placements of the ships (see
+                 :func:`placements`), in the order of the sizes
+        :raise ValueError: if no fleet was found in ATTEMPTS attempts
+        """
+        randrange = self.__rng.randrange
+        for _ in range(ATTEMPTS):
+            occupied = 0
+            fleet = []
+            for table in self.__tables:
+                n = len(table)
+                for _ in range(PICKS):
+                    placement = table[randrange(n)]
+                    if not placement[0] & occupied:
+                        break
+                else:
+                    free = [p for p in table if not p[0] & occupied]
+                    if not free:
+                        # The ships placed so far leave no room for this
+                        # one; start over
+                        break
+                    placement = free[randrange(len(free))]
+
+                occupied |= placement[0]
+                fleet.append(placement)
+            else:
+                return fleet
+
+        raise self.__no_room()
+
+    def masks(self):
+        """Generate a fleet as bitmasks only, e.g., for simulations.
+
+        :return: Tuple of the bitmask of all ships and a list of the
+                 bitmask of each ship
+        """
+        fleet = [p[0] for p in self.generate()]
+        ships = 0
+        for mask in fleet:
+            ships |= mask
+        return ships, fleet
+
+    def batch(self, n, rng=None):
+        """Generate many fleets at once with NumPy, e.g., for simulations.
+        The ships are placed as by :meth:`generate`, one ship of all
+        fleets at a time.
+
+        :param n: Number of fleets
+        :param rng: NumPy random Generator to use; by default one is
+                    seeded from the generator's random number generator
+        :return: Tuple of a boolean array of shape (n, columns * rows)
+                 that is True for the cells of the ships, and an array
+                 of shape (n, ships) of the indexes of the placements
+                 into :attr:`tables`
+        :raise ValueError: if a fleet was not found in ATTEMPTS attempts
+        """
+        if rng is None:
+            rng = np.random.default_rng(self.__rng.getrandbits(64))
+
+        # Fleets that ran out of room are generated again
+        ships, chosen, dead = self.__batch(n, rng)
+        for _ in range(ATTEMPTS - 1):
+            if not dead.any():
+                break
+            todo = np.flatnonzero(dead)
+            ships[todo], chosen[todo], dead[todo] = self.__batch(todo.size,
+                                                                 rng)
+        if dead.any():
+            raise self.__no_room()
+        return ships, chosen
+
+    def __batch(self, n, rng):
+        """Generate many fleets at once, see :meth:`batch`.
+
+        :param n: Number of fleets
+        :param rng: NumPy random Generator to use
+        :return: Tuple of the cells and placements of the fleets as
+                 returned by :meth:`batch`, and a boolean array of shape
+                 (n,) that is True for the fleets that ran out of room
+        """
+        occupied = np.zeros((n, self.__words), dtype=np.uint64)
+        chosen = np.empty((n, len(self.__arrays)), dtype=np.intp)
+        dead = np.zeros(n, dtype=bool)
+        for i, masks in enumerate(self.__arrays):
+            m = len(masks)
+            index = rng.integers(m, size=n)
+            todo = np.arange(n)
+            for _ in range(PICKS):
+                overlap = (masks[index[todo]] & occupied[todo]).any(axis=1)
+                todo = todo[overlap]
+                if not todo.size:
+                    break
+                index[todo] = rng.integers(m, size=todo.size)
+            else:
+                overlap = (masks[index[todo]] & occupied[todo]).any(axis=1)
+                for j in todo[overlap]:
+                    free = np.flatnonzero(
+                        ~(masks & occupied[j]).any(axis=1))
+                    if free.size:
+                        index[j] = free[rng.integers(free.size)]
+                    else:
+                        dead[j] = True
+
+            occupied |= masks[index]
+            chosen[:, i] = index
+
+        bits = np.unpackbits(occupied.astype('<u8').view(np.uint8), axis=1,
+                             bitorder='little')[:, :self.__cells]
+        return bits.astype(bool), chosen, dead
+
+    def __no_room(self):
+        """Get the error for ships that could not be placed together.
+
+        :return: ValueError
+        """
+        return ValueError(f'Unable to place ships of sizes {self.__sizes} '
+                          f'in {ATTEMPTS} attempts')
@@ -2,10 +2,13 @@ import logging
 import os
 import random
 import time
+import tracing
 from breezypythongui import EasyFrame
-from battlefield import Battlefield
+from battlefield import BitboardBattlefield
 from battlefield_ui import BattlefieldUI
 from battleship_client import BattleshipClient
+from fleet import FleetGenerator
+from targeting import Targeting
 
 # Without this, nothing shows up...
 logging.basicConfig()
@@ -16,6 +19,8 @@ logger.setLevel(logging.INFO)
 grpc_host = os.getenv('GRPC_HOST', 'localhost')
 grpc_port = os.getenv('GRPC_PORT', '50051')
 
+tracing.configure_from_env()
+
 
 class Game(EasyFrame):
     SIZE = 10
@@ -33,16 +38,22 @@ class Game(EasyFrame):
         'P': 'Patrol Boat', 'p': 'Patrol Boat',
     }
 
-    def __init__(self, timeout=1.0, mirrored=False, vertical=False, smart_ai=False):
+    def __init__(self, timeout=1.0, mirrored=False, vertical=False, smart_ai=False,
+                 submit_fleet=False):
         EasyFrame.__init__(self, 'Battleships')
 
         self.__smart_ai = smart_ai
+        self.__submit_fleet = submit_fleet
 
         # Get a copy of the ships
         self.__ships = self.SHIPS.copy()
+        self.__fleets = FleetGenerator(list(self.__ships.values()),
+                                       self.SIZE, self.SIZE)
+        self.__targeting = Targeting(self.SHIPS.values(), self.SIZE,
+                                     self.SIZE)
 
-        self.__mine = Battlefield(colour=193)
-        self.__opponent = Battlefield(colour=208)
+        self.__mine = BitboardBattlefield(colour=193)
+        self.__opponent = BitboardBattlefield(colour=208)
 
         self.__mine_ui = BattlefieldUI(self, width=400, height=400, size=self.SIZE)
         self.__opponent_ui = BattlefieldUI(self, width=400, height=400, size=self.SIZE,
@@ -67,7 +78,6 @@ class Game(EasyFrame):
         self.__attack_vector = None, None
 
         self.__client = self.__create_grpc_client()
-        self.__client.join()
 
     def __create_grpc_client(self):
         """
@@ -95,23 +105,26 @@ class Game(EasyFrame):
 
         self.__opponent.clear()
         self.__opponent_ui.clear()
+        self.__targeting.clear()
 
     def setup(self):
         """
-        Randomly place ships on the grid.
+        Randomly place ships on the grid, then join a game. With
+        {submit_fleet}, the ships are sent along so the server resolves
+        the attacks on them.
         """
-        for ship in self.__ships:
+        fleet = []
+        placements = self.__fleets.generate()
+        for ship, (_, col, row, o) in zip(self.__ships, placements):
             size = self.__ships[ship]
-            while True:
-                x = random.choice('ABCDEFGHIJ')
-                y = random.randint(1, 10)
-                o = random.choice([False, True])
-                result = self.__mine.place_ship(ship, x, y, size, horizontal=o)
-                if result is not None:
-                    for x, y in result:
-                        ship_name = self.SHIP_NAMES[ship][0]
-                        self.__mine_ui.update_at(x, y, ship_name)
-                    break
+            x, y = self.__mine.to_coords(col, row)
+            fleet.append((f'{x}{y}', size, o))
+            result = self.__mine.place_ship(ship, x, y, size, horizontal=o)
+            for x, y in result:
+                ship_name = self.SHIP_NAMES[ship][0]
+                self.__mine_ui.update_at(x, y, ship_name)
+
+        self.__client.join(fleet if self.__submit_fleet else None)
 
     def start(self):
         self.mainloop()
@@ -122,18 +135,18 @@ class Game(EasyFrame):
     def start_my_turn(self):
         logger.info("Okay, it's my turn now.")
         time.sleep(self.__timeout)
+        if self.__smart_ai:
+            self.__attack_cell(*self.__targeting.best())
+            return
+
         while True:
-            try:
-                self.__attack_nearby_cell()
-                return
-            except ValueError:
-                col = random.randint(0, 9)
-                row = random.randint(0, 9)
+            col = random.randint(0, 9)
+            row = random.randint(0, 9)
 
-                cell = self.__opponent.get_by_col_row(col, row)
-                if cell is None:
-                    self.__attack_cell(col, row)
-                    return
+            cell = self.__opponent.get_by_col_row(col, row)
+            if cell is None:
+                self.__attack_cell(col, row)
+                return
 
     def __attack_cell(self, col, row):
         """
@@ -145,34 +158,6 @@ class Game(EasyFrame):
         logger.info(f'Attacking on {vector}.')
         self.__client.attack(vector)
 
-    def __attack_nearby_cell(self):
-        """
-        This method attacks a nearby cell based on an earlier hit. The
-        position of the hit is maintained in the instance variable
-        {__attack_vector}. The AI will try to find an empty location
-        close to the latest successful attack. If no empty locations
-        exist, it will raise a ValueError.
-        """
-        col, row = self.__attack_vector
-        if self.__smart_ai and not (col is None or row is None):
-            relative_cells = [(-1, 0), (0, -1), (1, 0), (0, 1)]
-
-            # Shuffling may not make much of a difference...
-            random.shuffle(relative_cells)
-            for dx, dy in relative_cells:
-                dcol, drow = col + dx, row + dy
-                if not (0 <= dcol < self.SIZE and 0 <= drow < self.SIZE):
-                    # Off the grid, so move to the next one
-                    continue
-
-                cell = self.__opponent.get_by_col_row(dcol, drow)
-                if cell is None:
-                    logger.info(f'Nearby empty cell @ ({col},{row}) found.')
-                    self.__attack_cell(dcol, drow)
-                    return
-
-        raise ValueError
-
     def end_my_turn(self):
         logger.info("Okay, my turn has ended.")
 
@@ -180,22 +165,22 @@ class Game(EasyFrame):
         logger.info("Success!")
         self.__opponent.set_by_col_row(*self.__attack_vector, 'X')
         self.__opponent_ui.update_at(*self.__attack_vector, '\u2716', colour='red')
-        # Don't reset attack vector so AI will try to attack a nearby position
+        self.__targeting.hit(*self.__attack_vector)
 
     def miss(self):
         logger.info("No luck.")
         dot = '\u25CB'
         self.__opponent.set_by_col_row(*self.__attack_vector, dot)
         self.__opponent_ui.update_at(*self.__attack_vector, dot, colour='blue')
-
-        # Reset the attack vector so next attack will be at random position
-        self.__attack_vector = None, None
+        self.__targeting.miss(*self.__attack_vector)
 
     def won(self):
         logger.info("I won!!!")
+        self.__client.close()
 
     def lost(self):
         logger.info("Meh. I lost.")
+        self.__client.close()
 
     def attacked(self, vector):
         # Get rid of any whitespace
@@ -234,8 +219,10 @@ def main():
     mirrored = os.getenv('MIRRORED', False)
     vertical = os.getenv('VERTICAL', False)
     smart_ai = os.getenv('SMART_AI', False)
+    submit_fleet = os.getenv('SUBMIT_FLEET', False)
 
-    game = Game(timeout=0.25, mirrored=mirrored, vertical=vertical, smart_ai=smart_ai)
+    game = Game(timeout=0.25, mirrored=mirrored, vertical=vertical, smart_ai=smart_ai,
+                submit_fleet=submit_fleet)
     game.setup()
     game.start()
 
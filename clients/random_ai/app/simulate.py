@@ -0,0 +1,502 @@
+import argparse
+import json
+import math
+import multiprocessing
+import os
+import random
+import time
+from collections import deque
+from battlefield import BitboardBattlefield
+from client_interface import ClientInterface
+from fleet import FleetGenerator
+from targeting import Targeting
+
+SIZE = 10
+SHIPS = {
+    'A': 5, 'B': 4, 'S': 3, 's': 3, '5': 3,
+    'C': 3, 'D': 2, 'd': 2, 'P': 1, 'p': 1,
+}
+
+# z for a two-sided 95% confidence interval
+Z = 1.96
+
+
+class RandomTargeting:
+    """Attack the cells in a random order, as the client does without
+    SMART_AI. It has the interface of :class:`targeting.Targeting`.
+    """
+
+    def __init__(self, sizes, columns=10, rows=10, rng=random):
+        self.__cells = [(col, row) for row in range(rows)
+                        for col in range(columns)]
+        self.__rng = rng
+        self.__order = []
+
+    def clear(self):
+        self.__order = self.__rng.sample(self.__cells, len(self.__cells))
+
+    def best(self):
+        return self.__order[-1]
+
+    def hit(self, col, row):
+        self.__order.pop()
+
+    def miss(self, col, row):
+        self.__order.pop()
+
+
+class NearbyTargeting:
+    """Attack a random neighbour of the last hit that has not been
+    attacked yet, if any, and a random cell otherwise, as the client did
+    with SMART_AI before the targeting engine.
+    """
+
+    NEIGHBOURS = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+
+    def __init__(self, sizes, columns=10, rows=10, rng=random):
+        self.__columns = columns
+        self.__rows = rows
+        self.__rng = rng
+        self.__random = RandomTargeting(sizes, columns, rows, rng)
+        self.__shot = set()
+        self.__last = None
+
+    def clear(self):
+        self.__random.clear()
+        self.__shot.clear()
+        self.__last = None
+
+    def best(self):
+        if self.__last is not None:
+            col, row = self.__last
+            neighbours = self.NEIGHBOURS[:]
+            self.__rng.shuffle(neighbours)
+            for dx, dy in neighbours:
+                cell = col + dx, row + dy
+                if 0 <= cell[0] < self.__columns and \
+                        0 <= cell[1] < self.__rows and \
+                        cell not in self.__shot:
+                    return cell
+
+        while self.__random.best() in self.__shot:
+            self.__random.miss(*self.__random.best())
+        return self.__random.best()
+
+    def hit(self, col, row):
+        self.__shot.add((col, row))
+        self.__last = col, row
+
+    def miss(self, col, row):
+        self.__shot.add((col, row))
+        self.__last = None
+
+
+STRATEGIES = {
+    'random': RandomTargeting,
+    'nearby': NearbyTargeting,
+    'density': Targeting,
+}
+
+
+class SimulatedClient(ClientInterface):
+    """A client that plays through a :class:`Simulation` instead of a
+    game server, with the events of :class:`BattleshipClient`.
+    """
+
+    __supported_events = [
+        'begin', 'start_turn', 'end_turn', 'attack',
+        'hit', 'miss', 'win', 'lose'
+    ]
+
+    def __init__(self, simulation):
+        self.__simulation = simulation
+        self.__handlers = {}
+
+    def add_event_listener(self, event=None, handler=None):
+        """Register an event handler for an event.
+
+        :param event: Event to register handler for
+        :param handler: Handler for event
+        """
+        if event is None:
+            event = handler.__name__
+
+        if event not in self.__supported_events:
+            raise ValueError(f'Unable to register event {event}!')
+
+        self.__handlers[event] = handler
+
+    def join(self, fleet=None):
+        self.__simulation.join(self)
+
+    def attack(self, vector):
+        self.__simulation.attack(self, vector)
+
+    def hit(self):
+        self.__simulation.report(self, 'hit')
+
+    def miss(self):
+        self.__simulation.report(self, 'miss')
+
+    def defeat(self):
+        self.__simulation.report(self, 'defeat')
+
+    def close(self):
+        pass
+
+    def handler(self, event):
+        """Get the handler of an event.
+
+        :param event: Event to get the handler of
+        :return: Handler, or None if none has been registered
+        """
+        return self.__handlers.get(event)
+
+
+class Simulation:
+    """Play games between two clients in-process, with the turns of the
+    game server: the player that creates the game starts, and the turn
+    passes to the other player after every report on an attack.
+
+    Events are queued and delivered one after the other, so a handler
+    that acts on an event (e.g., attacks at the start of its turn) does
+    not nest the rest of the game in its call. Events without a handler
+    are not even queued.
+    """
+
+    def __init__(self):
+        self.__players = []
+        self.__events = deque()
+
+    def client(self):
+        """Create a client for this simulation.
+
+        :return: SimulatedClient
+        """
+        return SimulatedClient(self)
+
+    def join(self, client):
+        """Add a player to the next game; the second one begins it.
+
+        :param client: Client that joins
+        """
+        self.__players.append(client)
+        if len(self.__players) == 2:
+            first, second = self.__players
+            self.__queue(first, 'begin')
+            self.__queue(second, 'begin')
+            self.__queue(second, 'end_turn')
+            self.__queue(first, 'start_turn')
+
+    def attack(self, client, vector):
+        self.__queue(self.__opponent(client), 'attack', vector)
+
+    def report(self, client, state):
+        """Handle a report on an attack on a client.
+
+        :param client: Client that was attacked
+        :param state: 'hit', 'miss' or 'defeat'
+        """
+        attacker = self.__opponent(client)
+        if state == 'defeat':
+            self.__queue(attacker, 'win')
+            self.__queue(client, 'lose')
+            self.__players = []
+        else:
+            self.__queue(attacker, state)
+            self.__queue(attacker, 'end_turn')
+            self.__queue(client, 'start_turn')
+
+    def run(self):
+        """Deliver the events until the game is over.
+        """
+        events = self.__events
+        while events:
+            handler, args = events.popleft()
+            handler(*args)
+
+    def __queue(self, client, event, *args):
+        """Queue an event for a client, if it has a handler for it.
+
+        :param client: Client to deliver the event to
+        :param event: Event
+        :param args: Arguments of the handler
+        """
+        handler = client.handler(event)
+        if handler is not None:
+            self.__events.append((handler, args))
+
+    def __opponent(self, client):
+        first, second = self.__players
+        return second if client is first else first
+
+
+class Player:
+    """A headless AI player: its fleet is placed at random on a
+    Battlefield and it attacks the cells chosen by a strategy.
+    """
+
+    def __init__(self, client, strategy, rng=random):
+        """Create a Player.
+
+        :param client: Client to play through
+        :param strategy: Name of the targeting strategy, see STRATEGIES
+        :param rng: Random number generator to use
+        """
+        self.__client = client
+        self.__fleets = FleetGenerator(list(SHIPS.values()), SIZE, SIZE, rng)
+        self.__targeting = STRATEGIES[strategy](list(SHIPS.values()), SIZE,
+                                                SIZE, rng)
+        self.__mine = BitboardBattlefield()
+        self.__attack_vector = None
+        self.shots = 0
+        self.won = False
+
+        client.add_event_listener('start_turn', self.start_my_turn)
+        client.add_event_listener('hit', self.hit)
+        client.add_event_listener('miss', self.miss)
+        client.add_event_listener('win', self.won_game)
+        client.add_event_listener('attack', self.attacked)
+
+    def setup(self):
+        """Place a new fleet, forget the last game and join a game.
+        """
+        self.__mine.clear()
+        for ship, (_, col, row, o) in zip(SHIPS, self.__fleets.generate()):
+            x, y = self.__mine.to_coords(col, row)
+            self.__mine.place_ship(ship, x, y, SHIPS[ship], horizontal=o)
+
+        self.__targeting.clear()
+        self.shots = 0
+        self.won = False
+        self.__client.join()
+
+    def start_my_turn(self):
+        self.__attack_vector = self.__targeting.best()
+        x, y = self.__mine.to_coords(*self.__attack_vector)
+        self.shots += 1
+        self.__client.attack(f'{x}{y}')
+
+    def hit(self):
+        self.__targeting.hit(*self.__attack_vector)
+
+    def miss(self):
+        self.__targeting.miss(*self.__attack_vector)
+
+    def won_game(self):
+        self.won = True
+
+    def attacked(self, vector):
+        col, row = self.__mine.from_coords(vector[0], int(vector[1:]))
+        cell = self.__mine.get_by_col_row(col, row)
+        if cell is None or cell in (BitboardBattlefield.HIT,
+                                    BitboardBattlefield.MISS):
+            self.__client.miss()
+            return
+
+        self.__mine.set_by_col_row(col, row, BitboardBattlefield.HIT)
+        if self.__mine.all_sunk:
+            self.__client.defeat()
+        else:
+            self.__client.hit()
+
+
+class Results:
+    """Win rates and shots per game of two strategies, added up over
+    batches of games.
+    """
+
+    def __init__(self, strategies):
+        self.strategies = strategies
+        self.games = 0
+        self.wins = [0, 0]
+        # Sum and sum of squares of the shots of each player in the
+        # games that it won, i.e., the shots it took to sink a fleet
+        self.shots = [0, 0]
+        self.squares = [0, 0]
+
+    def add(self, batch):
+        """Add the results of a batch, see :func:`play_batch`.
+
+        :param batch: Tuple of the number of games, and the wins, shots
+                      and squares of the shots of both players
+        """
+        games, wins, shots, squares = batch
+        self.games += games
+        for i in range(2):
+            self.wins[i] += wins[i]
+            self.shots[i] += shots[i]
+            self.squares[i] += squares[i]
+
+    def report(self, elapsed):
+        """Summarize the results, with 95% confidence intervals.
+
+        :param elapsed: Duration of the simulation in seconds
+        :return: Dictionary with the games and a dictionary per player
+        """
+        summary = {
+            'games': self.games,
+            'seconds': elapsed,
+            'games_per_sec': self.games / elapsed if elapsed else 0,
+            'players': [],
+        }
+        for i, strategy in enumerate(self.strategies):
+            low, high = wilson(self.wins[i], self.games)
+            mean, margin = mean_interval(self.shots[i], self.squares[i],
+                                         self.wins[i])
+            summary['players'].append({
+                'strategy': strategy,
+                'wins': self.wins[i],
+                'win_rate': self.wins[i] / self.games if self.games else None,
+                'win_rate_low': low,
+                'win_rate_high': high,
+                'shots_per_win': mean,
+                'shots_per_win_margin': margin,
+            })
+        return summary
+
+
+def wilson(successes, n):
+    """Get the Wilson score interval of a proportion.
+
+    :param successes: Number of successes
+    :param n: Number of trials
+    :return: Tuple of the lower and upper bound, or Nones without trials
+    """
+    if not n:
+        return None, None
+
+    p = successes / n
+    centre = p + Z * Z / (2 * n)
+    spread = Z * math.sqrt(p * (1 - p) / n + Z * Z / (4 * n * n))
+    scale = 1 + Z * Z / n
+    return (centre - spread) / scale, (centre + spread) / scale
+
+
+def mean_interval(total, squares, n):
+    """Get the mean of samples and the margin of its confidence interval.
+
+    :param total: Sum of the samples
+    :param squares: Sum of the squares of the samples
+    :param n: Number of samples
+    :return: Tuple of the mean and the margin, or Nones without samples
+    """
+    if not n:
+        return None, None
+
+    mean = total / n
+    if n < 2:
+        return mean, None
+
+    variance = max(0.0, (squares - n * mean * mean) / (n - 1))
+    return mean, Z * math.sqrt(variance / n)
+
+
+def play_batch(task):
+    """Play a batch of games between two strategies. The players take
+    turns at starting the game.
+
+    :param task: Tuple of the names of both strategies, the number of
+                 games and the seed of the batch
+    :return: Tuple of the number of games, and the wins, shots and
+             squares of the shots of both players, see
+             :meth:`Results.add`
+    """
+    strategies, games, seed = task
+    rng = random.Random(seed)
+    simulation = Simulation()
+    players = [Player(simulation.client(), strategy, rng)
+               for strategy in strategies]
+
+    wins, shots, squares = [0, 0], [0, 0], [0, 0]
+    for game in range(games):
+        order = players if game % 2 == 0 else players[::-1]
+        for player in order:
+            player.setup()
+        simulation.run()
+
+        for i, player in enumerate(players):
+            if player.won:
+                wins[i] += 1
+                shots[i] += player.shots
+                squares[i] += player.shots * player.shots
+    return games, wins, shots, squares
+
+
+def simulate(strategies, games, processes=None, batch=1000, seed=None):
+    """Play games between two strategies on a pool of processes.
+
+    :param strategies: Names of the strategies of both players
+    :param games: Number of games to play
+    :param processes: Number of processes, by default one per CPU
+    :param batch: Number of games per task of a process
+    :param seed: Seed of the random numbers, random by default
+    :return: Results
+    """
+    if seed is None:
+        seed = random.randrange(2 ** 32)
+
+    # Every batch has its own seed, so the results of a seed do not
+    # depend on the number of processes
+    tasks = [(tuple(strategies), min(batch, games - start), f'{seed}:{i}')
+             for i, start in enumerate(range(0, games, batch))]
+
+    results = Results(strategies)
+    with multiprocessing.Pool(processes) as pool:
+        for result in pool.imap_unordered(play_batch, tasks):
+            results.add(result)
+    return results
+
+
+def main():
+    parser = argparse.ArgumentParser(
+        description='Play AI-vs-AI games in-process, without game servers, '
+                    'and report win rates and shots per game.')
+    parser.add_argument('--player-a', default='density',
+                        choices=sorted(STRATEGIES),
+                        help='strategy of the first player')
+    parser.add_argument('--player-b', default='random',
+                        choices=sorted(STRATEGIES),
+                        help='strategy of the second player')
+    parser.add_argument('--games', type=int, default=10000,
+                        help='number of games to play')
+    parser.add_argument('--processes', type=int,
+                        default=int(os.getenv('PROCESSES', 0)) or None,
+                        help='number of processes (default: one per CPU)')
+    parser.add_argument('--batch', type=int, default=1000,
+                        help='number of games per task')
+    parser.add_argument('--seed', type=int, default=None,
+                        help='seed for the fleets and moves')
+    parser.add_argument('--json', action='store_true',
+                        help='print the report as JSON')
+    args = parser.parse_args()
+    for option in ('games', 'processes', 'batch'):
+        value = getattr(args, option)
+        if value is not None and value < 1:
+            parser.error(f'--{option} must be at least 1')
+
+    started = time.perf_counter()
+    results = simulate((args.player_a, args.player_b), args.games,
+                       args.processes, args.batch, args.seed)
+    report = results.report(time.perf_counter() - started)
+
+    if args.json:
+        print(json.dumps(report))
+        return
+
+    print(f'Games: {report["games"]} in {report["seconds"]:.1f} s '
+          f'({report["games_per_sec"]:.0f}/s)')
+    for player in report['players']:
+        if player['shots_per_win'] is None:
+            shots = '-'
+        else:
+            shots = f'{player["shots_per_win"]:.2f}'
+            if player['shots_per_win_margin'] is not None:
+                shots += f' ± {player["shots_per_win_margin"]:.2f}'
+        print(f'{player["strategy"]:8} wins {player["win_rate"]:.2%} '
+              f'[{player["win_rate_low"]:.2%}, '
+              f'{player["win_rate_high"]:.2%}], shots per win {shots}')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,143 @@
+import numpy as np
+import random
+from collections import Counter
+from fleet import placements
+
+
+class Targeting:
+    """Choose the cells to attack from a probability density map: the
+    number of placements of the opponent's ships that cover a cell and
+    that agree with the hits and misses so far.
+
+    Placements are never counted from scratch. Every hit and miss only
+    touches the placements that cover its cell and adds the change in
+    their weight to the map, so a move costs about the number of
+    placements of a ship that cover a cell, whatever the board size.
+    """
+
+    # Factor by which a hit raises the weight of the placements that
+    # cover it, to finish off a ship before hunting for the next
+    HIT_WEIGHT = 50
+
+    def __init__(self, sizes, columns=10, rows=10, rng=random):
+        """Create a Targeting engine.
+
+        :param sizes: Sizes of the ships of the opponent's fleet
+        :param columns: Number of columns of the board
+        :param rows: Number of rows of the board
+        :param rng: Random number generator to use to break ties
+        """
+        self.__columns = columns
+        self.__n = n = columns * rows
+        counts = sorted(Counter(sizes).items())
+        longest = max(sizes)
+
+        # The cells of the placements of all ships, one row per
+        # placement. Shorter ships are padded with cell n, which is
+        # left out of the map.
+        cells, count = [], []
+        for size, ships in counts:
+            table = placements(size, columns, rows)
+            first = np.array([row * columns + col for _, col, row, _ in table])
+            step = np.array([1 if horizontal else columns
+                             for *_, horizontal in table])
+            padded = np.full((len(table), longest), n)
+            padded[:, :size] = first[:, None] + step[:, None] * np.arange(size)
+            cells.append(padded)
+            count.append(np.full(len(table), ships, dtype=np.float64))
+        self.__cells = np.concatenate(cells)
+        self.__count = np.concatenate(count)
+
+        # The placements that cover each cell
+        flat = self.__cells.ravel()
+        owners = np.repeat(np.arange(len(self.__cells)), longest)[
+            np.argsort(flat, kind='stable')]
+        self.__covering = np.split(owners, np.cumsum(
+            np.bincount(flat, minlength=n + 1))[:-1])[:n]
+
+        # The weight of a placement by the number of hits it covers
+        self.__weights = float(self.HIT_WEIGHT) ** np.arange(longest + 1)
+
+        self.__blocked = np.zeros(len(self.__cells), dtype=bool)
+        self.__hits = np.zeros(len(self.__cells), dtype=np.intp)
+        self.__rng = rng
+        self.__density = np.zeros(n + 1)
+        self.__noise = np.zeros(n + 1)
+        self.clear()
+
+    def clear(self):
+        """Forget the hits and misses so far, e.g., for a new game.
+        """
+        self.__blocked[:] = False
+        self.__hits[:] = 0
+        self.__density[:] = 0
+        self.__add(self.__cells, self.__count)
+
+        # Small random offsets so that the best of cells with the same
+        # density is chosen at random; cells that have been attacked get
+        # -inf, so they are never chosen again
+        rng = np.random.default_rng(self.__rng.getrandbits(64))
+        self.__noise[:] = rng.random(self.__n + 1) * 0.5
+        self.__noise[self.__n] = -np.inf
+
+    @property
+    def density(self):
+        """Get the probability density map, without normalization.
+
+        :return: Array of shape (rows, columns)
+        """
+        return self.__density[:self.__n].reshape(-1, self.__columns).copy()
+
+    def best(self):
+        """Get the cell that is covered by the most placements, of those
+        that have not been attacked yet.
+
+        :return: Tuple of the column and row of the cell
+        """
+        i = int((self.__density + self.__noise).argmax())
+        return i % self.__columns, i // self.__columns
+
+    def hit(self, col, row):
+        """Add a hit to the map: the placements that cover the cell
+        become more likely.
+
+        :param col: Column of the cell, starting from 0
+        :param row: Row of the cell, starting from 0
+        """
+        idx = self.__attacked(row * self.__columns + col)
+        old = self.__count[idx] * self.__weights[self.__hits[idx]]
+        self.__hits[idx] += 1
+        self.__add(self.__cells[idx], old * (self.HIT_WEIGHT - 1))
+
+    def miss(self, col, row):
+        """Add a miss to the map: the placements that cover the cell are
+        no longer possible.
+
+        :param col: Column of the cell, starting from 0
+        :param row: Row of the cell, starting from 0
+        """
+        idx = self.__attacked(row * self.__columns + col)
+        self.__blocked[idx] = True
+        self.__add(self.__cells[idx],
+                   -self.__count[idx] * self.__weights[self.__hits[idx]])
+
+    def __attacked(self, cell):
+        """Mark a cell as attacked.
+
+        :param cell: Index of the cell
+        :return: Array of the placements that cover the cell and that
+                 are still possible
+        """
+        self.__noise[cell] = -np.inf
+        idx = self.__covering[cell]
+        return idx[~self.__blocked[idx]]
+
+    def __add(self, cells, weights):
+        """Add weights to the cells of placements.
+
+        :param cells: Array of the cells of each placement
+        :param weights: Array of the weight to add for each placement
+        """
+        self.__density += np.bincount(
+            cells.ravel(), weights=np.repeat(weights, cells.shape[1]),
+            minlength=self.__n + 1)
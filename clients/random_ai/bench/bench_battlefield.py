@@ -0,0 +1,128 @@
+"""Microbenchmark of the list-of-lists Battlefield against the bitboard
+one, for what the client does with its grids during a game.
+
+Run from the random_ai directory: python bench/bench_battlefield.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from battlefield import Battlefield, BitboardBattlefield  # noqa: E402
+
+N = 1000
+REPEAT = 5
+
+SHIPS = {
+    'A': 5, 'B': 4, 'S': 3, 's': 3, '5': 3,
+    'C': 3, 'D': 2, 'd': 2, 'P': 1, 'p': 1,
+}
+
+CELLS = [(col, row) for col in range(10) for row in range(10)]
+
+
+def attempts(rng):
+    """Draw the placements that Game.setup tries for a random fleet,
+    including the ones that collide, so the benchmark replays them
+    without the cost of the random numbers.
+
+    :param rng: Random number generator to use
+    :return: List of the arguments of place_ship
+    """
+    bf = Battlefield()
+    tried = []
+    for ship, size in SHIPS.items():
+        while True:
+            args = (ship, rng.choice('ABCDEFGHIJ'), rng.randint(1, 10), size,
+                    rng.random() < 0.5)
+            tried.append(args)
+            if bf.place_ship(*args) is not None:
+                break
+    return tried
+
+
+FLEETS = [attempts(random.Random(i)) for i in range(100)]
+
+
+HIT = BitboardBattlefield.HIT
+MISS = BitboardBattlefield.MISS
+
+
+def all_sunk(bf):
+    """Check whether no cell holds a ship anymore, cell by cell.
+    """
+    return all(bf.get_by_col_row(col, row) in (None, HIT, MISS)
+               for col, row in CELLS)
+
+
+def empty_cells(bf):
+    """Find the cells that hold nothing, cell by cell.
+    """
+    return [(col, row) for col, row in CELLS
+            if bf.get_by_col_row(col, row) is None]
+
+
+def play(bf, is_sunk):
+    """Attack every cell, as the opponent does, and check after each
+    attack whether all ships are sunk.
+    """
+    for col, row in CELLS:
+        bf.set_by_col_row(col, row,
+                          HIT if bf.get_by_col_row(col, row) else MISS)
+        if is_sunk(bf):
+            return
+
+
+def best(f, number=N):
+    """Time a function, taking the fastest of a few runs against noise.
+
+    :param f: Function to time
+    :param number: Number of calls per run
+    :return: Seconds per call
+    """
+    return min(timeit.repeat(f, number=number, repeat=REPEAT)) / number
+
+
+def bench(label, cls, is_sunk, empty):
+    """Time setting up a fleet, a game of attacks and finding the
+    cells that have not been attacked.
+
+    :param label: Name of the representation
+    :param cls: Battlefield class
+    :param is_sunk: Function that checks whether all ships are sunk
+    :param empty: Function that finds the empty cells
+    :return: Tuple of the times per operation in microseconds
+    """
+    bf = cls()
+    fleets = iter(FLEETS * (3 * N * REPEAT // len(FLEETS) + 1))
+
+    def setup():
+        bf.clear()
+        for args in next(fleets):
+            bf.place_ship(*args)
+
+    t_setup = best(setup) * 1e6
+    t_play = best(lambda: (setup(), play(bf, is_sunk))) * 1e6 - t_setup
+    setup()
+    t_empty = best(lambda: empty(bf)) * 1e6
+
+    print(f'{label:8} setup {t_setup:8.1f} us  game {t_play:8.1f} us  '
+          f'empty cells {t_empty:6.1f} us')
+    return t_setup, t_play, t_empty
+
+
+def main():
+    lists = bench('lists', Battlefield, all_sunk, empty_cells)
+    bitboard = bench('bitboard', BitboardBattlefield,
+                     lambda bf: bf.all_sunk,
+                     BitboardBattlefield.empty_cells)
+    print('speedup  ' + '  '.join(
+        f'{name} {a / b:.2f}x'
+        for name, a, b in zip(('setup', 'game', 'empty cells'),
+                              lists, bitboard)))
+
+
+if __name__ == '__main__':
+    main()
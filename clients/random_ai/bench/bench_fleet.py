@@ -0,0 +1,65 @@
+"""Microbenchmark of generating random fleets: trial and error on a
+BitboardBattlefield, as Game.setup did, against the placement tables.
+
+Run from the random_ai directory: python bench/bench_fleet.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from battlefield import BitboardBattlefield  # noqa: E402
+from fleet import FleetGenerator  # noqa: E402
+
+N = 1000
+BATCH = 100000
+REPEAT = 5
+
+SHIPS = {
+    'A': 5, 'B': 4, 'S': 3, 's': 3, '5': 3,
+    'C': 3, 'D': 2, 'd': 2, 'P': 1, 'p': 1,
+}
+
+
+def trial_and_error(bf, rng):
+    """Place the fleet at random cells until every ship fits.
+    """
+    bf.clear()
+    for ship, size in SHIPS.items():
+        while True:
+            x = rng.choice('ABCDEFGHIJ')
+            y = rng.randint(1, 10)
+            o = rng.choice([False, True])
+            if bf.place_ship(ship, x, y, size, horizontal=o) is not None:
+                break
+
+
+def best(f, number=N):
+    """Time a function, taking the fastest of a few runs against noise.
+
+    :param f: Function to time
+    :param number: Number of calls per run
+    :return: Seconds per call
+    """
+    return min(timeit.repeat(f, number=number, repeat=REPEAT)) / number
+
+
+def main():
+    rng = random.Random(0)
+    bf = BitboardBattlefield()
+    generator = FleetGenerator(list(SHIPS.values()), rng=rng)
+
+    results = [
+        ('trial and error', best(lambda: trial_and_error(bf, rng))),
+        ('generate', best(generator.generate)),
+        ('masks', best(generator.masks)),
+        ('batch', best(lambda: generator.batch(BATCH), 1) / BATCH),
+    ]
+    for label, t in results:
+        print(f'{label:16} {t * 1e6:8.2f} us  {1 / t:12,.0f} fleets/s')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,126 @@
+"""Benchmark of the targeting engine: the time it takes to choose a cell
+and to add a hit or miss, and the number of attacks it needs to sink a
+fleet compared with random attacks and attacks next to the last hit.
+
+Run from the random_ai directory: python bench/bench_targeting.py
+"""
+import os
+import random
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from fleet import FleetGenerator  # noqa: E402
+from targeting import Targeting  # noqa: E402
+
+GAMES = 300
+N = 1000
+REPEAT = 5
+
+SIZES = [5, 4, 3, 3, 3, 3, 2, 2, 1, 1]
+
+
+def random_ai(board, size, rng):
+    """Attack random cells that have not been attacked yet.
+    """
+    order = rng.sample(range(size * size), size * size)
+    return max(i for i, cell in enumerate(order) if board[cell]) + 1
+
+
+def smart_ai(board, size, rng):
+    """Attack a random neighbour of the last hit, if any is left, and a
+    random cell otherwise, as the client did before the engine.
+    """
+    shot = set()
+    left = board.sum()
+    last = None
+    attacks = 0
+    while left:
+        cell = None
+        if last is not None:
+            col, row = last
+            relative_cells = [(-1, 0), (0, -1), (1, 0), (0, 1)]
+            rng.shuffle(relative_cells)
+            for dx, dy in relative_cells:
+                c = col + dx, row + dy
+                if 0 <= c[0] < size and 0 <= c[1] < size and c not in shot:
+                    cell = c
+                    break
+        while cell is None or cell in shot:
+            cell = rng.randrange(size), rng.randrange(size)
+
+        shot.add(cell)
+        attacks += 1
+        last = None
+        if board[cell[1] * size + cell[0]]:
+            left -= 1
+            last = cell
+    return attacks
+
+
+def density(targeting):
+    """Attack the best cell of the targeting engine.
+    """
+    def play(board, size, rng):
+        targeting.clear()
+        left = board.sum()
+        attacks = 0
+        while left:
+            col, row = targeting.best()
+            attacks += 1
+            if board[row * size + col]:
+                targeting.hit(col, row)
+                left -= 1
+            else:
+                targeting.miss(col, row)
+        return attacks
+    return play
+
+
+def best(f, number=N):
+    """Time a function, taking the fastest of a few runs against noise.
+
+    :param f: Function to time
+    :param number: Number of calls per run
+    :return: Seconds per call
+    """
+    return min(timeit.repeat(f, number=number, repeat=REPEAT)) / number
+
+
+def timings(size):
+    """Time choosing a cell, a miss and a hit on a board.
+
+    :param size: Number of columns and rows of the board
+    """
+    targeting = Targeting(SIZES, size, size, rng=random.Random(0))
+    rng = random.Random(1)
+    cells = [(rng.randrange(size), rng.randrange(size))
+             for _ in range(N * REPEAT)]
+    misses = iter(cells)
+    hits = iter(reversed(cells))
+    t_best = best(targeting.best)
+    t_miss = best(lambda: targeting.miss(*next(misses)))
+    t_hit = best(lambda: targeting.hit(*next(hits)))
+    print(f'{size}x{size:<4} best {t_best * 1e6:6.1f} us  '
+          f'miss {t_miss * 1e6:6.1f} us  hit {t_hit * 1e6:6.1f} us')
+
+
+def main():
+    for size in (10, 30, 100):
+        timings(size)
+
+    boards, _ = FleetGenerator(SIZES, rng=random.Random(2)).batch(GAMES)
+    strategies = [
+        ('random', random_ai),
+        ('nearby', smart_ai),
+        ('density', density(Targeting(SIZES, rng=random.Random(3)))),
+    ]
+    for label, play in strategies:
+        rng = random.Random(4)
+        attacks = [play(board, 10, rng) for board in boards]
+        print(f'{label:8} {sum(attacks) / GAMES:5.1f} attacks per game')
+
+
+if __name__ == '__main__':
+    main()
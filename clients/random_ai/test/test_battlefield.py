@@ -0,0 +1,115 @@
+import random
+import unittest
+from battlefield import Battlefield, BitboardBattlefield
+
+SHIPS = {
+    'A': 5, 'B': 4, 'S': 3, 's': 3, '5': 3,
+    'C': 3, 'D': 2, 'd': 2, 'P': 1, 'p': 1,
+}
+COLUMNS = 'ABCDEFGHIJ'
+
+# Number of random boards to compare
+BOARDS = 200
+
+
+def place_fleet(battlefields, rng):
+    """Place the ships at random cells on several battlefields at once,
+    until every ship fits on all of them.
+
+    :param battlefields: Battlefields to place the ships on
+    :param rng: Random number generator to use
+    :return: List of the results of every call of place_ship, per
+             battlefield
+    """
+    results = [[] for _ in battlefields]
+    for ship, size in SHIPS.items():
+        placed = None
+        while placed is None:
+            x, y = rng.choice(COLUMNS), rng.randint(1, 10)
+            horizontal = rng.choice([False, True])
+            for bf, result in zip(battlefields, results):
+                placed = bf.place_ship(ship, x, y, size, horizontal)
+                result.append(placed)
+    return results
+
+
+def attack(bf, ships, x, y):
+    """Resolve an attack as the client does, see Game.attacked.
+
+    :param bf: Battlefield that holds the fleet
+    :param ships: Number of cells left per ship, which is updated
+    :return: 'miss', 'hit', 'sunk' or 'defeat'
+    """
+    cell = bf.get(x, y)
+    if cell is None:
+        return 'miss'
+
+    bf.set(x, y, 'X')
+    ships[cell] -= 1
+    if ships[cell]:
+        return 'hit'
+    del ships[cell]
+    return 'sunk' if ships else 'defeat'
+
+
+class TestBitboardBattlefield(unittest.TestCase):
+    def test_place_ship(self):
+        """Ships are placed, moved onto the board and refused where they
+        would overlap as on a Battlefield.
+        """
+        rng = random.Random(1)
+        for _ in range(BOARDS):
+            grid, bitboard = Battlefield(), BitboardBattlefield()
+            expected, results = place_fleet([grid, bitboard], rng)
+            self.assertEqual(results, expected)
+
+            for col in range(10):
+                for row in range(10):
+                    self.assertEqual(bitboard.get_by_col_row(col, row),
+                                     grid.get_by_col_row(col, row))
+
+            empty = [(col, row) for row in range(10) for col in range(10)
+                     if grid.get_by_col_row(col, row) is None]
+            self.assertEqual(bitboard.empty_cells(), empty)
+            self.assertEqual(bin(bitboard.ships).count('1'),
+                             sum(SHIPS.values()))
+
+    def test_attack(self):
+        """Attacks hit, sink and defeat a fleet as on a Battlefield, and
+        all ships are sunk exactly when the last one is.
+        """
+        rng = random.Random(2)
+        for _ in range(BOARDS):
+            grid, bitboard = Battlefield(), BitboardBattlefield()
+            place_fleet([grid, bitboard], rng)
+            left = [dict(SHIPS), dict(SHIPS)]
+
+            cells = [(x, y) for x in COLUMNS for y in range(1, 11)]
+            rng.shuffle(cells)
+            for x, y in cells:
+                state = attack(grid, left[0], x, y)
+                self.assertEqual(attack(bitboard, left[1], x, y), state)
+                self.assertEqual(bitboard.all_sunk, state == 'defeat')
+                if state == 'defeat':
+                    break
+            else:
+                self.fail('The fleet was never defeated')
+
+            self.assertEqual(bitboard.ships, 0)
+            self.assertEqual(bin(bitboard.mask('X')).count('1'),
+                             sum(SHIPS.values()))
+
+    def test_set(self):
+        """Setting a cell replaces its value, and None empties it.
+        """
+        bitboard = BitboardBattlefield()
+        bitboard.place_ship('D', 'C', 3, 2, horizontal=False)
+        bitboard.set('C', 3, BitboardBattlefield.HIT)
+        self.assertEqual(bitboard.get('C', 3), BitboardBattlefield.HIT)
+        self.assertEqual(bitboard.get('C', 4), 'D')
+        self.assertFalse(bitboard.all_sunk)
+
+        bitboard.set('C', 4, None)
+        self.assertIsNone(bitboard.get('C', 4))
+        self.assertTrue(bitboard.all_sunk)
+        self.assertEqual(len(bitboard.empty_cells()), 99)
@@ -0,0 +1,83 @@
+import random
+import unittest
+import numpy as np
+from fleet import FleetGenerator, placements
+
+SIZES = [5, 4, 3, 3, 3, 3, 2, 2, 1, 1]
+
+# Number of fleets to check
+FLEETS = 500
+
+
+class TestFleetGenerator(unittest.TestCase):
+    def assertLegal(self, fleet, sizes=SIZES, columns=10, rows=10):
+        """Check that a fleet has a ship of every size, on the board and
+        without overlap, and that the masks match the cells.
+
+        :param fleet: List of placements, see placements()
+        """
+        self.assertEqual(len(fleet), len(sizes))
+        occupied = 0
+        for (mask, column, row, horizontal), size in zip(fleet, sizes):
+            if horizontal:
+                cells = [(column + i, row) for i in range(size)]
+            else:
+                cells = [(column, row + i) for i in range(size)]
+            for col, r in cells:
+                self.assertTrue(0 <= col < columns and 0 <= r < rows)
+            self.assertEqual(mask, sum(1 << (r * columns + col)
+                                       for col, r in cells))
+            self.assertFalse(mask & occupied)
+            occupied |= mask
+
+    def test_placements(self):
+        """Every placement of a ship is in the table, once.
+        """
+        self.assertEqual(len(placements(1)), 100)
+        self.assertEqual(len(placements(5)), 2 * 10 * 6)
+        self.assertEqual(len({p[0] for p in placements(5)}), 2 * 10 * 6)
+        self.assertEqual(placements(3, 7, 2), placements(3, 7, 2))
+
+    def test_generate(self):
+        """Generated fleets are legal, also on boards that are not
+        square.
+        """
+        generator = FleetGenerator(SIZES, rng=random.Random(1))
+        for _ in range(FLEETS):
+            self.assertLegal(generator.generate())
+
+        generator = FleetGenerator([4, 3, 1], 6, 4, rng=random.Random(2))
+        for _ in range(FLEETS):
+            self.assertLegal(generator.generate(), [4, 3, 1], 6, 4)
+
+    def test_batch(self):
+        """Fleets generated in a batch are legal and their cells are the
+        cells of their placements.
+        """
+        generator = FleetGenerator(SIZES, rng=random.Random(3))
+        tables = generator.tables
+        ships, chosen = generator.batch(FLEETS)
+        self.assertEqual(ships.shape, (FLEETS, 100))
+        self.assertEqual(chosen.shape, (FLEETS, len(SIZES)))
+
+        for cells, indexes in zip(ships, chosen):
+            fleet = [table[i] for table, i in zip(tables, indexes)]
+            self.assertLegal(fleet)
+            occupied = 0
+            for mask, *_ in fleet:
+                occupied |= mask
+            self.assertEqual(list(np.flatnonzero(cells)),
+                             [i for i in range(100) if occupied >> i & 1])
+
+    def test_no_room(self):
+        """Ships that do not fit on the board together are refused after
+        a bounded number of attempts.
+        """
+        with self.assertRaises(ValueError):
+            FleetGenerator([11])
+
+        generator = FleetGenerator([10] * 11, rng=random.Random(4))
+        with self.assertRaises(ValueError):
+            generator.generate()
+        with self.assertRaises(ValueError):
+            generator.batch(3)
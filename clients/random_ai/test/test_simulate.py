@@ -0,0 +1,51 @@
+import contextlib
+import io
+import unittest
+from unittest import mock
+import simulate
+from simulate import simulate as run, wilson
+
+STRATEGIES = 'density', 'random'
+
+
+class TestSimulate(unittest.TestCase):
+    def test_seed(self):
+        """A seed gives the same results for any number of processes.
+        """
+        results = [run(STRATEGIES, 30, processes, batch=7, seed=5)
+                   for processes in (1, 3)]
+        for result in results:
+            self.assertEqual(result.games, 30)
+            self.assertEqual(sum(result.wins), 30)
+        self.assertEqual(results[0].wins, results[1].wins)
+        self.assertEqual(results[0].shots, results[1].shots)
+        self.assertEqual(results[0].squares, results[1].squares)
+
+        other = run(STRATEGIES, 30, 1, batch=7, seed=6)
+        self.assertNotEqual(other.shots, results[0].shots)
+
+    def test_wilson(self):
+        """The Wilson interval lies around the proportion, within 0 and
+        1, and there is none without trials.
+        """
+        self.assertEqual(wilson(0, 0), (None, None))
+        low, high = wilson(50, 100)
+        self.assertAlmostEqual(low + high, 1)
+        self.assertLess(low, 0.5)
+        low, high = wilson(0, 10)
+        self.assertAlmostEqual(low, 0)
+        self.assertGreater(high, 0)
+
+    def test_arguments(self):
+        """Numbers of games, processes and games per batch below 1 are
+        refused.
+        """
+        for option in ('--games', '--processes', '--batch'):
+            for value in ('0', '-1'):
+                argv = ['simulate.py', option, value]
+                with self.subTest(option=option, value=value), \
+                        mock.patch('sys.argv', argv), \
+                        contextlib.redirect_stderr(io.StringIO()) as err, \
+                        self.assertRaises(SystemExit):
+                    simulate.main()
+                self.assertIn(f'{option} must be at least 1', err.getvalue())
@@ -0,0 +1,67 @@
+import random
+import unittest
+import numpy as np
+from fleet import FleetGenerator
+from simulate import STRATEGIES
+from targeting import Targeting
+
+SIZES = [5, 4, 3, 3, 3, 3, 2, 2, 1, 1]
+
+# Number of games to play per strategy
+GAMES = 20
+
+
+def play(targeting, fleet, columns=10, rows=10):
+    """Attack every cell of a board in the order a strategy chooses.
+
+    :param targeting: Targeting engine, or a strategy with its interface
+    :param fleet: Bitmask of the cells of the ships
+    :return: List of the (column, row) cells in the order of attack
+    """
+    targeting.clear()
+    attacked = []
+    for _ in range(columns * rows):
+        col, row = targeting.best()
+        attacked.append((col, row))
+        if fleet >> (row * columns + col) & 1:
+            targeting.hit(col, row)
+        else:
+            targeting.miss(col, row)
+    return attacked
+
+
+class TestTargeting(unittest.TestCase):
+    def test_never_attack_twice(self):
+        """Every strategy attacks every cell of the board once, also after
+        the fleet has been sunk.
+        """
+        rng = random.Random(1)
+        fleets = FleetGenerator(SIZES, rng=rng)
+        cells = [(col, row) for col in range(10) for row in range(10)]
+        for name, strategy in sorted(STRATEGIES.items()):
+            targeting = strategy(SIZES, rng=rng)
+            for _ in range(GAMES):
+                with self.subTest(strategy=name):
+                    ships, _ = fleets.masks()
+                    self.assertEqual(sorted(play(targeting, ships)), cells)
+
+    def test_other_board(self):
+        """A board that is not square is attacked cell by cell as well.
+        """
+        rng = random.Random(2)
+        targeting = Targeting([3, 2], 7, 4, rng)
+        ships, _ = FleetGenerator([3, 2], 7, 4, rng).masks()
+        attacked = play(targeting, ships, 7, 4)
+        self.assertEqual(sorted(attacked),
+                         [(col, row) for col in range(7) for row in range(4)])
+
+    def test_density(self):
+        """The density map counts the placements that cover each cell,
+        and a miss removes the placements through it.
+        """
+        targeting = Targeting([2], 3, 1)
+        np.testing.assert_array_equal(targeting.density, [[1, 2, 1]])
+        self.assertEqual(targeting.best(), (1, 0))
+
+        targeting.miss(1, 0)
+        np.testing.assert_array_equal(targeting.density, [[0, 0, 0]])
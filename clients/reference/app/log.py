@@ -1,17 +1,182 @@
+import atexit
 import logging
+import logging.handlers
+import os
+import queue
+import random
+import threading
+
+# Format of all log lines. The context fields of a record, if any, are
+# appended to the message, e.g., "... - Attack a1 [player=Alice]".
+FORMAT = '%(asctime)s - %(name)s - %(levelname)s - %(message)s%(fields)s'
+
+# Defaults of the environment variables LOG_LEVEL and LOG_SAMPLE_RATE
+LOG_LEVEL = 'DEBUG'
+LOG_SAMPLE_RATE = 1.0
+
+_lock = threading.Lock()
+_queue = queue.SimpleQueue()
+_handler = None
+_listener = None
+
+
+def level():
+    """Get the level of the loggers from the environment variable
+    LOG_LEVEL, e.g., INFO or WARNING.
+
+    :return: Name of the level
+    """
+    name = os.getenv('LOG_LEVEL', LOG_LEVEL).upper()
+    if not isinstance(logging.getLevelName(name), int):
+        return LOG_LEVEL
+    return name
+
+
+def sample_rate():
+    """Get the share of per-move records that is logged from the
+    environment variable LOG_SAMPLE_RATE, e.g., 0.01 for 1 in 100.
+
+    :return: Sample rate between 0.0 and 1.0
+    """
+    try:
+        rate = float(os.getenv('LOG_SAMPLE_RATE', LOG_SAMPLE_RATE))
+    except ValueError:
+        return LOG_SAMPLE_RATE
+    return min(max(rate, 0.0), 1.0)
+
+
+class ContextFormatter(logging.Formatter):
+    """Format records with the context fields of a
+    :class:`ContextAdapter` appended to the message.
+    """
+
+    def __init__(self, fmt=FORMAT):
+        super().__init__(fmt)
+
+    def format(self, record):
+        context = getattr(record, 'context', None)
+        if context:
+            record.fields = ' [' + ' '.join(
+                f'{k}={v}' for k, v in context.items()) + ']'
+        else:
+            record.fields = ''
+        return super().format(record)
+
+
+class _QueueHandler(logging.handlers.QueueHandler):
+    """Put records on the queue of the listener thread as they are.
+
+    The records stay in this process, so unlike the standard handler
+    the message is not formatted here but by the listener thread. Hence
+    the arguments of a record must not be changed after logging it.
+    """
+
+    def prepare(self, record):
+        return record
+
+
+def _start():
+    """Start the listener thread that writes the queued records to
+    stderr, unless it is running already.
+
+    :return: Handler that queues records for the listener thread
+    """
+    global _handler, _listener
+
+    with _lock:
+        if _handler is None:
+            stream = logging.StreamHandler()
+            stream.setFormatter(ContextFormatter())
+            _listener = logging.handlers.QueueListener(_queue, stream)
+            _listener.start()
+            _handler = _QueueHandler(_queue)
+            atexit.register(stop)
+        return _handler
+
+
+def stop():
+    """Write the records that are still queued and stop the listener
+    thread. Loggers keep queueing records, so the thread is started
+    again by :func:`get_logger` only.
+    """
+    global _handler, _listener
+
+    with _lock:
+        if _listener is not None:
+            _listener.stop()
+            _listener = None
+        _handler = None
 
 
 def get_logger(name):
-    """Create a customer logger.
+    """Create a customer logger. Its records are written to stderr by a
+    listener thread, so logging does not wait for the terminal. Getting
+    the same logger again does not add another handler.
 
     :param name: Name to be used for the logger
     :return: Custom logger
     """
     logger = logging.getLogger(name)
-    handler = logging.StreamHandler()
-    handler.setLevel(logging.DEBUG)
-    handler.setFormatter(
-        logging.Formatter(
-            '%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
-    logger.addHandler(handler)
+    handler = _start()
+    for h in list(logger.handlers):
+        if isinstance(h, _QueueHandler) and h is not handler:
+            logger.removeHandler(h)
+    if handler not in logger.handlers:
+        logger.addHandler(handler)
+    logger.setLevel(level())
     return logger
+
+
+class ContextAdapter(logging.LoggerAdapter):
+    """Add context fields, e.g., the player and game IDs of a
+    connection, to the records of a logger.
+
+    An adapter can sample the records below WARNING: only the given
+    share of them is logged, which keeps records that are logged for
+    every move cheap under load. Records that are dropped are not even
+    created.
+    """
+
+    def __init__(self, logger, rate=1.0, **context):
+        """Create a ContextAdapter.
+
+        :param logger: Logger to use
+        :param rate: Share of the records below WARNING to log
+        :param context: Context fields, e.g., player='Alice'
+        """
+        super().__init__(logger, {'context': context})
+        self.rate = rate
+
+    @property
+    def context(self):
+        return self.extra['context']
+
+    def bind(self, **context):
+        """Get an adapter with additional context fields.
+
+        :param context: Context fields to add
+        :return: New adapter with the same sample rate
+        """
+        return ContextAdapter(self.logger, self.rate,
+                              **{**self.context, **context})
+
+    def sampled(self, rate=None):
+        """Get an adapter with the same context fields that samples the
+        records below WARNING.
+
+        :param rate: Share of records to log; LOG_SAMPLE_RATE if None
+        :return: New adapter
+        """
+        if rate is None:
+            rate = sample_rate()
+        return ContextAdapter(self.logger, rate, **self.context)
+
+    def isEnabledFor(self, level):
+        if level < logging.WARNING and self.rate < 1.0 \
+                and random.random() >= self.rate:
+            return False
+        return self.logger.isEnabledFor(level)
+
+    def process(self, msg, kwargs):
+        kwargs['extra'] = {**kwargs.get('extra', {}), **self.extra}
+        return msg, kwargs
@@ -1,20 +1,22 @@
 import os
 import threading
-import time
+import tracing
 from battleship_client import BattleshipClient
 
 grpc_host = os.getenv('GRPC_HOST', 'localhost')
 grpc_port = os.getenv('GRPC_PORT', '50051')
 
-playing = threading.Event()
-playing.set()
+tracing.configure_from_env()
+
+# Set when the game is over; the main thread blocks on it
+game_over = threading.Event()
 
 battleship = BattleshipClient(grpc_host=grpc_host, grpc_port=grpc_port)
 
 
 @battleship.on()
 def begin():
-    print('Game started!')
+    print(f'Game {battleship.game_id} started!')
 
 
 @battleship.on()
@@ -42,13 +44,13 @@ def miss():
 @battleship.on()
 def win():
     print('Yay! You won!')
-    playing.clear()
+    game_over.set()
 
 
 @battleship.on()
 def lose():
     print('Aww... You lost...')
-    playing.clear()
+    game_over.set()
 
 
 @battleship.on()
@@ -74,5 +76,5 @@ def attack(vector):
 
 print('Waiting for the game to start...')
 battleship.join()
-while playing.is_set():
-    time.sleep(1.0)
+game_over.wait()
+battleship.close()
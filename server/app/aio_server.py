@@ -0,0 +1,569 @@
+import asyncio
+import backoff
+import grpc
+import redis
+import redis.asyncio as aioredis
+import time
+import uuid
+import log
+import metrics
+from battleships_pb2 import GameEvent
+from battleships_pb2_grpc import BattleshipsServicer
+from game import Game
+from matchmaking import AsyncMatchmaker
+from memory import AsyncMemoryDispatcher, AsyncMemoryMatchmaker
+from message import Message
+from pubsub import AsyncPubSubDispatcher
+from ratelimit import RateLimiter
+from router import LocalRouter
+from server import FULL_DETAILS, IDLE_DETAILS, INVALID_GAME_DETAILS, \
+    MEMORY, NO_GAME_DETAILS, PUBSUB, RETRY_AFTER_KEY, RETRY_AFTER_MS, \
+    STREAMS, TRANSPORTS, UNAVAILABLE_DETAILS, WATCH_TIMEOUT, _Server, \
+    valid_game_id
+from streams import AsyncStreamDispatcher
+from watch import AsyncSpectators
+from writer import FLUSH_INTERVAL, AsyncPublishWriter
+
+logger = log.get_logger(__name__)
+
+
+class AsyncBattleship(BattleshipsServicer):
+    def __init__(self, redis_host, redis_port='6379', db=0,
+                 transport=PUBSUB, max_streams=None, limiter=None):
+        """Create an asyncio Battleship (server) instance. This is the
+        counterpart of :class:`server.Battleship` for use with a
+        grpc.aio server: every stream is a coroutine instead of a thread,
+        so a single process can keep many more players connected.
+
+        The connection to Redis is not checked here, because that has to
+        be awaited. Use :meth:`ping_redis` and :meth:`start` once the
+        event loop is running.
+
+        :param redis_host: Hostname of Redis instance
+        :param redis_port: Port of Redis instance
+        :param db: Database to use within Redis instance
+        :param transport: server.PUBSUB, server.STREAMS or server.MEMORY
+        :param max_streams: Maximum number of concurrent streams, or None
+                            for no limit
+        :param limiter: RateLimiter with the request budgets of the
+                        streams, or None for no limits
+        :raise ValueError: if the transport is unknown
+        """
+        if transport not in TRANSPORTS:
+            raise ValueError(f'Unknown transport {transport}')
+
+        self.__max_streams = max_streams
+        self.__streams = 0
+        self.__limiter = limiter or RateLimiter()
+
+        if transport == MEMORY:
+            logger.info('Starting asyncio Battleship without Redis.')
+            self.__r = None
+            self.__dispatcher = AsyncMemoryDispatcher()
+            self.__matchmaker = AsyncMemoryMatchmaker()
+            # Nothing to save by batching messages in memory
+            interval = 0
+        else:
+            logger.info('Starting asyncio Battleship. Connect to Redis '
+                        'at %s:%s.', redis_host, redis_port)
+
+            self.__r = aioredis.Redis(host=redis_host, port=redis_port,
+                                      db=db)
+            if transport == STREAMS:
+                self.__dispatcher = AsyncStreamDispatcher(self.__r)
+            else:
+                self.__dispatcher = AsyncPubSubDispatcher(self.__r)
+            self.__matchmaker = AsyncMatchmaker(self.__r)
+            interval = FLUSH_INTERVAL
+
+        self.__writer = AsyncPublishWriter(self.__dispatcher, interval)
+        self.__router = LocalRouter(self.__dispatcher, self.__writer.publish)
+        self.__spectators = AsyncSpectators(self.__dispatcher,
+                                            self.__router)
+
+    async def start(self):
+        """Start receiving PubSub messages for the games of this server
+        and start the task that publishes messages to Redis.
+        """
+        await self.__writer.start()
+        await self.__dispatcher.start()
+        await self.__matchmaker.start()
+
+    async def Game(self, request_iterator, context):
+        """This method is the implementation of the gRPC Game service.
+        When connected, this provides the main functionality of the
+        Battleship game.
+
+        :param request_iterator: async iterator providing gRPC requests
+        :param context: a gRPC context object
+        :return: An async generator providing gRPC responses
+        """
+        if self.__max_streams is not None \
+                and self.__streams >= self.__max_streams:
+            await self.reject(context)
+
+        server = _AsyncServer(self.__r, self.__dispatcher, self.__router,
+                              self.__matchmaker)
+        limit = self.__limiter.connect(context)
+        server.limit_requests(limit)
+        self.__streams += 1
+        metrics.ACTIVE_STREAMS.inc()
+        try:
+            async with server:
+                async for response in server.start(request_iterator,
+                                                   context):
+                    yield response
+        finally:
+            metrics.ACTIVE_STREAMS.dec()
+            limit.close()
+            self.__streams -= 1
+
+    async def Watch(self, request, context):
+        """This method is the implementation of the gRPC Watch service:
+        it streams the events of a game in progress to a spectator until
+        the game has ended. Spectators count as streams.
+
+        :param request: WatchRequest with the ID of the game
+        :param context: a gRPC context object
+        :return: An async generator providing GameEvents
+        """
+        game_id = request.game_id
+        if not valid_game_id(game_id):
+            await context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                                INVALID_GAME_DETAILS)
+        if self.__max_streams is not None \
+                and self.__streams >= self.__max_streams:
+            await self.reject(context)
+
+        self.__streams += 1
+        try:
+            if not await self.__matchmaker.game_exists(game_id):
+                await context.abort(grpc.StatusCode.NOT_FOUND,
+                                    NO_GAME_DETAILS)
+
+            feed = await self.__spectators.watch(game_id)
+            if feed is None:
+                await context.abort(grpc.StatusCode.UNAVAILABLE,
+                                    UNAVAILABLE_DETAILS)
+
+            try:
+                sequence = 0
+                while True:
+                    events = await feed.read(sequence, WATCH_TIMEOUT)
+                    if events is None:
+                        await context.abort(
+                            grpc.StatusCode.DEADLINE_EXCEEDED, IDLE_DETAILS)
+                    if not events:
+                        return
+                    for event in events:
+                        yield event
+                    sequence = events[-1].sequence
+                    if events[-1].type == GameEvent.END:
+                        return
+            finally:
+                await self.__spectators.unwatch(feed)
+        finally:
+            self.__streams -= 1
+
+    async def reject(self, context):
+        """Reject a stream because the server is full: it is ended with
+        RESOURCE_EXHAUSTED, which raises an exception.
+
+        :param context: gRPC context object of the stream
+        """
+        logger.warning('Rejecting a stream, %s streams are connected',
+                       self.__max_streams)
+        metrics.REJECTED_STREAMS.inc()
+        await context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, FULL_DETAILS,
+                            ((RETRY_AFTER_KEY, str(RETRY_AFTER_MS)),))
+
+    async def ping_redis(self):
+        """Ping a Redis instance to see whether it's alive.
+
+        :return: True if connection to instance established (or no Redis
+                 is used), False otherwise
+        """
+        if self.__r is None:
+            return True
+
+        @backoff.on_exception(backoff.expo,
+                              redis.exceptions.ConnectionError,
+                              max_time=60)
+        async def __ping_redis():
+            """Convenience function that does the actual Redis PING.
+            """
+            logger.info('Pinging Redis server...')
+            return await self.__r.ping()
+
+        try:
+            return await __ping_redis()
+        except redis.exceptions.ConnectionError:
+            logger.error('Problem pinging Redis. Retry?')
+            return False
+
+    async def close(self, timeout=1.0):
+        """Publish the messages that are still queued, stop receiving
+        PubSub messages and close the connections to the Redis instance.
+
+        :param timeout: Maximum number of seconds to wait for the queue
+        """
+        self.__spectators.close()
+        await self.__writer.stop(timeout)
+        await self.__matchmaker.stop()
+        await self.__dispatcher.stop()
+        if self.__r is not None:
+            await self.__r.aclose()
+
+
+class _AsyncServer(_Server):
+    """Game server for a single player that runs on the event loop.
+
+    The handling of gRPC requests and PubSub messages is inherited from
+    :class:`server._Server`; only the I/O is replaced.
+    """
+
+    def __init__(self, _redis, dispatcher, router, matchmaker):
+        super().__init__(_redis, dispatcher, router, matchmaker)
+        self.__r = _redis
+        self.__dispatcher = dispatcher
+        self.__router = router
+        self.__matchmaker = matchmaker
+        self.__q = asyncio.Queue()
+        self.__running = True
+
+        self.__stream = None
+        self.__context = None
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc_val, exc_tb):
+        self.stop()
+
+    async def start(self, request_iterator, context):
+        """Method that starts the actual server.
+
+        :param request_iterator: async iterator that provides message
+        :param context: gRPC context object
+        """
+        self.__stream = request_iterator.__aiter__()
+        self.__context = context
+
+        request = await self.recv()
+        if request is None or not await self.throttle():
+            return
+
+        if not request.HasField('join'):
+            self.connection_log.error('Not a join message!')
+            return
+
+        player_id = request.join.id
+        if player_id == '':
+            self.connection_log.error('Player message ID is empty')
+            return
+
+        self.bind_log(player=player_id)
+        self.connection_log.info('Player is attempting to join')
+
+        if not self.set_fleet(request.join.fleet):
+            return
+
+        self.start_trace(context, player_id)
+        joined = await self.join_game(player_id)
+        if joined is None:
+            self.connection_log.error('Unable to connect to a game!')
+            self.finish_trace()
+            return
+
+        game, handler, is_new = joined
+        self.bind_log(game=game.id)
+        game_task = None
+        try:
+            game_task = self.subscribe_grpc(game, player_id)
+
+            async for response in self.get():
+                yield response
+
+            self.connection_log.info('Stopping all tasks')
+        finally:
+            # Also when the client has gone away or sending failed
+            if game_task is not None:
+                game_task.cancel()
+            await self.unsubscribe_redis(game, handler)
+            if is_new:
+                await self.close_open_game(game)
+            await self.end_game(game)
+            self.finish_trace()
+
+    def stop(self):
+        """Stop the game from running.
+        """
+        if self.__running:
+            self.__running = False
+            self.__q.put_nowait(None)
+
+    async def join_game(self, player_id):
+        """Join an open game, or create a new game if none is found, and
+        subscribe to its messages. Open games whose creator has left are
+        skipped.
+
+        :param player_id: ID of player
+        :return: A tuple containing the Game, the PubSub handler and a
+        flag is_new which indicates that a new game was created, or None
+        if unable to join a game
+        """
+        for _ in range(self.MAX_JOIN_ATTEMPTS):
+            game, is_new = await self.find_game_or_create()
+
+            self.connection_log.info('Connecting to game %s. New? %s',
+                                     game.id, 'Yes' if is_new else 'No')
+            self.connection_log.info('Setting up server to start receiving '
+                                     'PubSub messages')
+
+            handler = await self.subscribe_redis(game, player_id)
+            if handler is None:
+                return None
+
+            if await self.connect_game(game, player_id, is_new):
+                return game, handler, is_new
+
+            await self.unsubscribe_redis(game, handler)
+            if is_new:
+                return None
+
+            self.connection_log.warning('Creator of game %s has left',
+                                        game.id)
+
+        return None
+
+    async def connect_game(self, game, player_id, is_new):
+        """Join an existing game or advertise this one as open if game
+        is not yet in progress.
+
+        :param game: Game
+        :param player_id: ID of player
+        :param is_new: True if game is new, False otherwise
+        """
+        if is_new:
+            return await self.add_open_game(game)
+
+        # The game can be watched once it begins. Its ID is only handed
+        # out with BEGIN, so nobody can watch it before that.
+        await self.begin_game(game)
+
+        # The creator of the game must receive BEGIN as well, otherwise
+        # it has left the game after it was claimed. A creator in this
+        # process is known to be subscribed. Otherwise, nothing else has
+        # been published for this game yet, so BEGIN can skip the writer
+        # task in order to get the number of subscribers from Redis.
+        msg = Message(Message.BEGIN, player_id, '')
+        if self.__router.is_local(game.id):
+            self.publish(game.id, msg)
+            return True
+
+        metrics.MESSAGES_PUBLISHED.labels(msg.type).inc()
+        start = time.perf_counter()
+        receivers = await self.__dispatcher.publish(game.id, msg)
+        metrics.PUBLISH_SECONDS.observe(time.perf_counter() - start)
+        if receivers >= LocalRouter.PLAYERS:
+            return True
+
+        await self.end_game(game)
+        return False
+
+    async def recv(self):
+        """Receive a gRPC message.
+
+        :return: gRPC message that was received
+        """
+        try:
+            return await self.__stream.__anext__()
+        except StopAsyncIteration:
+            self.connection_log.warning('recv() - iteration stopped')
+            self.stop()
+        except Exception:
+            self.connection_log.error('An RPC error occurred!')
+            self.stop()
+
+    def send(self, response):
+        """Send a gRPC message.
+
+        :param response: Response to send to the client
+        """
+        metrics.RESPONSE_QUEUE_DEPTH.observe(self.__q.qsize())
+        self.__q.put_nowait(response)
+
+    async def get(self):
+        """Get next message from the queue. It keeps running until
+        :meth:`stop` is called, then it returns.
+
+        :return: Next message in queue
+        """
+        while True:
+            response = await self.__q.get()
+            if response is None:
+                return
+            yield response
+
+    @property
+    def is_running(self):
+        """Is the game still running?
+
+        :return: True if running, False otherwise
+        """
+        return self.__running
+
+    def subscribe_grpc(self, game, player_id):
+        """Create a task that handles incoming gRPC requests.
+
+        :param game: Game to handle requests for
+        :param player_id: Player this game server is handling
+        :return: Task handling the gRPC requests
+        """
+        return asyncio.create_task(self.handle_grpc(game, player_id))
+
+    async def handle_grpc(self, game, player_id):
+        """Handle actual gRPC requests.
+
+        :param game: Game to handle
+        :param player_id: Id of player this game server is handling
+        """
+        while True:
+            request = await self.recv()
+            if request is None or not await self.throttle():
+                return
+
+            if not self.handle_request(request, game, player_id):
+                return
+
+    async def throttle(self):
+        """Wait until the budgets of this stream allow a request, see
+        :meth:`budget`.
+
+        :return: True if the request may be handled, False if the stream
+                 was ended
+        """
+        delay = self.budget()
+        if delay:
+            await asyncio.sleep(delay)
+        return delay is not None
+
+    def abort(self, code, details):
+        """End the stream with a status other than OK.
+
+        :param code: gRPC status code
+        :param details: Description of the status for the client
+        """
+        self.__context.set_code(code)
+        self.__context.set_details(details)
+        self.stop()
+
+    @property
+    def redis_conn(self):
+        """Return Redis client as a property.
+        """
+        return self.__r
+
+    def publish(self, channel, message):
+        """Publish a message on a certain channel. The message is
+        queued for Redis unless both players are connected to this
+        process.
+
+        :param channel: Channel to use
+        :param message: Message to publish
+        :return: Number of subscribers that received the message, or
+                 None if it was queued
+        """
+        metrics.MESSAGES_PUBLISHED.labels(message.type).inc()
+        return self.__router.publish(channel, message)
+
+    async def subscribe_redis(self, game, player_id):
+        """Subscribe to game.id channel using the dispatcher that is
+        shared by all players of this process. The handler that is used
+        for the pubsub message is handle_pubsub, which is inherited from
+        _Server.
+
+        :param game: Game of which the ID is used to subscribe
+        :param player_id: ID of player this game server is handling
+        :return: Handler that was registered with the dispatcher, or None
+        if Redis did not confirm the subscription
+        """
+
+        def handle_pubsub(message):
+            return self.handle_pubsub(message, game, player_id)
+
+        if not await self.__dispatcher.subscribe(game.id, handle_pubsub):
+            self.connection_log.error('Unable to subscribe to channel %s',
+                                      game.id)
+            await self.__dispatcher.unsubscribe(game.id, handle_pubsub)
+            return None
+
+        return handle_pubsub
+
+    async def unsubscribe_redis(self, game, handler):
+        """Stop receiving messages for game.id channel.
+
+        :param game: Game of which the ID was used to subscribe
+        :param handler: Handler returned by :meth:`subscribe_redis`
+        """
+        await self.__dispatcher.unsubscribe(game.id, handler)
+        self.__router.forget(game.id)
+
+    def watched(self, game):
+        """Route the messages of the game through Redis from now on.
+
+        :param game: Game that is watched
+        """
+        self.__router.watch(game.id)
+
+    async def find_game_or_create(self):
+        """Try to find an open game in Redis or create a new game if
+        none found.
+
+        :return: A tuple containing a Game object and a flag is_new
+        which indicates that a new game was created.
+        """
+        game_id = await self.__matchmaker.claim_open_game()
+
+        # game_id is None if no open game found
+        is_new = game_id is None
+        if is_new:
+            self.connection_log.info(
+                'Could not find open game, creating new one')
+            game_id = str(uuid.uuid4())
+
+        return Game(game_id), is_new
+
+    async def add_open_game(self, game):
+        """Add an open game to the Redis instance so it can be discovered.
+
+        :param game: Game to be advertised
+        :return: True if successful, False otherwise
+        """
+        self.connection_log.info('Adding open game %s', game.id)
+        return await self.__matchmaker.add_open_game(game.id)
+
+    async def close_open_game(self, game):
+        """Remove an open game from the Redis instance so it can no longer
+        be discovered.
+
+        :param game: Game to be closed
+        """
+        self.connection_log.info('Closing open game %s', game.id)
+        await self.__matchmaker.close_open_game(game.id)
+
+    async def begin_game(self, game):
+        """Register a game as in progress, so spectators can watch it.
+
+        :param game: Game that begins
+        """
+        self.connection_log.info('Beginning game %s', game.id)
+        await self.__matchmaker.begin_game(game.id)
+
+    async def end_game(self, game):
+        """Remove a game from the games in progress, as this player has
+        left it.
+
+        :param game: Game to be ended
+        """
+        await self.__matchmaker.end_game(game.id)
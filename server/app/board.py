@@ -0,0 +1,129 @@
+from battleships_pb2 import Status
+
+# Board dimensions, and the ship sizes of a complete fleet: an aircraft
+# carrier, a battleship, four submarines and cruisers, two destroyers
+# and two patrol boats, as placed by the clients
+COLUMNS = 'abcdefghij'
+ROWS = 10
+FLEET = (5, 4, 3, 3, 3, 3, 2, 2, 1, 1)
+
+# Bit of every cell of the board by attack vector, e.g., "a1" or "j10".
+# Cell (column, row) is bit row * len(COLUMNS) + column.
+CELLS = {f'{x}{row + 1}': 1 << (row * len(COLUMNS) + column)
+         for column, x in enumerate(COLUMNS) for row in range(ROWS)}
+
+
+class Board:
+    """The fleet of a player as a bitboard: a single int with a bit set
+    for every cell that holds a part of a ship that has not been hit.
+    Resolving an attack is a lookup and a bit operation, so the server
+    can answer attacks itself instead of asking the client.
+    """
+
+    def __init__(self, ships=0):
+        """Create a Board.
+
+        :param ships: Bitboard of the cells that hold a ship
+        """
+        self.__remaining = ships
+
+    @classmethod
+    def from_fleet(cls, fleet):
+        """Create a Board from a fleet as submitted by a client. The
+        placement rules of the clients' Battlefield apply: every ship
+        lies on the board in a straight line and no two ships share a
+        cell. Unlike Battlefield, a ship that does not fit is not moved
+        but rejected. The fleet must be complete (see FLEET).
+
+        :param fleet: Iterable of Ship messages, or of tuples of the
+                      vector of the ship's first cell, its size and
+                      whether it is horizontal
+        :return: Board with the fleet on it
+        :raise ValueError: if a ship is misplaced or the fleet is not
+                           complete
+        """
+        ships = 0
+        sizes = []
+        for ship in fleet:
+            if isinstance(ship, tuple):
+                vector, size, horizontal = ship
+            else:
+                vector, size, horizontal = \
+                    ship.vector, ship.size, ship.horizontal
+
+            cells = cls.cells(vector, size, horizontal)
+            if ships & cells:
+                raise ValueError(f'Ship at {vector} overlaps another ship')
+            ships |= cells
+            sizes.append(size)
+
+        if sorted(sizes, reverse=True) != list(FLEET):
+            raise ValueError(f'Fleet must have ships of sizes {FLEET}')
+        return cls(ships)
+
+    @staticmethod
+    def cells(vector, size, horizontal):
+        """Get the cells that a ship occupies.
+
+        :param vector: Vector of the ship's first (leftmost or topmost)
+                       cell
+        :param size: Number of cells of the ship
+        :param horizontal: True if the ship extends to the right, False
+                           if it extends downwards
+        :return: Bitboard of the ship's cells
+        :raise ValueError: if the ship does not lie on the board
+        """
+        vector = vector.strip().lower()
+        if vector not in CELLS or size < 1:
+            raise ValueError(f'Invalid ship at {vector} of size {size}')
+
+        column = COLUMNS.index(vector[0])
+        row = int(vector[1:]) - 1
+        if horizontal:
+            fits = column + size <= len(COLUMNS)
+            step = 1
+        else:
+            fits = row + size <= ROWS
+            step = len(COLUMNS)
+        if not fits:
+            raise ValueError(f'Ship at {vector} of size {size} does not '
+                             f'fit on the board')
+
+        first = CELLS[vector]
+        cells = 0
+        for i in range(size):
+            cells |= first << (i * step)
+        return cells
+
+    @property
+    def remaining(self):
+        """Get the cells that hold a ship that has not been hit.
+
+        :return: Bitboard of the remaining cells
+        """
+        return self.__remaining
+
+    @property
+    def defeated(self):
+        """Have all ships been sunk?
+
+        :return: True if no cell holds a ship anymore, False otherwise
+        """
+        return self.__remaining == 0
+
+    def attack(self, vector):
+        """Resolve an attack on this board. A cell that has been hit
+        before, or that is not on the board, is a miss.
+
+        :param vector: Vector of the attacked cell, e.g., "G4"
+        :return: Status.State.HIT, MISS, or DEFEAT if the last ship was
+                 sunk
+        """
+        cell = CELLS.get(vector.strip().lower(), 0)
+        if not self.__remaining & cell:
+            return Status.State.MISS
+
+        self.__remaining &= ~cell
+        if self.__remaining == 0:
+            return Status.State.DEFEAT
+        return Status.State.HIT
@@ -5,9 +5,57 @@ logger = log.get_logger(__name__)
 
 
 class Game:
+    """A game from the view of a single player (as the Game server hosts
+    a Game instance for a single player at a time): the phase it is in,
+    which tells the requests of the client that are valid.
+
+    The phase changes on the requests of the client and the messages of
+    the game, see TRANSITIONS. A change is a single lookup, and an event
+    that is not valid in the current phase leaves it unchanged.
+    """
+    # Phases
+    WAITING = 'waiting'            # for an opponent to join
+    BEGUN = 'begun'                # waiting for the first turn
+    MY_ATTACK = 'my_attack'        # my turn, waiting for my attack
+    THEIR_REPORT = 'their_report'  # waiting for the report on my attack
+    THEIR_TURN = 'their_turn'      # waiting for an attack or my turn
+    MY_REPORT = 'my_report'        # waiting for my report on an attack
+    FINISHED = 'finished'
+
+    # Events: requests of this player's client...
+    ATTACK = 'attack'
+    REPORT = 'report'
+    # ...and messages of the game
+    BEGIN = 'begin'
+    START_TURN = 'start_turn'
+    STOP_TURN = 'stop_turn'
+    ATTACKED = 'attacked'
+    REPORTED = 'reported'
+    END = 'end'
+
+    # Phase after an event by phase and event. STOP_TURN ends the turn
+    # of this player after the report on its attack, or the turn that
+    # the player that joined never had after BEGIN.
+    TRANSITIONS = {
+        (WAITING, BEGIN): BEGUN,
+        (BEGUN, START_TURN): MY_ATTACK,
+        (BEGUN, STOP_TURN): THEIR_TURN,
+        (MY_ATTACK, ATTACK): THEIR_REPORT,
+        (THEIR_REPORT, REPORTED): THEIR_TURN,
+        (THEIR_TURN, STOP_TURN): THEIR_TURN,
+        (THEIR_TURN, ATTACKED): MY_REPORT,
+        (MY_REPORT, REPORT): THEIR_TURN,
+        (THEIR_TURN, START_TURN): MY_ATTACK,
+        (BEGUN, END): FINISHED,
+        (MY_ATTACK, END): FINISHED,
+        (THEIR_REPORT, END): FINISHED,
+        (THEIR_TURN, END): FINISHED,
+        (MY_REPORT, END): FINISHED,
+    }
+
     def __init__(self, _id):
         self.__id = _id
-        self.__my_turn = False
+        self.__phase = self.WAITING
         self.__lock = Lock()
 
     @property
@@ -18,25 +66,32 @@ class Game:
         """
         return self.__id
 
+    @property
+    def phase(self):
+        """Get the phase of the game.
+
+        :return: One of the phases, e.g., Game.MY_ATTACK
+        """
+        return self.__phase
+
     @property
     def my_turn(self):
         """Is it my turn?
 
         :return: True if it is my turn, False otherwise
         """
-        with self.__lock:
-            return self.__my_turn
+        return self.__phase in (self.MY_ATTACK, self.THEIR_REPORT)
 
-    def start_turn(self):
-        """Start turn for this player (as the Game server hosts a Game
-        instance for a single player at a time).
-        """
-        with self.__lock:
-            self.__my_turn = True
+    def advance(self, event):
+        """Move the game to the phase that follows an event, if the event
+        is valid in the current phase.
 
-    def end_turn(self):
-        """End turn for this player (as the Game server hosts a Game
-        instance for a single player at a time).
+        :param event: One of the events, e.g., Game.ATTACK
+        :return: True if the event was valid, False otherwise
         """
         with self.__lock:
-            self.__my_turn = False
+            phase = self.TRANSITIONS.get((self.__phase, event))
+            if phase is None:
+                return False
+            self.__phase = phase
+            return True
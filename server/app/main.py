@@ -1,34 +1,280 @@
+import asyncio
 import grpc
-import logging
 import os
+from dataclasses import dataclass
 from battleships_pb2_grpc import add_BattleshipsServicer_to_server
 from concurrent.futures import ThreadPoolExecutor
-from server import Battleship
+from aio_server import AsyncBattleship
+from message import Message
+from ratelimit import RateLimiter
+from server import MEMORY, PUBSUB, TRANSPORTS, Battleship
 import log
+import metrics
+import tracing
 
 logger = log.get_logger(__name__)
-logger.setLevel(logging.DEBUG)
 
+# Servicer implementations that can be selected with SERVER_MODE
+THREADED = 'threaded'
+ASYNCIO = 'asyncio'
 
-def main():
+# Streams (i.e., players) per CPU that a server accepts unless
+# MAX_STREAMS is set. A stream of the threaded server occupies a worker
+# thread (and another thread) for the length of the game; a stream of
+# the asyncio server is a coroutine.
+STREAMS_PER_CPU = {THREADED: 25, ASYNCIO: 250}
+
+# Worker threads of the threaded server in addition to one per stream,
+# so a new stream does not wait for a worker but is admitted or rejected
+# right away
+SPARE_WORKERS = 4
+
+# Requests per second and burst of a stream unless RATE_LIMIT and
+# RATE_BURST are set. A client that waits for the responses to its
+# requests stays well below; one that floods the server is slowed down
+# and disconnected.
+RATE_LIMIT = 100
+RATE_BURST = 20
+
+# Let several server processes listen on the same port, see supervisor.py
+SERVER_OPTIONS = [('grpc.so_reuseport', 1)]
+
+
+def cpus():
+    """Get the number of CPUs this process may run on.
+
+    :return: Number of CPUs
+    """
+    if hasattr(os, 'sched_getaffinity'):
+        return len(os.sched_getaffinity(0))
+    return os.cpu_count() or 1
+
+
+def capacity(server_mode, processes=1):
+    """Get the maximum number of concurrent streams and the number of
+    worker threads of a server process from the environment variables
+    MAX_STREAMS and WORKERS. Values that are not set are derived from
+    the number of CPUs per process; the threaded server never accepts
+    more streams than it has workers for.
+
+    :param server_mode: THREADED or ASYNCIO
+    :param processes: Number of server processes that share the CPUs
+    :return: Tuple of the maximum number of streams and the number of
+             workers
+    :raise ValueError: if a value is not a positive number
+    """
+    max_streams = os.getenv('MAX_STREAMS', '')
+    workers = os.getenv('WORKERS', '')
+
+    if max_streams:
+        max_streams = int(max_streams)
+    else:
+        max_streams = STREAMS_PER_CPU.get(server_mode, 1) \
+            * max(cpus() // processes, 1)
+    if workers:
+        workers = int(workers)
+        if server_mode == THREADED:
+            max_streams = min(max_streams, workers - SPARE_WORKERS)
+    else:
+        workers = max_streams + SPARE_WORKERS
+
+    if max_streams < 1 or workers < 1:
+        raise ValueError('MAX_STREAMS and WORKERS must be positive')
+    return max_streams, workers
+
+
+def rate_limits():
+    """Get the request budgets of the streams from the environment
+    variables RATE_LIMIT and RATE_BURST (per stream), and
+    ADDRESS_RATE_LIMIT and ADDRESS_RATE_BURST (shared by the streams
+    from the same source address). A rate of 0 turns a budget off; the
+    budget per address is off by default.
+
+    :return: RateLimiter with the budgets
+    :raise ValueError: if a value is not a number, a rate is negative or
+                       a burst less than 1
+    """
+    rate = float(os.getenv('RATE_LIMIT', '') or RATE_LIMIT)
+    burst = int(os.getenv('RATE_BURST', '') or RATE_BURST)
+    address_rate = float(os.getenv('ADDRESS_RATE_LIMIT', '') or 0)
+    address_burst = int(os.getenv('ADDRESS_RATE_BURST', '') or burst)
+    return RateLimiter(rate, burst, address_rate, address_burst)
+
+
+def serve_threaded(serve_port, redis_host, redis_port, transport=PUBSUB,
+                   max_streams=None, workers=None, limiter=None):
+    """Run the Battleship server with a thread per gRPC stream.
+
+    :param serve_port: Port to accept gRPC connections on
+    :param redis_host: Hostname of Redis instance
+    :param redis_port: Port of Redis instance
+    :param transport: Transport between the servers
+    :param max_streams: Maximum number of concurrent streams
+    :param workers: Number of worker threads
+    :param limiter: RateLimiter with the request budgets of the streams
+    :raise ConnectionError: if connection to Redis fails
+    """
+    if max_streams is None or workers is None:
+        max_streams, workers = capacity(THREADED)
+
+    battleship = Battleship(redis_host, redis_port, transport=transport,
+                            max_streams=max_streams, limiter=limiter)
+    # gRPC itself rejects the calls that would otherwise wait for a
+    # worker, e.g., if all spare workers are busy rejecting streams
+    server = grpc.server(ThreadPoolExecutor(max_workers=workers),
+                         options=SERVER_OPTIONS,
+                         maximum_concurrent_rpcs=workers)
+    metrics.WORKER_POOL_SIZE.set(workers)
+    metrics.MAX_STREAMS.set(max_streams)
+    add_BattleshipsServicer_to_server(battleship, server)
+
+    logger.info(f'Starting threaded server on port {serve_port} with '
+                f'{workers} workers for {max_streams} streams')
+
+    server.add_insecure_port(f'[::]:{serve_port}')
+    server.start()
+    server.wait_for_termination()
+
+
+async def serve_asyncio(serve_port, redis_host, redis_port,
+                        transport=PUBSUB, max_streams=None, limiter=None):
+    """Run the Battleship server with a coroutine per gRPC stream.
+
+    :param serve_port: Port to accept gRPC connections on
+    :param redis_host: Hostname of Redis instance
+    :param redis_port: Port of Redis instance
+    :param transport: Transport between the servers
+    :param max_streams: Maximum number of concurrent streams
+    :param limiter: RateLimiter with the request budgets of the streams
+    :raise ConnectionError: if connection to Redis fails
+    """
+    if max_streams is None:
+        max_streams, _ = capacity(ASYNCIO)
+
+    battleship = AsyncBattleship(redis_host, redis_port, transport=transport,
+                                 max_streams=max_streams, limiter=limiter)
+    metrics.MAX_STREAMS.set(max_streams)
+    if not await battleship.ping_redis():
+        raise ConnectionError('Unable to connect to Redis server!')
+    await battleship.start()
+
+    server = grpc.aio.server(options=SERVER_OPTIONS)
+    add_BattleshipsServicer_to_server(battleship, server)
+
+    logger.info(f'Starting asyncio server on port {serve_port} for '
+                f'{max_streams} streams')
+
+    server.add_insecure_port(f'[::]:{serve_port}')
+    await server.start()
+    await server.wait_for_termination()
+
+
+@dataclass
+class Settings:
+    """Settings of a server process, read from the environment.
+    """
+    server_mode: str
+    serve_port: str
+    redis_host: str
+    redis_port: str
+    transport: str
+    metrics_port: str
+    max_streams: int
+    workers: int
+    limiter: RateLimiter
+
+
+def setup(processes=1):
+    """Read the settings from the environment variables and apply the
+    ones that hold for the whole process, like the message format. The
+    process exits if a setting is invalid.
+
+    :param processes: Number of server processes that share the host
+    :return: Settings of the server
+    """
     serve_port = os.getenv('PORT', '50051')
     redis_host = os.getenv('REDIS_HOST', 'localhost')
     redis_port = os.getenv('REDIS_PORT', '6379')
+    server_mode = os.getenv('SERVER_MODE', THREADED)
+    message_format = os.getenv('MESSAGE_FORMAT', Message.BINARY)
+    transport = os.getenv('TRANSPORT', PUBSUB)
+    metrics_port = os.getenv('METRICS_PORT', '8000')
+
+    try:
+        Message.use_format(message_format)
+    except ValueError:
+        logger.fatal(f'Unknown MESSAGE_FORMAT {message_format}!')
+        exit(1)
+
+    if transport not in TRANSPORTS:
+        logger.fatal(f'Unknown TRANSPORT {transport}!')
+        exit(1)
+
+    # Games are only matched within a process without Redis
+    if transport == MEMORY and processes > 1:
+        logger.fatal(f'TRANSPORT {transport} needs a single process!')
+        exit(1)
 
     try:
-        battleship = Battleship(redis_host, redis_port)
-        server = grpc.server(ThreadPoolExecutor(max_workers=20))
-        add_BattleshipsServicer_to_server(battleship, server)
+        tracing.configure_from_env()
+    except ValueError:
+        logger.fatal(f'Unknown TRACE_EXPORTER {os.getenv("TRACE_EXPORTER")}!')
+        exit(1)
 
-        logger.info(f'Starting server on port {serve_port}')
+    if server_mode not in (THREADED, ASYNCIO):
+        logger.fatal(f'Unknown SERVER_MODE {server_mode}!')
+        exit(1)
 
-        server.add_insecure_port(f'[::]:{serve_port}')
-        server.start()
-        server.wait_for_termination()
+    try:
+        max_streams, workers = capacity(server_mode, processes)
+    except ValueError:
+        logger.fatal('MAX_STREAMS and WORKERS must be positive numbers, '
+                     'and WORKERS must leave room for a stream!')
+        exit(1)
+
+    try:
+        limiter = rate_limits()
+    except ValueError:
+        logger.fatal('RATE_LIMIT and ADDRESS_RATE_LIMIT must be numbers '
+                     'that are not negative, and RATE_BURST and '
+                     'ADDRESS_RATE_BURST whole numbers of at least 1!')
+        exit(1)
+
+    return Settings(server_mode, serve_port, redis_host, redis_port,
+                    transport, metrics_port, max_streams, workers, limiter)
+
+
+def serve(settings):
+    """Run the Battleship server until it is terminated. The process
+    exits if Redis cannot be reached.
+
+    :param settings: Settings from :func:`setup`
+    """
+    try:
+        if settings.server_mode == ASYNCIO:
+            asyncio.run(serve_asyncio(settings.serve_port,
+                                      settings.redis_host,
+                                      settings.redis_port,
+                                      settings.transport,
+                                      settings.max_streams,
+                                      settings.limiter))
+        else:
+            serve_threaded(settings.serve_port, settings.redis_host,
+                           settings.redis_port, settings.transport,
+                           settings.max_streams, settings.workers,
+                           settings.limiter)
     except ConnectionError:
         logger.fatal('Unable to reach Redis server!')
         exit(1)
 
 
+def main():
+    settings = setup()
+    if settings.metrics_port:
+        metrics.start_http_server(int(settings.metrics_port),
+                                  registry=metrics.REGISTRY)
+    serve(settings)
+
+
 if __name__ == '__main__':
     main()
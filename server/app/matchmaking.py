@@ -0,0 +1,393 @@
+import asyncio
+import threading
+import time
+import log
+import metrics
+
+logger = log.get_logger(__name__)
+
+# Take the open game that is still alive and has waited the longest
+# since its last heartbeat. Games whose deadline has passed were
+# abandoned and are never looked at, no matter how many there are.
+#
+# KEYS[1]: sorted set of open games, scored by deadline
+# ARGV[1]: current time
+CLAIM_SCRIPT = """
+local games = redis.call('ZRANGEBYSCORE', KEYS[1], ARGV[1], '+inf',
+                         'LIMIT', 0, 1)
+if #games == 0 then
+    return nil
+end
+redis.call('ZREM', KEYS[1], games[1])
+return games[1]
+"""
+
+# Remove at most ARGV[2] open games whose deadline has passed, so a
+# single sweep never blocks Redis for long.
+#
+# KEYS[1]: sorted set of open games, scored by deadline
+# ARGV[1]: current time
+# ARGV[2]: maximum number of games to remove
+SWEEP_SCRIPT = """
+local games = redis.call('ZRANGEBYSCORE', KEYS[1], '-inf', '(' .. ARGV[1],
+                         'LIMIT', 0, tonumber(ARGV[2]))
+if #games == 0 then
+    return 0
+end
+return redis.call('ZREM', KEYS[1], unpack(games))
+"""
+
+
+class Matchmaker:
+    """Keep track of the open games and the games in progress in Redis.
+
+    Open games are kept in a sorted set, scored by the time at which
+    they expire unless the creator refreshes them. A single thread per
+    process refreshes the deadlines of all games that are waiting for an
+    opponent, so when a process dies, its open games expire and are
+    skipped by other players. The same thread sweeps expired games out
+    of the set in batches.
+
+    A game in progress has a key of its own, which the player that
+    joined sets before the game begins and the first player to leave
+    deletes. It tells spectators which games they can watch, and expires
+    in case the servers of both players die.
+    """
+    OpenGames = 'openGames'
+    GamePrefix = 'game:'
+
+    # Seconds until an open game expires without a heartbeat
+    TTL = 10
+
+    # Seconds until a game in progress expires
+    GAME_TTL = 3600
+
+    # Seconds between sweeps and the maximum number of games removed
+    # by a single call of the sweep script
+    SWEEP_INTERVAL = 30
+    SWEEP_BATCH = 500
+
+    def __init__(self, _redis, ttl=TTL):
+        self.__r = _redis
+        self.__ttl = ttl
+        self.__claim = _redis.register_script(CLAIM_SCRIPT)
+        self.__sweep = _redis.register_script(SWEEP_SCRIPT)
+
+        self.__games = set()
+        self.__cond = threading.Condition()
+        self.__running = False
+        self.__added = False
+        self.__thread = None
+
+    def start(self):
+        """Start the thread that refreshes the open games and sweeps
+        expired ones.
+        """
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stop the thread that refreshes the open games.
+        """
+        if self.__thread is None:
+            return
+
+        with self.__cond:
+            self.__running = False
+            self.__cond.notify()
+        self.__thread.join()
+        self.__thread = None
+
+    def claim_open_game(self):
+        """Atomically take an open game whose creator is still waiting.
+
+        :return: ID of the game or None if no open game was found
+        """
+        b_game_id = self.__claim(keys=[self.OpenGames], args=[time.time()])
+        if b_game_id is None:
+            return None
+        return b_game_id.decode('utf-8')
+
+    def add_open_game(self, game_id):
+        """Advertise a game so it can be claimed by another player.
+
+        :param game_id: ID of the game
+        :return: True if successful, False otherwise
+        """
+        deadline = time.time() + self.__ttl
+        n = self.__r.zadd(self.OpenGames, {game_id: deadline})
+
+        # Wake up the thread, as it may be waiting for the next sweep
+        # instead of the next heartbeat
+        with self.__cond:
+            if game_id not in self.__games:
+                metrics.OPEN_GAMES.inc()
+            self.__games.add(game_id)
+            self.__added = True
+            self.__cond.notify()
+
+        return n > 0
+
+    def close_open_game(self, game_id):
+        """Remove a game so it can no longer be claimed.
+
+        :param game_id: ID of the game
+        """
+        if self.claimed(game_id):
+            self.__r.zrem(self.OpenGames, game_id)
+
+    def claimed(self, game_id):
+        """Stop refreshing a game of this process that an opponent has
+        joined. Claiming took it out of Redis already.
+
+        :param game_id: ID of the game
+        :return: True if the game was open, False otherwise
+        """
+        with self.__cond:
+            if game_id not in self.__games:
+                return False
+            self.__games.discard(game_id)
+        metrics.OPEN_GAMES.dec()
+        return True
+
+    def begin_game(self, game_id):
+        """Register a game as in progress, so it can be watched. It is
+        called once per game, by the player that joined it.
+
+        :param game_id: ID of the game
+        """
+        self.__r.set(self.GamePrefix + game_id, '', ex=self.GAME_TTL)
+
+    def end_game(self, game_id):
+        """Remove a game from the games in progress. It is called by
+        both players when they leave, whether the game has begun or not.
+
+        :param game_id: ID of the game
+        """
+        self.__r.delete(self.GamePrefix + game_id)
+
+    def game_exists(self, game_id):
+        """Check whether a game is in progress.
+
+        :param game_id: ID of the game
+        :return: True if the game is in progress, False otherwise
+        """
+        return self.__r.exists(self.GamePrefix + game_id) > 0
+
+    def refresh(self):
+        """Move the deadlines of the open games of this process forward.
+        Games that have been claimed in the meantime are not added again.
+        """
+        with self.__cond:
+            games = list(self.__games)
+        if not games:
+            return
+
+        deadline = time.time() + self.__ttl
+        self.__r.zadd(self.OpenGames, dict.fromkeys(games, deadline),
+                      xx=True)
+
+    def sweep(self, batch=SWEEP_BATCH):
+        """Remove expired open games, in batches.
+
+        :param batch: Maximum number of games removed per call to Redis
+        :return: Number of games removed
+        """
+        removed = 0
+        while True:
+            n = self.__sweep(keys=[self.OpenGames], args=[time.time(), batch])
+            removed += n
+            if n < batch:
+                return removed
+
+    def __run(self):
+        """Refresh the open games of this process regularly and sweep
+        expired games once in a while.
+        """
+        next_sweep = 0
+        while True:
+            try:
+                self.refresh()
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+                    n = self.sweep()
+                    if n:
+                        logger.info('Swept %s abandoned open games', n)
+            except Exception:
+                logger.exception('Unable to maintain open games')
+
+            with self.__cond:
+                timeout = self.__ttl / 3 if self.__games \
+                    else self.SWEEP_INTERVAL
+                self.__cond.wait_for(
+                    lambda: not self.__running or self.__added, timeout)
+                if not self.__running:
+                    return
+                self.__added = False
+
+
+class AsyncMatchmaker:
+    """The asyncio counterpart of :class:`Matchmaker`. A single task
+    refreshes the open games and sweeps expired ones.
+    """
+    OpenGames = Matchmaker.OpenGames
+    GamePrefix = Matchmaker.GamePrefix
+    TTL = Matchmaker.TTL
+    GAME_TTL = Matchmaker.GAME_TTL
+    SWEEP_INTERVAL = Matchmaker.SWEEP_INTERVAL
+    SWEEP_BATCH = Matchmaker.SWEEP_BATCH
+
+    def __init__(self, _redis, ttl=TTL):
+        self.__r = _redis
+        self.__ttl = ttl
+        self.__claim = _redis.register_script(CLAIM_SCRIPT)
+        self.__sweep = _redis.register_script(SWEEP_SCRIPT)
+
+        self.__games = set()
+        self.__running = False
+        self.__added = None
+        self.__task = None
+
+    async def start(self):
+        """Start the task that refreshes the open games and sweeps
+        expired ones.
+        """
+        self.__running = True
+        self.__added = asyncio.Event()
+        self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self):
+        """Stop the task that refreshes the open games. The task is
+        woken up rather than cancelled, because a Redis client may take
+        a cancellation during a command for a connection error.
+        """
+        if self.__task is None:
+            return
+
+        self.__running = False
+        self.__added.set()
+        await self.__task
+        self.__task = None
+
+    async def claim_open_game(self):
+        """Atomically take an open game whose creator is still waiting.
+
+        :return: ID of the game or None if no open game was found
+        """
+        b_game_id = await self.__claim(keys=[self.OpenGames],
+                                       args=[time.time()])
+        if b_game_id is None:
+            return None
+        return b_game_id.decode('utf-8')
+
+    async def add_open_game(self, game_id):
+        """Advertise a game so it can be claimed by another player.
+
+        :param game_id: ID of the game
+        :return: True if successful, False otherwise
+        """
+        deadline = time.time() + self.__ttl
+        n = await self.__r.zadd(self.OpenGames, {game_id: deadline})
+
+        # Wake up the task, as it may be waiting for the next sweep
+        # instead of the next heartbeat
+        if game_id not in self.__games:
+            metrics.OPEN_GAMES.inc()
+        self.__games.add(game_id)
+        self.__added.set()
+
+        return n > 0
+
+    async def close_open_game(self, game_id):
+        """Remove a game so it can no longer be claimed.
+
+        :param game_id: ID of the game
+        """
+        if self.claimed(game_id):
+            await self.__r.zrem(self.OpenGames, game_id)
+
+    def claimed(self, game_id):
+        """Stop refreshing a game of this process that an opponent has
+        joined. Claiming took it out of Redis already.
+
+        :param game_id: ID of the game
+        :return: True if the game was open, False otherwise
+        """
+        if game_id not in self.__games:
+            return False
+        self.__games.discard(game_id)
+        metrics.OPEN_GAMES.dec()
+        return True
+
+    async def begin_game(self, game_id):
+        """Register a game as in progress, so it can be watched.
+
+        :param game_id: ID of the game
+        """
+        await self.__r.set(self.GamePrefix + game_id, '', ex=self.GAME_TTL)
+
+    async def end_game(self, game_id):
+        """Remove a game from the games in progress.
+
+        :param game_id: ID of the game
+        """
+        await self.__r.delete(self.GamePrefix + game_id)
+
+    async def game_exists(self, game_id):
+        """Check whether a game is in progress.
+
+        :param game_id: ID of the game
+        :return: True if the game is in progress, False otherwise
+        """
+        return await self.__r.exists(self.GamePrefix + game_id) > 0
+
+    async def refresh(self):
+        """Move the deadlines of the open games of this process forward.
+        Games that have been claimed in the meantime are not added again.
+        """
+        if not self.__games:
+            return
+
+        deadline = time.time() + self.__ttl
+        await self.__r.zadd(self.OpenGames,
+                            dict.fromkeys(self.__games, deadline), xx=True)
+
+    async def sweep(self, batch=SWEEP_BATCH):
+        """Remove expired open games, in batches.
+
+        :param batch: Maximum number of games removed per call to Redis
+        :return: Number of games removed
+        """
+        removed = 0
+        while True:
+            n = await self.__sweep(keys=[self.OpenGames],
+                                   args=[time.time(), batch])
+            removed += n
+            if n < batch:
+                return removed
+
+    async def __run(self):
+        """Refresh the open games of this process regularly and sweep
+        expired games once in a while.
+        """
+        next_sweep = 0
+        while True:
+            try:
+                await self.refresh()
+                if time.monotonic() >= next_sweep:
+                    next_sweep = time.monotonic() + self.SWEEP_INTERVAL
+                    n = await self.sweep()
+                    if n:
+                        logger.info('Swept %s abandoned open games', n)
+            except Exception:
+                logger.exception('Unable to maintain open games')
+
+            timeout = self.__ttl / 3 if self.__games else self.SWEEP_INTERVAL
+            try:
+                await asyncio.wait_for(self.__added.wait(), timeout)
+            except asyncio.TimeoutError:
+                pass
+            if not self.__running:
+                return
+            self.__added.clear()
@@ -0,0 +1,312 @@
+import threading
+import time
+import log
+import metrics
+from router import players
+
+logger = log.get_logger(__name__)
+
+
+class MemoryDispatcher:
+    """An in-process transport with the same interface as
+    :class:`pubsub.PubSubDispatcher`, for a single server process that
+    does without Redis. Both players of every game are connected to this
+    process, so the messages of games that have begun are delivered by
+    the :class:`router.LocalRouter`; this dispatcher only sees messages
+    of games with a single player, e.g., after the opponent has left.
+
+    A message is handed to the handlers of its channel in the thread
+    that publishes it, which is the writer's thread for all messages but
+    the BEGIN of :meth:`server._Server.connect_game`. The handlers of a
+    channel are kept in a tuple that is replaced rather than changed, so
+    publishing reads them without taking a lock; only subscribing and
+    unsubscribing do.
+    """
+
+    def __init__(self):
+        self.__handlers = {}
+        self.__lock = threading.Lock()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def subscribe(self, channel, handler, timeout=None):
+        """Register a handler for messages published on a channel.
+
+        :param channel: Channel to subscribe to
+        :param handler: Callable that is called with each Message
+        :param timeout: Not used, there is nothing to wait for
+        :return: True
+        """
+        with self.__lock:
+            handlers = self.__handlers.get(channel, ())
+            if not handlers:
+                logger.info('Subscribing to channel %s', channel)
+            self.__handlers[channel] = handlers + (handler,)
+        return True
+
+    def unsubscribe(self, channel, handler):
+        """Remove a handler that was registered with :meth:`subscribe`.
+
+        :param channel: Channel the handler was subscribed to
+        :param handler: Handler to remove
+        """
+        with self.__lock:
+            handlers = list(self.__handlers.get(channel, ()))
+            if handler in handlers:
+                handlers.remove(handler)
+            if handlers:
+                self.__handlers[channel] = tuple(handlers)
+            elif self.__handlers.pop(channel, None) is not None:
+                logger.info('Unsubscribing from channel %s', channel)
+
+    def handlers(self, channel):
+        """Get the handlers in this process for a channel.
+
+        :param channel: Channel to check
+        :return: List of handlers registered for the channel
+        """
+        return list(self.__handlers.get(channel, ()))
+
+    def publish(self, channel, message):
+        """Hand a message to the handlers of a channel.
+
+        :param channel: Channel to use
+        :param message: Message to publish
+        :return: Number of players that received the message, as Redis
+                 counts the servers of the players
+        """
+        handlers = self.__handlers.get(channel, ())
+        if message.sent is not None:
+            metrics.DELIVERY_LAG_SECONDS.observe(time.time() - message.sent)
+
+        for handler in handlers:
+            try:
+                handler(message)
+            except Exception:
+                logger.exception('Handler for %s failed', channel)
+        return players(handlers)
+
+    def publish_batch(self, items):
+        """Hand several messages to the handlers of their channels.
+
+        :param items: List of (channel, Message) tuples, in order
+        """
+        for channel, message in items:
+            self.publish(channel, message)
+
+
+class MemoryMatchmaker:
+    """Keep track of the open games and the games in progress of a
+    single server process, with the same interface as
+    :class:`matchmaking.Matchmaker`.
+
+    The open games are kept in a dict in the order in which they were
+    opened, so the game that has waited longest is claimed first. Every
+    operation is a single call on a dict or set, which the GIL makes
+    atomic, so no lock is needed. Games do not expire: their players are
+    in this process and remove them when they leave.
+    """
+
+    def __init__(self):
+        self.__games = {}
+        self.__playing = set()
+
+    def start(self):
+        pass
+
+    def stop(self):
+        pass
+
+    def claim_open_game(self):
+        """Take the open game that has waited longest.
+
+        :return: ID of the game or None if no open game was found
+        """
+        while self.__games:
+            try:
+                game_id = next(iter(self.__games))
+            except (RuntimeError, StopIteration):
+                # Changed by another thread in the meantime
+                continue
+            if self.__games.pop(game_id, None) is not None:
+                metrics.OPEN_GAMES.dec()
+                return game_id
+        return None
+
+    def add_open_game(self, game_id):
+        """Advertise a game so it can be claimed by another player. It
+        is called once per game, by its creator.
+
+        :param game_id: ID of the game
+        :return: True
+        """
+        self.__games[game_id] = True
+        metrics.OPEN_GAMES.inc()
+        return True
+
+    def close_open_game(self, game_id):
+        """Remove a game so it can no longer be claimed. It is called
+        once per game, by its creator, also if the game was claimed.
+
+        :param game_id: ID of the game
+        """
+        if self.__games.pop(game_id, None) is not None:
+            metrics.OPEN_GAMES.dec()
+
+    def claimed(self, game_id):
+        """Called by the creator of a game once an opponent has joined
+        it. Claiming took it out of the open games already.
+
+        :param game_id: ID of the game
+        :return: False
+        """
+        return False
+
+    def begin_game(self, game_id):
+        """Register a game as in progress, so it can be watched.
+
+        :param game_id: ID of the game
+        """
+        self.__playing.add(game_id)
+
+    def end_game(self, game_id):
+        """Remove a game from the games in progress.
+
+        :param game_id: ID of the game
+        """
+        self.__playing.discard(game_id)
+
+    def game_exists(self, game_id):
+        """Check whether a game is in progress.
+
+        :param game_id: ID of the game
+        :return: True if the game is in progress, False otherwise
+        """
+        return game_id in self.__playing
+
+
+class AsyncMemoryDispatcher:
+    """The asyncio counterpart of :class:`MemoryDispatcher`.
+    """
+
+    def __init__(self):
+        self.__dispatcher = MemoryDispatcher()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def subscribe(self, channel, handler, timeout=None):
+        """Register a handler for messages published on a channel.
+
+        :param channel: Channel to subscribe to
+        :param handler: Callable that is called with each Message
+        :param timeout: Not used, there is nothing to wait for
+        :return: True
+        """
+        return self.__dispatcher.subscribe(channel, handler)
+
+    async def unsubscribe(self, channel, handler):
+        """Remove a handler that was registered with :meth:`subscribe`.
+
+        :param channel: Channel the handler was subscribed to
+        :param handler: Handler to remove
+        """
+        self.__dispatcher.unsubscribe(channel, handler)
+
+    def handlers(self, channel):
+        """Get the handlers in this process for a channel.
+
+        :param channel: Channel to check
+        :return: List of handlers registered for the channel
+        """
+        return self.__dispatcher.handlers(channel)
+
+    async def publish(self, channel, message):
+        """Hand a message to the handlers of a channel.
+
+        :param channel: Channel to use
+        :param message: Message to publish
+        :return: Number of players that received the message
+        """
+        return self.__dispatcher.publish(channel, message)
+
+    async def publish_batch(self, items):
+        """Hand several messages to the handlers of their channels.
+
+        :param items: List of (channel, Message) tuples, in order
+        """
+        self.__dispatcher.publish_batch(items)
+
+
+class AsyncMemoryMatchmaker:
+    """The asyncio counterpart of :class:`MemoryMatchmaker`.
+    """
+
+    def __init__(self):
+        self.__matchmaker = MemoryMatchmaker()
+
+    async def start(self):
+        pass
+
+    async def stop(self):
+        pass
+
+    async def claim_open_game(self):
+        """Take the open game that has waited longest.
+
+        :return: ID of the game or None if no open game was found
+        """
+        return self.__matchmaker.claim_open_game()
+
+    async def add_open_game(self, game_id):
+        """Advertise a game so it can be claimed by another player.
+
+        :param game_id: ID of the game
+        :return: True
+        """
+        return self.__matchmaker.add_open_game(game_id)
+
+    async def close_open_game(self, game_id):
+        """Remove a game so it can no longer be claimed.
+
+        :param game_id: ID of the game
+        """
+        self.__matchmaker.close_open_game(game_id)
+
+    def claimed(self, game_id):
+        """Called by the creator of a game once an opponent has joined
+        it, see :meth:`MemoryMatchmaker.claimed`.
+
+        :param game_id: ID of the game
+        :return: False
+        """
+        return self.__matchmaker.claimed(game_id)
+
+    async def begin_game(self, game_id):
+        """Register a game as in progress, so it can be watched.
+
+        :param game_id: ID of the game
+        """
+        self.__matchmaker.begin_game(game_id)
+
+    async def end_game(self, game_id):
+        """Remove a game from the games in progress.
+
+        :param game_id: ID of the game
+        """
+        self.__matchmaker.end_game(game_id)
+
+    async def game_exists(self, game_id):
+        """Check whether a game is in progress.
+
+        :param game_id: ID of the game
+        :return: True if the game is in progress, False otherwise
+        """
+        return self.__matchmaker.game_exists(game_id)
@@ -1,5 +1,7 @@
 import json
-from dataclasses import dataclass
+import math
+import struct
+from dataclasses import dataclass, field
 
 
 @dataclass
@@ -11,10 +13,21 @@ class Message:
     are in fact playing the same game. Please note that no validation
     takes place as to whether the provided {type} is valid even though
     message types (BEGIN, etc.) are provided for convenience.
+
+    Messages are sent in a compact binary format (see :meth:`encode`)
+    or as JSON (see :meth:`dumps`). :meth:`recreate` accepts both.
+
+    The optional {sent} timestamp (seconds since the epoch) records when
+    the message was queued for Redis, so receivers can measure the
+    delivery lag. The optional {trace} holds the trace context of the
+    hop that sent the message (see tracing.py). Neither is taken into
+    account when comparing messages.
     """
     type: str
     player: str
     data: str
+    sent: float = field(default=None, compare=False)
+    trace: str = field(default=None, compare=False)
 
     # Messages types (no validation is performed)
     BEGIN = 'begin'
@@ -23,29 +36,165 @@ class Message:
     STATUS = 'status'
     LOST = 'lost'
 
+    # Sent by a server whose spectators start watching a game. It has no
+    # type code, so it is sent as JSON, which older servers can read.
+    WATCH = 'watch'
+
+    # Wire formats
+    BINARY = 'binary'
+    JSON = 'json'
+
+    # Format used by :meth:`pack`
+    wire_format = BINARY
+
     def dumps(self):
         """Create a JSON object that can be used to send the message
         to a Redis instance.
 
         :return: JSON encoded string
         """
-        return json.dumps({
+        d = {
             'type': self.type,
             'player': self.player,
             'data': self.data,
-        })
+        }
+        if self.sent is not None:
+            d['sent'] = self.sent
+        if self.trace is not None:
+            d['trace'] = self.trace
+        return json.dumps(d)
+
+    def encode(self):
+        """Create a binary representation of the message that can be
+        used to send the message to a Redis instance. It consists of a
+        version byte, a byte for the message type, the lengths of the
+        player and data fields, the timestamp if the message has one
+        (version 2) and the fields themselves (UTF-8). Messages with a
+        trace context (version 3) also have its length and the context
+        itself, before the other fields.
+
+        Message types without a type code and fields that are too long
+        are encoded as JSON.
+
+        :return: Binary encoded message
+        """
+        code = _TYPE_CODES.get(self.type)
+        if code is None:
+            return self.dumps().encode('utf-8')
+
+        player = self.player.encode('utf-8')
+        data = self.data.encode('utf-8')
+        try:
+            if self.trace is not None:
+                trace = self.trace.encode('utf-8')
+                sent = math.nan if self.sent is None else self.sent
+                header = _HEADER_TRACE.pack(_VERSION_TRACE, code, len(player),
+                                            len(data), sent, len(trace))
+                return header + trace + player + data
+            if self.sent is None:
+                header = _HEADER.pack(_VERSION, code, len(player), len(data))
+            else:
+                header = _HEADER_SENT.pack(_VERSION_SENT, code, len(player),
+                                           len(data), self.sent)
+        except struct.error:
+            # Fields too long for the header
+            return self.dumps().encode('utf-8')
+        return header + player + data
+
+    def pack(self):
+        """Serialize the message in the configured wire format.
+
+        :return: Serialized message
+        """
+        if Message.wire_format == Message.JSON:
+            return self.dumps()
+        return self.encode()
+
+    @staticmethod
+    def use_format(wire_format):
+        """Select the wire format used by :meth:`pack`. Servers can
+        decode both formats, so a deployment can first roll out servers
+        that still send JSON and then switch to binary.
+
+        :param wire_format: Message.BINARY or Message.JSON
+        :raise ValueError: if the format is unknown
+        """
+        if wire_format not in (Message.BINARY, Message.JSON):
+            raise ValueError(f'Unknown wire format {wire_format}')
+        Message.wire_format = wire_format
 
     @staticmethod
     def recreate(s):
         """Recreate Message object from serialized string as it might
-        be received from a Redis instance.
+        be received from a Redis instance. Both the binary and the JSON
+        encoding are accepted.
 
-        :param s: the JSON encoded string
-        :return: Message object as recreated from the JSON string
-        :raise ValueError: if the JSON string cannot be parsed
+        :param s: the binary or JSON encoded string
+        :return: Message object as recreated from the string
+        :raise ValueError: if the string cannot be parsed
         """
+        if isinstance(s, bytes) and s[:1] in _VERSION_BYTES:
+            try:
+                trace = None
+                if s[:1] == _VERSION_BYTE:
+                    _, code, n_player, n_data = _HEADER.unpack_from(s)
+                    sent, start = None, _HEADER.size
+                elif s[:1] == _VERSION_SENT_BYTE:
+                    _, code, n_player, n_data, sent = \
+                        _HEADER_SENT.unpack_from(s)
+                    start = _HEADER_SENT.size
+                else:
+                    _, code, n_player, n_data, sent, n_trace = \
+                        _HEADER_TRACE.unpack_from(s)
+                    start = _HEADER_TRACE.size + n_trace
+                    trace = s[_HEADER_TRACE.size:start].decode('utf-8')
+                    if math.isnan(sent):
+                        sent = None
+                end = start + n_player
+                if len(s) != end + n_data:
+                    raise ValueError()
+                return Message(_TYPES[code],
+                               s[start:end].decode('utf-8'),
+                               s[end:end + n_data].decode('utf-8'),
+                               sent, trace)
+            except (struct.error, IndexError, UnicodeDecodeError):
+                raise ValueError()
+
         d = json.loads(s)
         try:
-            return Message(d['type'], d['player'], d['data'])
-        except KeyError:
+            return Message(d['type'], d['player'], d['data'], d.get('sent'),
+                           d.get('trace'))
+        except (KeyError, TypeError):
+            # Not an object, or one without the fields of a message
             raise ValueError()
+
+
+# Versions of the binary format. They must never be the first byte of
+# a JSON encoded message ('{'). Version 2 adds the timestamp, version 3
+# the trace context.
+_VERSION = 1
+_VERSION_SENT = 2
+_VERSION_TRACE = 3
+_VERSION_BYTE = bytes([_VERSION])
+_VERSION_SENT_BYTE = bytes([_VERSION_SENT])
+_VERSION_BYTES = (_VERSION_BYTE, _VERSION_SENT_BYTE, bytes([_VERSION_TRACE]))
+
+# Version, type code, length of player and length of data
+_HEADER = struct.Struct('!BBHH')
+
+# Version, type code, length of player, length of data and timestamp
+_HEADER_SENT = struct.Struct('!BBHHd')
+
+# Version, type code, length of player, length of data, timestamp (NaN
+# if there is none) and length of the trace context
+_HEADER_TRACE = struct.Struct('!BBHHdB')
+
+# Message types in order of their type code
+_TYPES = (
+    Message.BEGIN,
+    Message.STOP_TURN,
+    Message.ATTACK,
+    Message.STATUS,
+    Message.LOST,
+)
+_TYPE_CODES = {t: code for code, t in enumerate(_TYPES)}
@@ -0,0 +1,91 @@
+from prometheus_client import (CONTENT_TYPE_LATEST, CollectorRegistry,
+                               Counter, Gauge, Histogram,
+                               disable_created_metrics, start_http_server)
+
+# The creation time of a series is of no use for alerts, and the
+# supervisor could not add it up over its server processes
+disable_created_metrics()
+
+# Content type of the Prometheus text exposition format
+CONTENT_TYPE = CONTENT_TYPE_LATEST
+
+# Upper bounds (seconds) of the buckets of latency histograms
+LATENCY_BUCKETS = (0.0005, 0.001, 0.0025, 0.005, 0.01, 0.025, 0.05, 0.1,
+                   0.25, 0.5, 1.0, 2.5)
+
+# Upper bounds of the buckets of the response queue depth histogram
+DEPTH_BUCKETS = (0, 1, 2, 5, 10, 25, 50, 100)
+
+# Metrics of this process. They have a registry of their own, without
+# the process and platform collectors of prometheus_client, so that the
+# supervisor can add up the metrics of its server processes.
+REGISTRY = CollectorRegistry()
+
+ACTIVE_STREAMS = Gauge(
+    'battleship_active_streams',
+    'Game streams (players) connected to this process',
+    registry=REGISTRY)
+WORKER_POOL_SIZE = Gauge(
+    'battleship_worker_pool_size',
+    'Worker threads of the threaded server',
+    registry=REGISTRY)
+MAX_STREAMS = Gauge(
+    'battleship_max_streams',
+    'Streams this process accepts before it rejects new players',
+    registry=REGISTRY)
+REJECTED_STREAMS = Counter(
+    'battleship_rejected_streams_total',
+    'Streams rejected with RESOURCE_EXHAUSTED because the process was full',
+    registry=REGISTRY)
+REJECTED_REQUESTS = Counter(
+    'battleship_rejected_requests_total',
+    'Requests rejected with FAILED_PRECONDITION because they were not valid '
+    'in the phase of the game', ['type'],
+    registry=REGISTRY)
+THROTTLED_REQUESTS = Counter(
+    'battleship_throttled_requests_total',
+    'Requests delayed because the client exceeded its budget',
+    registry=REGISTRY)
+THROTTLED_STREAMS = Counter(
+    'battleship_throttled_streams_total',
+    'Streams ended with RESOURCE_EXHAUSTED because the client kept '
+    'exceeding its budget',
+    registry=REGISTRY)
+WATCHERS = Gauge(
+    'battleship_watchers',
+    'Spectators connected to this process',
+    registry=REGISTRY)
+WATCHED_GAMES = Gauge(
+    'battleship_watched_games',
+    'Games watched by the spectators of this process, each with a single '
+    'subscription',
+    registry=REGISTRY)
+WATCH_SKIPPED_EVENTS = Counter(
+    'battleship_watch_skipped_events_total',
+    'Events that slow spectators skipped for a snapshot of their game',
+    registry=REGISTRY)
+OPEN_GAMES = Gauge(
+    'battleship_open_games',
+    'Games created by this process that wait for an opponent',
+    registry=REGISTRY)
+MESSAGES_PUBLISHED = Counter(
+    'battleship_messages_published_total',
+    'Game messages published by this process', ['type'],
+    registry=REGISTRY)
+MESSAGES_RECEIVED = Counter(
+    'battleship_messages_received_total',
+    'Game messages handled by the players of this process', ['type'],
+    registry=REGISTRY)
+PUBLISH_SECONDS = Histogram(
+    'battleship_publish_seconds',
+    'Time taken by a call to Redis that publishes messages',
+    buckets=LATENCY_BUCKETS, registry=REGISTRY)
+DELIVERY_LAG_SECONDS = Histogram(
+    'battleship_delivery_lag_seconds',
+    'Time from queueing a message for Redis until it is received',
+    buckets=LATENCY_BUCKETS, registry=REGISTRY)
+RESPONSE_QUEUE_DEPTH = Histogram(
+    'battleship_response_queue_depth',
+    'Responses waiting for a player when a response is queued',
+    buckets=DEPTH_BUCKETS, registry=REGISTRY)
+
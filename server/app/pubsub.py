@@ -0,0 +1,358 @@
+import asyncio
+import redis
+import threading
+import time
+import uuid
+import log
+import metrics
+from message import Message
+
+logger = log.get_logger(__name__)
+
+# Seconds to wait for Redis to confirm a subscription
+SUBSCRIBE_TIMEOUT = 5
+
+# Seconds to wait before reading again after losing the connection
+RETRY_DELAY = 0.5
+
+# Errors after which the connection to Redis is re-established
+CONNECTION_ERRORS = (redis.exceptions.ConnectionError,
+                     redis.exceptions.TimeoutError)
+
+
+def deliver(channel, handlers, data):
+    """Recreate a message received from Redis and call the handlers of
+    its channel with it.
+
+    :param channel: Channel the message was received on
+    :param handlers: Handlers registered for the channel
+    :param data: Message as received from Redis
+    """
+    if not handlers:
+        return
+
+    try:
+        message = Message.recreate(data)
+    except ValueError:
+        logger.error('Unable to decode message on %s', channel)
+        return
+
+    if message.sent is not None:
+        metrics.DELIVERY_LAG_SECONDS.observe(time.time() - message.sent)
+
+    for handler in handlers:
+        try:
+            handler(message)
+        except Exception:
+            logger.exception('Handler for %s failed', channel)
+
+
+class PubSubDispatcher:
+    """A single Redis PubSub connection that is shared by all players
+    of a Battleship server process.
+
+    Game channels are subscribed when the first handler for a channel
+    is added and unsubscribed when the last one is removed. Messages are
+    read by a single thread that blocks on the connection and calls the
+    handlers registered for the channel with the recreated Message.
+    Subscribing waits until Redis has confirmed the subscription, so a
+    message published after :meth:`subscribe` returns is never missed.
+
+    The dispatcher is always subscribed to a private control channel.
+    This keeps the connection in subscribed mode when no games are
+    being played and is used to tell the reading thread to stop.
+
+    When the connection to Redis is lost, the thread connects again,
+    which subscribes to all current channels again. Messages that were
+    published in the meantime are lost, as with any PubSub client.
+    """
+
+    def __init__(self, _redis):
+        self.__r = _redis
+        self.__p = _redis.pubsub()
+        self.__handlers = {}
+        self.__pending = {}
+        self.__lock = threading.Lock()
+        self.__control = f'dispatcher:{uuid.uuid4()}'
+        self.__thread = None
+
+    def start(self):
+        """Subscribe to the control channel and start the thread that
+        reads messages from Redis.
+        """
+        self.__p.subscribe(self.__control)
+        self.__thread = threading.Thread(target=self.__listen, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stop the thread that reads messages from Redis and close the
+        PubSub connection.
+        """
+        if self.__thread is None:
+            return
+
+        self.__r.publish(self.__control, 'stop')
+        self.__thread.join()
+        self.__thread = None
+        self.__p.close()
+
+    def subscribe(self, channel, handler, timeout=SUBSCRIBE_TIMEOUT):
+        """Register a handler for messages published on a channel.
+
+        :param channel: Channel to subscribe to
+        :param handler: Callable that is called with each Message
+        :param timeout: Seconds to wait for Redis to confirm
+        :return: True if subscribed, False if Redis did not confirm
+        """
+        with self.__lock:
+            handlers = self.__handlers.setdefault(channel, [])
+            handlers.append(handler)
+            if len(handlers) == 1:
+                logger.info('Subscribing to channel %s', channel)
+                self.__pending[channel] = threading.Event()
+                self.__p.subscribe(channel)
+            confirmed = self.__pending.get(channel)
+
+        return confirmed is None or confirmed.wait(timeout)
+
+    def unsubscribe(self, channel, handler):
+        """Remove a handler that was registered with :meth:`subscribe`.
+
+        :param channel: Channel the handler was subscribed to
+        :param handler: Handler to remove
+        """
+        with self.__lock:
+            handlers = self.__handlers.get(channel, [])
+            if handler in handlers:
+                handlers.remove(handler)
+            if not handlers and channel in self.__handlers:
+                logger.info('Unsubscribing from channel %s', channel)
+                del self.__handlers[channel]
+                self.__pending.pop(channel, None)
+                self.__p.unsubscribe(channel)
+
+    def handlers(self, channel):
+        """Get the handlers in this process for a channel.
+
+        :param channel: Channel to check
+        :return: List of handlers registered for the channel
+        """
+        with self.__lock:
+            return list(self.__handlers.get(channel, []))
+
+    def publish(self, channel, message):
+        """Publish a message to Redis PubSub on a certain channel.
+
+        :param channel: Channel to use
+        :param message: Message to publish
+        :return: Number of subscribers that received the message
+        """
+        return self.__r.publish(channel, message.pack())
+
+    def publish_batch(self, items):
+        """Publish several messages to Redis PubSub in one pipeline.
+
+        :param items: List of (channel, Message) tuples, in order
+        """
+        pipe = self.__r.pipeline(transaction=False)
+        for channel, message in items:
+            pipe.publish(channel, message.pack())
+        pipe.execute()
+
+    def __listen(self):
+        """Read messages from Redis and dispatch them to the handlers
+        of their channel until a message arrives on the control channel.
+        """
+        while True:
+            try:
+                self.__dispatch()
+                return
+            except CONNECTION_ERRORS:
+                logger.exception('Lost PubSub connection to Redis, '
+                                 'subscribing again')
+                # The next read connects and subscribes again
+                self.__p.connection.disconnect()
+                time.sleep(RETRY_DELAY)
+            except Exception:
+                logger.critical('PubSub reader failed, no more messages '
+                                'are received', exc_info=True)
+                raise
+
+    def __dispatch(self):
+        """Dispatch the messages read from the PubSub connection until a
+        message arrives on the control channel.
+        """
+        for msg in self.__p.listen():
+            channel = msg['channel'].decode('utf-8')
+            if channel == self.__control:
+                if msg['type'] == 'message':
+                    return
+                continue
+
+            if msg['type'] == 'subscribe':
+                self.__confirm(channel)
+                continue
+            elif msg['type'] != 'message':
+                continue
+
+            deliver(channel, self.handlers(channel), msg['data'])
+
+    def __confirm(self, channel):
+        """Wake up the players waiting for a subscription to a channel.
+
+        :param channel: Channel that Redis confirmed the subscription of
+        """
+        with self.__lock:
+            confirmed = self.__pending.pop(channel, None)
+        if confirmed is not None:
+            confirmed.set()
+
+
+class AsyncPubSubDispatcher:
+    """The asyncio counterpart of :class:`PubSubDispatcher`. A single
+    task reads from the shared PubSub connection.
+    """
+
+    def __init__(self, _redis):
+        self.__r = _redis
+        self.__p = _redis.pubsub()
+        self.__handlers = {}
+        self.__pending = {}
+        self.__lock = asyncio.Lock()
+        self.__control = f'dispatcher:{uuid.uuid4()}'
+        self.__task = None
+
+    async def start(self):
+        """Subscribe to the control channel and start the task that
+        reads messages from Redis.
+        """
+        await self.__p.subscribe(self.__control)
+        self.__task = asyncio.create_task(self.__listen())
+
+    async def stop(self):
+        """Stop the task that reads messages from Redis and close the
+        PubSub connection.
+        """
+        if self.__task is None:
+            return
+
+        await self.__r.publish(self.__control, 'stop')
+        await self.__task
+        self.__task = None
+        await self.__p.aclose()
+
+    async def subscribe(self, channel, handler, timeout=SUBSCRIBE_TIMEOUT):
+        """Register a handler for messages published on a channel.
+
+        :param channel: Channel to subscribe to
+        :param handler: Callable that is called with each Message
+        :param timeout: Seconds to wait for Redis to confirm
+        :return: True if subscribed, False if Redis did not confirm
+        """
+        async with self.__lock:
+            handlers = self.__handlers.setdefault(channel, [])
+            handlers.append(handler)
+            if len(handlers) == 1:
+                logger.info('Subscribing to channel %s', channel)
+                self.__pending[channel] = asyncio.Event()
+                await self.__p.subscribe(channel)
+            confirmed = self.__pending.get(channel)
+
+        if confirmed is None:
+            return True
+
+        try:
+            await asyncio.wait_for(confirmed.wait(), timeout)
+            return True
+        except asyncio.TimeoutError:
+            return False
+
+    async def unsubscribe(self, channel, handler):
+        """Remove a handler that was registered with :meth:`subscribe`.
+
+        :param channel: Channel the handler was subscribed to
+        :param handler: Handler to remove
+        """
+        async with self.__lock:
+            handlers = self.__handlers.get(channel, [])
+            if handler in handlers:
+                handlers.remove(handler)
+            if not handlers and channel in self.__handlers:
+                logger.info('Unsubscribing from channel %s', channel)
+                del self.__handlers[channel]
+                self.__pending.pop(channel, None)
+                await self.__p.unsubscribe(channel)
+
+    def handlers(self, channel):
+        """Get the handlers in this process for a channel.
+
+        :param channel: Channel to check
+        :return: List of handlers registered for the channel
+        """
+        return list(self.__handlers.get(channel, []))
+
+    async def publish(self, channel, message):
+        """Publish a message to Redis PubSub on a certain channel.
+
+        :param channel: Channel to use
+        :param message: Message to publish
+        :return: Number of subscribers that received the message
+        """
+        return await self.__r.publish(channel, message.pack())
+
+    async def publish_batch(self, items):
+        """Publish several messages to Redis PubSub in one pipeline.
+
+        :param items: List of (channel, Message) tuples, in order
+        """
+        pipe = self.__r.pipeline(transaction=False)
+        for channel, message in items:
+            pipe.publish(channel, message.pack())
+        await pipe.execute()
+
+    async def __listen(self):
+        """Read messages from Redis and dispatch them to the handlers
+        of their channel until a message arrives on the control channel.
+        """
+        while True:
+            try:
+                await self.__dispatch()
+                return
+            except CONNECTION_ERRORS:
+                logger.exception('Lost PubSub connection to Redis, '
+                                 'subscribing again')
+                # The next read connects and subscribes again
+                await self.__p.connection.disconnect()
+                await asyncio.sleep(RETRY_DELAY)
+            except Exception:
+                logger.critical('PubSub reader failed, no more messages '
+                                'are received', exc_info=True)
+                raise
+
+    async def __dispatch(self):
+        """Dispatch the messages read from the PubSub connection until a
+        message arrives on the control channel.
+        """
+        async for msg in self.__p.listen():
+            channel = msg['channel'].decode('utf-8')
+            if channel == self.__control:
+                if msg['type'] == 'message':
+                    return
+                continue
+
+            if msg['type'] == 'subscribe':
+                self.__confirm(channel)
+                continue
+            elif msg['type'] != 'message':
+                continue
+
+            deliver(channel, self.handlers(channel), msg['data'])
+
+    def __confirm(self, channel):
+        """Wake up the players waiting for a subscription to a channel.
+
+        :param channel: Channel that Redis confirmed the subscription of
+        """
+        confirmed = self.__pending.pop(channel, None)
+        if confirmed is not None:
+            confirmed.set()
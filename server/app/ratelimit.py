@@ -0,0 +1,187 @@
+import threading
+import time
+
+# Longest a request waits for the budget of its client. A client that
+# would have to wait longer has kept sending faster than its budget
+# allows, since a client that waits for the responses to its requests
+# never gets more than one request ahead.
+MAX_DELAY = 1.0
+
+
+class TokenBucket:
+    """A budget of requests that is refilled at a constant rate, up to a
+    burst. A request that finds the bucket empty borrows its token from
+    the future, so it is delayed rather than dropped; the bucket keeps
+    no history, so taking a token is O(1).
+    """
+
+    def __init__(self, rate, burst, clock=time.monotonic):
+        """Create a TokenBucket, which starts full.
+
+        :param rate: Tokens added per second
+        :param burst: Maximum number of tokens
+        :param clock: Function that returns the time in seconds
+        """
+        self.__rate = rate
+        self.__burst = burst
+        self.__clock = clock
+        self.__tokens = float(burst)
+        self.__last = clock()
+        self.__lock = threading.Lock()
+
+    def take(self, max_delay=MAX_DELAY):
+        """Take a token.
+
+        :param max_delay: Longest the caller is willing to wait for it
+        :return: Seconds until the token is available, 0 if it is now,
+                 or None if it is not available within max_delay, in
+                 which case nothing is taken
+        """
+        with self.__lock:
+            now = self.__clock()
+            tokens = min(self.__burst,
+                         self.__tokens + (now - self.__last) * self.__rate)
+            self.__last = now
+
+            delay = max(1 - tokens, 0) / self.__rate
+            if delay > max_delay:
+                self.__tokens = tokens
+                return None
+            self.__tokens = tokens - 1
+            return delay
+
+    def refund(self):
+        """Give back a token that was taken for a request that is not
+        made after all.
+        """
+        with self.__lock:
+            self.__tokens += 1
+
+
+class StreamLimit:
+    """The budgets a single stream takes its requests from: its own and
+    the one of its source address.
+    """
+
+    def __init__(self, bucket, address_bucket=None, release=None):
+        """Create a StreamLimit.
+
+        :param bucket: TokenBucket of the stream, or None for no limit
+        :param address_bucket: TokenBucket of the source address, or None
+                               for no limit
+        :param release: Function to call when the stream has ended
+        """
+        self.__buckets = [b for b in (bucket, address_bucket)
+                          if b is not None]
+        self.__release = release
+
+    def take(self):
+        """Take a request from the budgets.
+
+        :return: Seconds to wait before the request is handled, or None
+                 if the client keeps exceeding a budget, in which case
+                 nothing is taken from any of them
+        """
+        delay = 0.0
+        for i, bucket in enumerate(self.__buckets):
+            wait = bucket.take()
+            if wait is None:
+                for taken in self.__buckets[:i]:
+                    taken.refund()
+                return None
+            delay = max(delay, wait)
+        return delay
+
+    def close(self):
+        """Stop counting the stream for its source address.
+        """
+        if self.__release is not None:
+            self.__release()
+            self.__release = None
+
+
+class RateLimiter:
+    """Hand out the budgets of the streams of a server process: every
+    stream has a budget of its own, and all streams from the same source
+    address share another. A rate of 0 turns a budget off.
+
+    The budget of an address is kept as long as a stream from the
+    address is connected, so opening more streams does not add to it.
+    """
+
+    def __init__(self, rate=0, burst=1, address_rate=0, address_burst=1,
+                 clock=time.monotonic):
+        """Create a RateLimiter.
+
+        :param rate: Requests per second of a stream
+        :param burst: Requests a stream may send at once
+        :param address_rate: Requests per second of all streams from the
+                             same source address
+        :param address_burst: Requests all streams from the same source
+                              address may send at once
+        :param clock: Function that returns the time in seconds
+        :raise ValueError: if a rate is negative or a burst less than 1
+        """
+        if rate < 0 or address_rate < 0 or burst < 1 or address_burst < 1:
+            raise ValueError('Rates must not be negative and bursts must '
+                             'be at least 1')
+
+        self.__rate = rate
+        self.__burst = burst
+        self.__address_rate = address_rate
+        self.__address_burst = address_burst
+        self.__clock = clock
+
+        # Bucket and number of streams per source address
+        self.__addresses = {}
+        self.__lock = threading.Lock()
+
+    def connect(self, context):
+        """Get the budgets of a new stream. It must be closed when the
+        stream has ended.
+
+        :param context: gRPC context object of the stream
+        :return: StreamLimit of the stream
+        """
+        bucket = None
+        if self.__rate:
+            bucket = TokenBucket(self.__rate, self.__burst, self.__clock)
+        if not self.__address_rate:
+            return StreamLimit(bucket)
+
+        address = peer_address(context)
+        with self.__lock:
+            entry = self.__addresses.get(address)
+            if entry is None:
+                entry = self.__addresses[address] = [TokenBucket(
+                    self.__address_rate, self.__address_burst,
+                    self.__clock), 0]
+            entry[1] += 1
+
+        def release():
+            with self.__lock:
+                entry[1] -= 1
+                if not entry[1]:
+                    del self.__addresses[address]
+
+        return StreamLimit(bucket, entry[0], release)
+
+    @property
+    def addresses(self):
+        """Get the number of source addresses that have a budget.
+        """
+        return len(self.__addresses)
+
+
+def peer_address(context):
+    """Get the source address of a gRPC call without the port, e.g.,
+    "ipv4:10.0.0.1" for "ipv4:10.0.0.1:52314".
+
+    :param context: gRPC context object
+    :return: Source address, or an empty string if it is not known
+    """
+    peer = getattr(context, 'peer', None)
+    peer = peer() if peer is not None else ''
+    if peer.startswith(('ipv4:', 'ipv6:')):
+        return peer.rsplit(':', 1)[0]
+    return peer
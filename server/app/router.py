@@ -0,0 +1,115 @@
+import threading
+from collections import deque
+import log
+from watch import GameFeed
+
+logger = log.get_logger(__name__)
+
+
+def players(handlers):
+    """Count the players among the handlers of a channel. The other
+    handlers are the feeds of spectators, see watch.py.
+
+    :param handlers: Handlers registered for the channel
+    :return: Number of handlers that belong to players
+    """
+    return sum(1 for handler in handlers
+               if not isinstance(handler, GameFeed))
+
+
+class LocalRouter:
+    """Route game messages between the players of a Battleship server
+    process.
+
+    When all players of a game are connected to this process, messages
+    are delivered to their handlers in memory. Otherwise they are handed
+    to the remote publisher (i.e., Redis). Delivery in memory keeps the
+    guarantee Redis PubSub gives: every handler sees the messages of a
+    game in the same order, even when a handler publishes a message
+    while it is handling one. The feeds of spectators get the messages
+    as well, but do not count as players.
+
+    A game that is watched by spectators on other servers is always
+    handed to the remote publisher, so its messages reach them; Redis
+    then delivers them to the players here as well.
+    """
+    # Number of players that take part in a game
+    PLAYERS = 2
+
+    def __init__(self, dispatcher, remote):
+        """Create a LocalRouter.
+
+        :param dispatcher: Dispatcher that knows the handlers in this
+                           process for each channel
+        :param remote: Callable taking a channel and Message that
+                       publishes (or queues) the message for other
+                       processes
+        """
+        self.__dispatcher = dispatcher
+        self.__remote = remote
+        self.__lock = threading.Lock()
+
+        # Messages waiting for delivery, per channel that is currently
+        # being delivered to
+        self.__pending = {}
+
+        # Channels with spectators on other servers
+        self.__watched = set()
+
+    def is_local(self, channel):
+        """Are all players of a game connected to this process?
+
+        :param channel: Channel of the game
+        :return: True if the players are connected here, False otherwise
+        """
+        return players(self.__dispatcher.handlers(channel)) >= self.PLAYERS
+
+    def watch(self, channel):
+        """Hand the messages of a game to the remote publisher from now
+        on, because spectators on other servers watch it.
+
+        :param channel: Channel of the game
+        """
+        self.__watched.add(channel)
+
+    def forget(self, channel):
+        """Forget about the spectators of a game once it is over here.
+
+        :param channel: Channel of the game
+        """
+        self.__watched.discard(channel)
+
+    def publish(self, channel, message):
+        """Publish a message on a channel.
+
+        :param channel: Channel to use
+        :param message: Message to publish
+        :return: Number of subscribers that received the message in
+                 memory, or the result of the remote publisher
+        """
+        handlers = self.__dispatcher.handlers(channel)
+        if players(handlers) < self.PLAYERS or channel in self.__watched:
+            return self.__remote(channel, message)
+
+        with self.__lock:
+            pending = self.__pending.get(channel)
+            if pending is not None:
+                # Somebody is delivering messages for this channel
+                # already; it will deliver this one as well
+                pending.append(message)
+                return len(handlers)
+
+            pending = self.__pending[channel] = deque([message])
+
+        while True:
+            with self.__lock:
+                if not pending:
+                    del self.__pending[channel]
+                    return len(handlers)
+                message = pending.popleft()
+
+            for handler in self.__dispatcher.handlers(channel):
+                try:
+                    handler(message)
+                except Exception:
+                    logger.exception('Handler for %s failed', channel)
@@ -1,38 +1,147 @@
 import backoff
 import grpc
-import logging
 import queue
 import redis
 import threading
 import time
 import uuid
 import log
-from battleships_pb2 import Attack, Response, Status
+import metrics
+import tracing
+from battleships_pb2 import Attack, GameEvent, Response, Status
 from battleships_pb2_grpc import BattleshipsServicer
+from board import Board
 from game import Game
+from matchmaking import Matchmaker
+from memory import MemoryDispatcher, MemoryMatchmaker
 from message import Message
+from pubsub import PubSubDispatcher
+from ratelimit import RateLimiter, StreamLimit
+from router import LocalRouter
+from streams import StreamDispatcher
+from watch import Spectators
+from writer import FLUSH_INTERVAL, PublishWriter
 
 logger = log.get_logger(__name__)
-logger.setLevel(logging.DEBUG)
+
+# Transports between the servers that can be selected with TRANSPORT.
+# With MEMORY, a single server process plays all games without Redis.
+PUBSUB = 'pubsub'
+STREAMS = 'streams'
+MEMORY = 'memory'
+TRANSPORTS = (PUBSUB, STREAMS, MEMORY)
+
+# A stream that arrives while the server is full is rejected with
+# RESOURCE_EXHAUSTED. The trailing metadata tells the client after how
+# many milliseconds to join again.
+RETRY_AFTER_KEY = 'retry-after-ms'
+RETRY_AFTER_MS = 1000
+FULL_DETAILS = 'Server is full, join again later'
+
+# A request that is not valid in the phase of the game ends the stream
+# with FAILED_PRECONDITION
+INVALID_DETAILS = '{} request is not valid while the game is in phase {}'
+
+# A stream whose client keeps sending faster than its budget allows is
+# ended with RESOURCE_EXHAUSTED
+THROTTLED_DETAILS = 'Too many requests, slow down'
+
+# A Watch request ends the stream with INVALID_ARGUMENT if its game ID
+# is not one that the server hands out, with NOT_FOUND if the game is
+# not in progress (e.g., it has ended) and with UNAVAILABLE if the
+# server is unable to subscribe to the game's messages
+INVALID_GAME_DETAILS = 'Not a valid game ID'
+NO_GAME_DETAILS = 'No game in progress with this ID'
+UNAVAILABLE_DETAILS = 'Unable to watch the game, try again later'
+
+# Seconds a spectator waits for the next event of a game. The players
+# of a game that is quiet for so long have most likely gone, so the
+# stream is ended with DEADLINE_EXCEEDED.
+WATCH_TIMEOUT = 120
+IDLE_DETAILS = 'No events in the game for too long'
+
+# Events of a player's Game by message type and whether the message
+# comes from the player itself. The player's own attacks and reports
+# come back to it, but do not change its game.
+EVENTS = {
+    (Message.BEGIN, True): Game.BEGIN,
+    (Message.BEGIN, False): Game.BEGIN,
+    (Message.STOP_TURN, True): Game.STOP_TURN,
+    (Message.STOP_TURN, False): Game.START_TURN,
+    (Message.ATTACK, False): Game.ATTACKED,
+    (Message.STATUS, False): Game.REPORTED,
+    (Message.LOST, True): Game.END,
+    (Message.LOST, False): Game.END,
+}
+
+
+def valid_game_id(game_id):
+    """Check whether a game ID is one that the server hands out, see
+    :meth:`_Server.find_game_or_create`.
+
+    :param game_id: Game ID to check
+    :return: True if valid, False otherwise
+    """
+    try:
+        return str(uuid.UUID(game_id)) == game_id
+    except ValueError:
+        return False
 
 
 class Battleship(BattleshipsServicer):
-    def __init__(self, redis_host, redis_port='6379', db=0):
+    def __init__(self, redis_host, redis_port='6379', db=0,
+                 transport=PUBSUB, max_streams=None, limiter=None):
         """Create a Battleship (server) instance.
 
         :param redis_host: Hostname of Redis instance
         :param redis_port: Port of Redis instance
         :param db: Database to use within Redis instance
+        :param transport: PUBSUB, STREAMS or MEMORY
+        :param max_streams: Maximum number of concurrent streams, or None
+                            for no limit
+        :param limiter: RateLimiter with the request budgets of the
+                        streams, or None for no limits
         :raise ConnectionError: if connection to Redis fails
+        :raise ValueError: if the transport is unknown
         """
-        logger.info('Starting Battleship. Connect to Redis '
-                    f'at {redis_host}:{redis_port}.')
-
-        self.__r = redis.Redis(host=redis_host, port=redis_port, db=db)
-        if not self.ping_redis():
-            raise ConnectionError('Unable to connect to Redis server!')
+        if transport not in TRANSPORTS:
+            raise ValueError(f'Unknown transport {transport}')
+
+        self.__max_streams = max_streams
+        self.__streams = 0
+        self.__streams_lock = threading.Lock()
+        self.__limiter = limiter or RateLimiter()
+
+        if transport == MEMORY:
+            logger.info('Starting Battleship without Redis.')
+            self.__r = None
+            self.__dispatcher = MemoryDispatcher()
+            self.__matchmaker = MemoryMatchmaker()
+            # Nothing to save by batching messages in memory
+            interval = 0
         else:
-            logger.info('Battleship server connected to Redis server.')
+            logger.info('Starting Battleship. Connect to Redis at %s:%s.',
+                        redis_host, redis_port)
+
+            self.__r = redis.Redis(host=redis_host, port=redis_port, db=db)
+            if not self.ping_redis():
+                raise ConnectionError('Unable to connect to Redis server!')
+            else:
+                logger.info('Battleship server connected to Redis server.')
+
+            if transport == STREAMS:
+                self.__dispatcher = StreamDispatcher(self.__r)
+            else:
+                self.__dispatcher = PubSubDispatcher(self.__r)
+            self.__matchmaker = Matchmaker(self.__r)
+            interval = FLUSH_INTERVAL
+
+        self.__dispatcher.start()
+        self.__writer = PublishWriter(self.__dispatcher, interval)
+        self.__writer.start()
+        self.__router = LocalRouter(self.__dispatcher, self.__writer.publish)
+        self.__spectators = Spectators(self.__dispatcher, self.__router)
+        self.__matchmaker.start()
 
     def Game(self, request_iterator, context):
         """This method is the implementation of the gRPC Game service.
@@ -43,15 +152,108 @@ class Battleship(BattleshipsServicer):
         :param context: a gRPC context object
         :return: A generator providing gRPC responses
         """
-        server = _Server(self.__r)
-        with server:
-            yield from server.start(request_iterator, context)
+        if not self.admit():
+            self.reject(context)
+
+        server = _Server(self.__r, self.__dispatcher, self.__router,
+                         self.__matchmaker)
+        limit = self.__limiter.connect(context)
+        server.limit_requests(limit)
+        metrics.ACTIVE_STREAMS.inc()
+        try:
+            with server:
+                yield from server.start(request_iterator, context)
+        finally:
+            metrics.ACTIVE_STREAMS.dec()
+            limit.close()
+            self.release()
+
+    def Watch(self, request, context):
+        """This method is the implementation of the gRPC Watch service:
+        it streams the events of a game in progress to a spectator until
+        the game has ended. Spectators count as streams, see
+        :meth:`admit`.
+
+        :param request: WatchRequest with the ID of the game
+        :param context: a gRPC context object
+        :return: A generator providing GameEvents
+        """
+        game_id = request.game_id
+        if not valid_game_id(game_id):
+            context.abort(grpc.StatusCode.INVALID_ARGUMENT,
+                          INVALID_GAME_DETAILS)
+        if not self.admit():
+            self.reject(context)
+
+        try:
+            if not self.__matchmaker.game_exists(game_id):
+                context.abort(grpc.StatusCode.NOT_FOUND, NO_GAME_DETAILS)
+
+            feed = self.__spectators.watch(game_id)
+            if feed is None:
+                context.abort(grpc.StatusCode.UNAVAILABLE,
+                              UNAVAILABLE_DETAILS)
+            context.add_callback(feed.changed)
+
+            try:
+                sequence = 0
+                while True:
+                    events = feed.read(sequence, context.is_active,
+                                       WATCH_TIMEOUT)
+                    if events is None:
+                        context.abort(grpc.StatusCode.DEADLINE_EXCEEDED,
+                                      IDLE_DETAILS)
+                    if not events:
+                        return
+                    yield from events
+                    sequence = events[-1].sequence
+                    if events[-1].type == GameEvent.END:
+                        return
+            finally:
+                self.__spectators.unwatch(feed)
+        finally:
+            self.release()
+
+    def reject(self, context):
+        """Reject a stream because the server is full: it is ended with
+        RESOURCE_EXHAUSTED, which raises an exception.
+
+        :param context: gRPC context object of the stream
+        """
+        logger.warning('Rejecting a stream, %s streams are connected',
+                       self.__max_streams)
+        metrics.REJECTED_STREAMS.inc()
+        context.set_trailing_metadata(
+            ((RETRY_AFTER_KEY, str(RETRY_AFTER_MS)),))
+        context.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, FULL_DETAILS)
+
+    def admit(self):
+        """Count a new stream, unless the maximum number of streams is
+        connected already.
+
+        :return: True if the stream may connect, False if it is rejected
+        """
+        with self.__streams_lock:
+            if self.__max_streams is not None \
+                    and self.__streams >= self.__max_streams:
+                return False
+            self.__streams += 1
+            return True
+
+    def release(self):
+        """Stop counting a stream that was admitted.
+        """
+        with self.__streams_lock:
+            self.__streams -= 1
 
     def ping_redis(self):
         """Ping a Redis instance to see whether it's alive.
 
-        :return: True if connection to instance established, False otherwise
+        :return: True if connection to instance established (or no Redis
+                 is used), False otherwise
         """
+        if self.__r is None:
+            return True
 
         @backoff.on_exception(backoff.expo,
                               redis.exceptions.ConnectionError,
@@ -68,12 +270,45 @@ class Battleship(BattleshipsServicer):
             logger.error('Problem pinging Redis. Retry?')
             return False
 
+    def close(self):
+        """Publish the messages that are still queued, stop receiving
+        PubSub messages and close the connection to the Redis instance.
+        """
+        self.__spectators.close()
+        self.__writer.stop()
+        self.__matchmaker.stop()
+        self.__dispatcher.stop()
+        if self.__r is not None:
+            self.__r.close()
+
 
 class _Server:
-    OpenGames = 'openGames'
+    # Maximum number of open games to try joining before giving up
+    MAX_JOIN_ATTEMPTS = 5
+
+    def __init__(self, _redis, dispatcher, router, matchmaker):
+        # Span of this player's game and the context and start of the
+        # hop that is waiting for the client to report on an attack
+        self.__span = tracing.NOOP_SPAN
+        self.__attacked = None
+
+        # Fleet of this player if it was submitted at join, in which
+        # case the server resolves the attacks on it instead of the
+        # client
+        self.__board = None
+
+        # Request budgets of this stream, see throttle()
+        self.__limit = StreamLimit(None)
+
+        # Loggers with the context of this connection (player and
+        # game); the records of moves are sampled
+        self.__log = log.ContextAdapter(logger)
+        self.__moves = self.__log
 
-    def __init__(self, _redis):
         self.__r = _redis
+        self.__dispatcher = dispatcher
+        self.__router = router
+        self.__matchmaker = matchmaker
         self.__q = queue.Queue()
         self.__e = threading.Event()
         self.__e.set()
@@ -96,47 +331,174 @@ class _Server:
         self.__stream = request_iterator
         self.__context = context
 
-        while True:
-            request = self.recv()
-            if request is not None:
-                break
+        request = self.recv()
+        if request is None or not self.throttle():
+            return
 
         if not request.HasField('join'):
-            logger.error('Not a join message!')
+            self.__log.error('Not a join message!')
             return
 
         player_id = request.join.id
         if player_id == '':
-            logger.error('Player message ID is empty')
+            self.__log.error('Player message ID is empty')
             return
 
-        logger.info(f'Player {player_id} is attempting to join')
+        self.bind_log(player=player_id)
+        self.__log.info('Player is attempting to join')
 
-        game, is_new = self.find_game_or_create()
-
-        logger.info(f'Connecting to game {game.id}. '
-                    f'New? {"Yes" if is_new else "No"}')
-        logger.info('Setting up server to start receiving PubSub messages')
+        if not self.set_fleet(request.join.fleet):
+            return
 
-        pubsub_thread = self.subscribe_redis(game, player_id)
-        if not self.connect_game(game, player_id, is_new):
-            logger.error('Unable to connect to a game!')
+        self.start_trace(context, player_id)
+        joined = self.join_game(player_id)
+        if joined is None:
+            self.__log.error('Unable to connect to a game!')
+            self.finish_trace()
             return
 
+        game, handler, is_new = joined
+        self.bind_log(game=game.id)
         game_thread = self.subscribe_grpc(game, player_id)
 
         yield from self.get()
 
-        logger.info('Stopping all threads')
+        self.__log.info('Stopping all threads')
 
         game_thread.join()
-        pubsub_thread.stop()
-        self.close_open_game(game)
+        self.unsubscribe_redis(game, handler)
+        if is_new:
+            self.close_open_game(game)
+        self.end_game(game)
+        self.finish_trace()
+
+    @property
+    def connection_log(self):
+        """Logger adapter with the context fields of this connection.
+        """
+        return self.__log
+
+    def bind_log(self, **context):
+        """Add context fields, e.g., the game ID, to the records that
+        are logged for this connection.
+
+        :param context: Context fields to add
+        """
+        self.__log = self.__log.bind(**context)
+        self.__moves = self.__log.sampled()
+
+    def set_fleet(self, fleet):
+        """Keep the fleet the player submitted at join, if any, so the
+        attacks on it are resolved by the server.
+
+        :param fleet: Ships of the join message
+        :return: True if there is no fleet or it is valid, False if the
+                 player may not join with it
+        """
+        if not fleet:
+            return True
+
+        try:
+            self.__board = Board.from_fleet(fleet)
+        except ValueError as e:
+            self.__log.error('Invalid fleet: %s', e)
+            return False
+
+        self.__log.info('Server resolves the attacks on this player')
+        return True
+
+    def start_trace(self, context, player_id):
+        """Start the span of this player's game. Its parent is the trace
+        context the client sent in the gRPC metadata, if any.
+
+        :param context: gRPC context object
+        :param player_id: ID of player
+        """
+        self.__span = tracing.tracer.start_span(
+            'game', tracing.from_metadata(context), player=player_id)
+
+    def finish_trace(self):
+        """Finish the span of this player's game.
+        """
+        self.__span.finish()
+
+    def limit_requests(self, limit):
+        """Set the budgets this stream takes its requests from.
+
+        :param limit: StreamLimit of this stream
+        """
+        self.__limit = limit
+
+    def budget(self):
+        """Take a request from the budgets of this stream. A client that
+        keeps exceeding them is disconnected: the stream is ended with
+        RESOURCE_EXHAUSTED.
+
+        :return: Seconds to wait before the request is handled, or None
+                 if the stream was ended
+        """
+        delay = self.__limit.take()
+        if delay is None:
+            self.__log.error('Client keeps exceeding its budget, '
+                             'disconnecting')
+            metrics.THROTTLED_STREAMS.inc()
+            self.abort(grpc.StatusCode.RESOURCE_EXHAUSTED, THROTTLED_DETAILS)
+        elif delay:
+            metrics.THROTTLED_REQUESTS.inc()
+        return delay
+
+    def throttle(self):
+        """Wait until the budgets of this stream allow a request, see
+        :meth:`budget`.
+
+        :return: True if the request may be handled, False if the stream
+                 was ended
+        """
+        delay = self.budget()
+        if delay:
+            time.sleep(delay)
+        return delay is not None
 
     def stop(self):
-        """Stop the game from running.
+        """Stop the game from running. The queue of responses is ended
+        with None, so :meth:`get` returns without polling.
         """
-        self.__e.clear()
+        if self.__e.is_set():
+            self.__e.clear()
+            self.__q.put_nowait(None)
+
+    def join_game(self, player_id):
+        """Join an open game, or create a new game if none is found, and
+        subscribe to its messages. Open games whose creator has left are
+        skipped.
+
+        :param player_id: ID of player
+        :return: A tuple containing the Game, the PubSub handler and a
+        flag is_new which indicates that a new game was created, or None
+        if unable to join a game
+        """
+        for _ in range(self.MAX_JOIN_ATTEMPTS):
+            game, is_new = self.find_game_or_create()
+
+            self.__log.info('Connecting to game %s. New? %s', game.id,
+                            'Yes' if is_new else 'No')
+            self.__log.info('Setting up server to start receiving PubSub '
+                            'messages')
+
+            handler = self.subscribe_redis(game, player_id)
+            if handler is None:
+                return None
+
+            if self.connect_game(game, player_id, is_new):
+                return game, handler, is_new
+
+            self.unsubscribe_redis(game, handler)
+            if is_new:
+                return None
+
+            self.__log.warning('Creator of game %s has left', game.id)
+
+        return None
 
     def connect_game(self, game, player_id, is_new):
         """Join an existing game or advertise this one as open if game
@@ -149,12 +511,29 @@ class _Server:
         if is_new:
             return self.add_open_game(game)
 
-        if not self.ensure_subscribers(game, 2):
-            return False
+        # The game can be watched once it begins. Its ID is only handed
+        # out with BEGIN, so nobody can watch it before that.
+        self.begin_game(game)
 
+        # The creator of the game must receive BEGIN as well, otherwise
+        # it has left the game after it was claimed. A creator in this
+        # process is known to be subscribed. Otherwise, nothing else has
+        # been published for this game yet, so BEGIN can skip the writer
+        # in order to get the number of subscribers from Redis.
         msg = Message(Message.BEGIN, player_id, '')
-        self.publish(game.id, msg)
-        return True
+        if self.__router.is_local(game.id):
+            self.publish(game.id, msg)
+            return True
+
+        metrics.MESSAGES_PUBLISHED.labels(msg.type).inc()
+        start = time.perf_counter()
+        receivers = self.__dispatcher.publish(game.id, msg)
+        metrics.PUBLISH_SECONDS.observe(time.perf_counter() - start)
+        if receivers >= LocalRouter.PLAYERS:
+            return True
+
+        self.end_game(game)
+        return False
 
     def recv(self):
         """Receive a gRPC message.
@@ -164,10 +543,10 @@ class _Server:
         try:
             return next(self.__stream)
         except grpc.RpcError:
-            logger.error('An RPC error occurred!')
+            self.__log.error('An RPC error occurred!')
             self.stop()
         except StopIteration:
-            logger.warning('recv() - iteration stopped')
+            self.__log.warning('recv() - iteration stopped')
             self.stop()
 
     def send(self, response):
@@ -175,19 +554,20 @@ class _Server:
 
         :param response: Response to send to the client
         """
+        metrics.RESPONSE_QUEUE_DEPTH.observe(self.__q.qsize())
         self.__q.put_nowait(response)
 
     def get(self):
-        """Get next message from the queue. It keeps running until it
-        sees that the is_running flag is False, then it returns.
+        """Get next message from the queue. It keeps running until
+        :meth:`stop` is called, then it returns.
 
         :return: Next message in queue
         """
-        while self.is_running:
-            try:
-                yield self.__q.get(timeout=0.5)
-            except queue.Empty:
-                pass
+        while True:
+            response = self.__q.get()
+            if response is None:
+                return
+            yield response
 
     @property
     def is_running(self):
@@ -200,7 +580,8 @@ class _Server:
     def close(self):
         """Close connections, like the connection to the Redis instance.
         """
-        self.__r.close()
+        if self.__r is not None:
+            self.__r.close()
 
     def subscribe_grpc(self, game, player_id):
         """Create a thread that handles incoming gRPC requests.
@@ -223,43 +604,111 @@ class _Server:
         """
         while True:
             request = self.recv()
-            if request is None:
+            if request is None or not self.throttle():
                 return
 
-            if request.HasField('move'):
-                vector = request.move.vector
+            if not self.handle_request(request, game, player_id):
+                return
 
-                logger.info(f'({player_id}) - gRPC - {{Attack}} - '
-                            f'{vector}')
+    def handle_request(self, request, game, player_id):
+        """Handle a single gRPC request. A request that is not valid in
+        the phase of the game is rejected, see :meth:`reject`.
 
-                # It must be my move if we have to handle an Attack
-                if game.my_turn:
-                    msg = Message(Message.ATTACK, player_id, vector)
-                    self.publish(game.id, msg)
-                else:
-                    logger.error(f'({player_id}) - gRPC - '
-                                 'Got {Attack} request but not my turn!')
+        :param request: gRPC request to handle
+        :param game: Game to handle
+        :param player_id: Id of player this game server is handling
+        :return: True if the request was handled, False if it was
+                 rejected
+        """
+        if request.HasField('move'):
+            vector = request.move.vector
+
+            self.__moves.info('gRPC - {Attack} - %s', vector)
+
+            # It must be my move if we have to handle an Attack
+            if not game.advance(Game.ATTACK):
+                return self.reject('move', game)
+
+            span = tracing.tracer.start_span('grpc.move', self.__span,
+                                             player=player_id, vector=vector)
+            msg = Message(Message.ATTACK, player_id, vector,
+                          trace=span.context)
+            self.publish(game.id, msg)
+            span.finish()
+
+        elif request.HasField('report'):
+            state = request.report.state
+
+            self.__moves.info('gRPC - {Report} - %s. Phase %s.', state,
+                              game.phase)
+
+            # The server has answered the attacks itself already
+            if self.__board is not None:
+                self.__log.warning('gRPC - Ignoring {Report}, the server '
+                                   'resolves the attacks')
+
+            # An attack must be waiting for my report
+            elif game.advance(Game.REPORT):
+                # The client took from the Attack response until now
+                span = tracing.NOOP_SPAN
+                if self.__attacked is not None:
+                    parent, start = self.__attacked
+                    self.__attacked = None
+                    span = tracing.tracer.start_span(
+                        'client.report', parent, start, player=player_id,
+                        state=state)
+
+                self.report(game, player_id, state, span)
+                span.finish()
+            else:
+                return self.reject('report', game)
 
-            elif request.HasField('report'):
-                state = request.report.state
+        else:
+            return self.reject(request.WhichOneof('event') or 'empty', game)
 
-                logger.info(f'({player_id}) - gRPC - {{Report}} - {state}. '
-                            f'My Turn? {"Yes" if game.my_turn else "No"}.')
+        return True
 
-                # It must not be my move if we have to handle a Report
-                if not game.my_turn:
-                    if state == Status.State.DEFEAT:
-                        msg = Message(Message.LOST, player_id, '')
-                    else:
-                        msg = Message(Message.STATUS, player_id, str(state))
+    def reject(self, request_type, game):
+        """Reject a request that is not valid in the phase of the game,
+        before anything is published for it: the stream is ended with
+        FAILED_PRECONDITION.
 
-                    self.publish(game.id, msg)
-                else:
-                    logger.error(f'({player_id}) - gRPC - '
-                                 'Got {Report} request but my turn!')
+        :param request_type: Type of the request, e.g., "move"
+        :param game: Game the request was for
+        :return: False
+        """
+        details = INVALID_DETAILS.format(request_type, game.phase)
+        self.__log.error('gRPC - Rejecting request: %s', details)
+        metrics.REJECTED_REQUESTS.labels(request_type).inc()
+        self.abort(grpc.StatusCode.FAILED_PRECONDITION, details)
+        return False
 
-            else:
-                logger.error('Received an unknown message type!')
+    def abort(self, code, details):
+        """End the stream with a status other than OK.
+
+        :param code: gRPC status code
+        :param details: Description of the status for the client
+        """
+        self.__context.set_code(code)
+        self.__context.set_details(details)
+        self.stop()
+
+    def report(self, game, player_id, state, span=tracing.NOOP_SPAN):
+        """Publish the outcome of the other player's attack on this
+        player: LOST on a defeat, STATUS otherwise.
+
+        :param game: Game to publish on
+        :param player_id: Id of player this game server is handling
+        :param state: Status.State of the attack
+        :param span: Span the message is part of
+        """
+        if state == Status.State.DEFEAT:
+            msg = Message(Message.LOST, player_id, '', trace=span.context)
+        else:
+            msg = Message(Message.STATUS, player_id, str(state),
+                          trace=span.context)
+
+        self.publish(game.id, msg)
 
     @property
     def redis_conn(self):
@@ -268,79 +717,127 @@ class _Server:
         return self.__r
 
     def publish(self, channel, message):
-        """Publish a message to Redis PubSub on a certain channel.
+        """Publish a message on a certain channel. The message is
+        queued for Redis unless both players are connected to this
+        process.
 
         :param channel: Channel to use
         :param message: Message to publish
+        :return: Number of subscribers that received the message, or
+                 None if it was queued
         """
-        self.__r.publish(channel, message.dumps())
+        metrics.MESSAGES_PUBLISHED.labels(message.type).inc()
+        return self.__router.publish(channel, message)
 
     def subscribe_redis(self, game, player_id):
-        """Subscribe to game.id channel but in a separate thread.
-        The handler that is used for the pubsub message is called
-        handle_pubsub, which is a method of this class.
+        """Subscribe to game.id channel using the dispatcher that is
+        shared by all players of this process. The handler that is used
+        for the pubsub message is called handle_pubsub, which is a
+        method of this class.
 
         :param game: Game of which the ID is used to subscribe
         :param player_id: ID of player this game server is handling
-        :return: Thread that the handler is running in
+        :return: Handler that was registered with the dispatcher, or None
+        if Redis did not confirm the subscription
         """
 
-        def get_pubsub_handler():
-            def handle_pubsub(msg):
-                return self.handle_pubsub(msg, game, player_id)
+        def handle_pubsub(message):
+            return self.handle_pubsub(message, game, player_id)
 
-            return handle_pubsub
+        if not self.__dispatcher.subscribe(game.id, handle_pubsub):
+            self.__log.error('Unable to subscribe to channel %s', game.id)
+            self.__dispatcher.unsubscribe(game.id, handle_pubsub)
+            return None
 
-        logger.info(f'Subscribing to channel {game.id}')
+        return handle_pubsub
 
-        p = self.__r.pubsub(ignore_subscribe_messages=True)
-        p.subscribe(**{game.id: get_pubsub_handler()})
-        thread = p.run_in_thread(sleep_time=0.001)
-        return thread
+    def unsubscribe_redis(self, game, handler):
+        """Stop receiving messages for game.id channel.
+
+        :param game: Game of which the ID was used to subscribe
+        :param handler: Handler returned by :meth:`subscribe_redis`
+        """
+        self.__dispatcher.unsubscribe(game.id, handler)
+        self.__router.forget(game.id)
 
-    def handle_pubsub(self, msg, game, player_id):
+    def watched(self, game):
+        """Route the messages of the game through Redis from now on,
+        because spectators on other servers watch it.
+
+        :param game: Game that is watched
+        """
+        self.__router.watch(game.id)
+
+    def handle_pubsub(self, message, game, player_id):
         """Handle published messages from Redis PubSub.
-        :param msg: PubSub message to handle
+        :param message: Message to handle
         :param game: Game for which to handle messages
         :param player_id: Player for which we're receiving messages
         """
-        message = Message.recreate(msg['data'])
         message_type = message.type
+        metrics.MESSAGES_RECEIVED.labels(message_type).inc()
+
+        # Trace the hops that act on a message of the other player, and
+        # the turn handoff, which both players act on
+        span = tracing.NOOP_SPAN
+        if message.trace is not None and (message.player != player_id or
+                                          message_type == Message.STOP_TURN):
+            span = tracing.tracer.start_span(
+                f'pubsub.{message_type}', message.trace, message.sent,
+                player=player_id)
+
+        # The game moves on before the client is told, so the requests
+        # the client sends in return are valid
+        event = EVENTS.get((message_type, message.player == player_id))
+        if event is not None and not game.advance(event):
+            self.__log.warning('pubsub - Ignoring %s from player %s in phase '
+                               '%s', message_type, message.player, game.phase)
+            span.finish()
+            return
+
         if message_type == Message.BEGIN:
-            response = Response(turn=Response.State.BEGIN)
+            # The players learn the ID of the game, so they can tell
+            # spectators which game to watch
+            response = Response(turn=Response.State.BEGIN, game_id=game.id)
             self.send(response)
 
             if message.player == player_id:
                 # Stop this player's turn (this will start other player's turn)
                 message = Message(Message.STOP_TURN, player_id, '')
                 self.publish(game.id, message)
+            else:
+                # This player created the game, which is no longer open
+                self.__matchmaker.claimed(game.id)
 
         elif message_type == Message.STOP_TURN:
-            logger.info(f'({player_id}) - pubsub - '
-                        f'Received STOP_TURN from player {message.player}')
+            self.__moves.info('pubsub - Received STOP_TURN from player %s',
+                              message.player)
 
             if message.player == player_id:
-                logger.info(f'({player_id}) - '
-                            f'Ending turn for player {player_id}')
+                self.__moves.info('Ending turn for player %s', player_id)
 
-                game.end_turn()
                 turn = Response.State.STOP_TURN
             else:
-                logger.info(f'({player_id}) - '
-                            f'Starting turn for player {player_id}')
+                self.__moves.info('Starting turn for player %s', player_id)
 
-                game.start_turn()
                 turn = Response.State.START_TURN
 
             self.send(Response(turn=turn))
 
         elif message_type == Message.ATTACK:
-            logger.info(f'({player_id}) - pubsub - '
-                        f'Received ATTACK from player {message.player} '
-                        f'with vector {message.data}.')
+            self.__moves.info('pubsub - Received ATTACK from player %s with '
+                              'vector %s.', message.player, message.data)
 
             if message.player != player_id:
                 self.send(Response(move=Attack(vector=message.data)))
+                if self.__board is not None:
+                    # The client is only told about the attack; the
+                    # report is published right away
+                    state = self.__board.attack(message.data)
+                    game.advance(Game.REPORT)
+                    self.report(game, player_id, state, span)
+                elif span.context is not None:
+                    self.__attacked = span.context, time.time()
 
         elif message_type == Message.STATUS:
             states = {
@@ -350,9 +847,8 @@ class _Server:
             }
             state = states[message.data][0]
 
-            logger.info(f'({player_id}) - pubsub - '
-                        f'Received STATUS from player {message.player} with '
-                        f'state {state}.')
+            self.__moves.info('pubsub - Received STATUS from player %s with '
+                              'state %s.', message.player, state)
 
             if message.player != player_id:
                 state = states[message.data][1]
@@ -362,12 +858,18 @@ class _Server:
                 # player's turn). Because the status comes from the
                 # other player, it means that this player is the one who
                 # attacked and hence whose turn it was).
-                message = Message(Message.STOP_TURN, player_id, '')
+                message = Message(Message.STOP_TURN, player_id, '',
+                                  trace=span.context)
                 self.publish(game.id, message)
 
+        elif message_type == Message.WATCH:
+            self.__log.info('pubsub - Spectators on another server watch the '
+                            'game')
+            self.watched(game)
+
         elif message_type == Message.LOST:
-            logger.info(f'({player_id}) - pubsub - '
-                        f'Received LOST from player {message.player}.')
+            self.__log.info('pubsub - Received LOST from player %s.',
+                            message.player)
 
             turn = Response.State.LOSE
             if message.player != player_id:
@@ -376,26 +878,7 @@ class _Server:
             self.send(Response(turn=turn))
             self.stop()
 
-    def ensure_subscribers(self, game, n):
-        """Ensure that {n} listeners are subscribed to the id of the
-        game passed in as a parameter.
-
-        :param game: Game of which the ID is checked
-        :param n: The number of subscribers we're expecting
-        """
-        for x in range(5):
-            values = self.__r.pubsub_numsub(game.id)
-            if len(values) < 1:
-                return False
-
-            _, nsub = values[0]
-            if n == nsub:
-                return True
-
-            time.sleep(0.1)
-
-        logger.error(f'Timeout trying to ensure {n} subscribers')
-        return False
+        span.finish()
 
     def find_game_or_create(self):
         """Try to find an open game in Redis or create a new game if
@@ -404,15 +887,13 @@ class _Server:
         :return: A tuple containing a Game object and a flag is_new
         which indicates that a new game was created.
         """
-        b_game_id = self.__r.rpop(self.OpenGames)
+        game_id = self.__matchmaker.claim_open_game()
 
-        # b_game_id is None if no open game found
-        is_new = b_game_id is None
+        # game_id is None if no open game found
+        is_new = game_id is None
         if is_new:
-            logger.info('Could not find open game, creating new one')
+            self.__log.info('Could not find open game, creating new one')
             game_id = str(uuid.uuid4())
-        else:
-            game_id = b_game_id.decode('utf-8')
 
         return Game(game_id), is_new
 
@@ -422,8 +903,8 @@ class _Server:
         :param game: Game to be advertised
         :return: True if successful, False otherwise
         """
-        logger.info(f'Adding open game {game.id}')
-        return self.__r.lpush(self.OpenGames, game.id)
+        self.__log.info('Adding open game %s', game.id)
+        return self.__matchmaker.add_open_game(game.id)
 
     def close_open_game(self, game):
         """Remove an open game from the Redis instance so it can no longer
@@ -431,5 +912,21 @@ class _Server:
 
         :param game: Game to be closed
         """
-        logger.info(f'Closing open game {game.id}')
-        return self.__r.lrem(self.OpenGames, 1, game.id)
+        self.__log.info('Closing open game %s', game.id)
+        self.__matchmaker.close_open_game(game.id)
+
+    def begin_game(self, game):
+        """Register a game as in progress, so spectators can watch it.
+
+        :param game: Game that begins
+        """
+        self.__log.info('Beginning game %s', game.id)
+        self.__matchmaker.begin_game(game.id)
+
+    def end_game(self, game):
+        """Remove a game from the games in progress, as this player has
+        left it.
+
+        :param game: Game to be ended
+        """
+        self.__matchmaker.end_game(game.id)
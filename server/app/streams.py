@@ -0,0 +1,474 @@
+import asyncio
+import threading
+import time
+import uuid
+import log
+from pubsub import CONNECTION_ERRORS, deliver
+from router import players
+
+logger = log.get_logger(__name__)
+
+# Prefix of the stream that holds the messages of a game
+STREAM_PREFIX = 'stream:'
+
+# Suffix of the sorted set of dispatchers that read the stream of a game
+# for a player, scored by the time at which they stop counting unless
+# they send a heartbeat; dispatchers that read it for spectators only
+# are left out
+READERS_SUFFIX = ':readers'
+
+# Seconds a dispatcher counts as a reader of a stream without sending a
+# heartbeat. It sends one every third of this.
+READER_TTL = 30
+
+# Field of a stream entry that holds the serialized Message
+FIELD = 'm'
+
+# Maximum number of entries returned by a single XREAD
+COUNT = 100
+
+# Number of entries kept per stream; Redis trims approximately, so it
+# may keep a few more. This is a complete game, in which both players
+# attack every cell of the board with ATTACK, STATUS and STOP_TURN,
+# plus BEGIN, LOST and WATCH messages, so a reader that falls behind
+# (e.g., while it reconnects) or a spectator that subscribes late still
+# gets every message of the game.
+MAXLEN = 2 * 100 * 3 + 10
+
+# Seconds a game stream is kept after the last message
+EXPIRE = 3600
+
+# Seconds to wait before reading again after losing the connection
+RETRY_DELAY = 0.5
+
+
+def _readers(channel):
+    """Get the key of the readers of the stream of a channel.
+
+    :param channel: Channel of the stream
+    :return: Key of the sorted set of readers
+    """
+    return STREAM_PREFIX + channel + READERS_SUFFIX
+
+
+def _beat(pipe, dispatcher_id, channels, xx=False):
+    """Queue the commands that move the deadline of a dispatcher in the
+    readers of streams forward.
+
+    :param pipe: Pipeline to use
+    :param dispatcher_id: ID of the dispatcher
+    :param channels: Channels of the streams
+    :param xx: Only update dispatchers that are readers already
+    """
+    deadline = time.time() + READER_TTL
+    for channel in channels:
+        pipe.zadd(_readers(channel), {dispatcher_id: deadline}, xx=xx)
+        pipe.expire(_readers(channel), EXPIRE)
+
+
+def _append(pipe, items):
+    """Queue XADD commands for messages on a pipeline.
+
+    :param pipe: Pipeline to use
+    :param items: List of (channel, Message) tuples, in order
+    :return: Keys of the streams that were appended to
+    """
+    keys = {}
+    for channel, message in items:
+        key = STREAM_PREFIX + channel
+        pipe.xadd(key, {FIELD: message.pack()}, maxlen=MAXLEN,
+                  approximate=True)
+        keys[key] = None
+    return list(keys)
+
+
+class StreamDispatcher:
+    """A Redis Streams transport with the same interface as
+    :class:`pubsub.PubSubDispatcher`.
+
+    Every game has its own stream, to which messages are appended with
+    XADD. A single thread per process reads all streams that this
+    process is subscribed to with one blocking XREAD, which returns many
+    entries per call. The thread remembers the ID of the last entry that
+    it read per stream, so no messages are lost when the connection to
+    Redis has to be re-established.
+
+    Every player's server must see every message of its game, which is
+    why plain XREAD is used instead of consumer groups, which would
+    divide the messages among the readers.
+
+    A private control stream is always read as well. Entries on it wake
+    up the thread when a game is subscribed or the dispatcher is stopped.
+
+    The dispatchers that read a stream for a player are kept in a sorted
+    set, so :meth:`publish` can tell how many players receive a message,
+    as PubSub does. A dispatcher only joins it with its first player and
+    leaves it with its last one, or when it is stopped; the feeds of
+    spectators do not count. The thread sends a heartbeat for its
+    streams between reads, so the readers of a process that dies stop
+    counting after READER_TTL seconds.
+    """
+
+    def __init__(self, _redis):
+        self.__r = _redis
+        self.__id = str(uuid.uuid4())
+        self.__handlers = {}
+        self.__last_ids = {}
+        self.__reading = set()
+        self.__lock = threading.Lock()
+        self.__control = f'dispatcher:{self.__id}'
+        self.__running = False
+        self.__thread = None
+
+    def start(self):
+        """Start the thread that reads messages from Redis.
+        """
+        # Read the control stream from its newest entry on, so no entry
+        # that is added later can be missed
+        self.__last_ids[self.__control] = self.__r.xadd(
+            self.__control, {FIELD: ''}, maxlen=10, approximate=True)
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__listen, daemon=True)
+        self.__thread.start()
+
+    def stop(self):
+        """Stop the thread that reads messages from Redis.
+        """
+        if self.__thread is None:
+            return
+
+        self.__running = False
+        self.__wake()
+        self.__thread.join()
+        self.__thread = None
+
+        with self.__lock:
+            reading, self.__reading = self.__reading, set()
+        pipe = self.__r.pipeline(transaction=False)
+        for channel in reading:
+            pipe.zrem(_readers(channel), self.__id)
+        pipe.delete(self.__control)
+        pipe.execute()
+
+    def subscribe(self, channel, handler, timeout=None):
+        """Register a handler for messages published on a channel.
+        Streams keep their messages, so reading starts at the first
+        message of the game and nothing can be missed.
+
+        :param channel: Channel to subscribe to
+        :param handler: Callable that is called with each Message
+        :param timeout: Not used
+        :return: True
+        """
+        with self.__lock:
+            handlers = self.__handlers.setdefault(channel, [])
+            handlers.append(handler)
+            first = len(handlers) == 1
+            reader = players([handler]) == players(handlers) == 1
+            if reader:
+                self.__reading.add(channel)
+            if first:
+                logger.info('Subscribing to stream of %s', channel)
+                self.__last_ids[STREAM_PREFIX + channel] = '0-0'
+
+        if reader:
+            pipe = self.__r.pipeline()
+            _beat(pipe, self.__id, [channel])
+            pipe.execute()
+
+        if first:
+            self.__wake()
+        return True
+
+    def unsubscribe(self, channel, handler):
+        """Remove a handler that was registered with :meth:`subscribe`.
+
+        :param channel: Channel the handler was subscribed to
+        :param handler: Handler to remove
+        """
+        with self.__lock:
+            handlers = self.__handlers.get(channel, [])
+            if handler not in handlers:
+                return
+
+            handlers.remove(handler)
+            reader = players([handler]) == 1 and not players(handlers)
+            if reader:
+                self.__reading.discard(channel)
+            if not handlers:
+                logger.info('Unsubscribing from stream of %s', channel)
+                del self.__handlers[channel]
+                del self.__last_ids[STREAM_PREFIX + channel]
+
+        if reader:
+            self.__r.zrem(_readers(channel), self.__id)
+
+    def handlers(self, channel):
+        """Get the handlers in this process for a channel.
+
+        :param channel: Channel to check
+        :return: List of handlers registered for the channel
+        """
+        with self.__lock:
+            return list(self.__handlers.get(channel, []))
+
+    def publish(self, channel, message):
+        """Append a message to the stream of a channel.
+
+        :param channel: Channel to use
+        :param message: Message to publish
+        :return: Number of dispatchers that read the stream for a player
+        """
+        key = STREAM_PREFIX + channel
+        pipe = self.__r.pipeline()
+        pipe.xadd(key, {FIELD: message.pack()}, maxlen=MAXLEN,
+                  approximate=True)
+        pipe.expire(key, EXPIRE)
+        pipe.zcount(_readers(channel), time.time(), '+inf')
+        return pipe.execute()[-1]
+
+    def publish_batch(self, items):
+        """Append several messages to their streams in one pipeline.
+        The expiry of each stream is only moved once per batch.
+
+        :param items: List of (channel, Message) tuples, in order
+        """
+        pipe = self.__r.pipeline(transaction=False)
+        for key in _append(pipe, items):
+            pipe.expire(key, EXPIRE)
+        pipe.execute()
+
+    def __wake(self):
+        """Wake up the reading thread so it picks up the new streams.
+        """
+        self.__r.xadd(self.__control, {FIELD: ''}, maxlen=10,
+                      approximate=True)
+
+    def __heartbeat(self):
+        """Move the deadline of this dispatcher in the readers of the
+        streams it reads for players forward. Streams that it has
+        stopped reading in the meantime are not added again.
+        """
+        with self.__lock:
+            reading = list(self.__reading)
+        if not reading:
+            return
+
+        pipe = self.__r.pipeline(transaction=False)
+        _beat(pipe, self.__id, reading, xx=True)
+        pipe.execute()
+
+    def __listen(self):
+        """Read the streams of all subscribed games and dispatch their
+        messages to the handlers, until the dispatcher is stopped. A
+        read waits at most until the next heartbeat is due.
+        """
+        next_beat = 0
+        while self.__running:
+            with self.__lock:
+                streams = dict(self.__last_ids)
+
+            try:
+                if time.monotonic() >= next_beat:
+                    next_beat = time.monotonic() + READER_TTL / 3
+                    self.__heartbeat()
+                response = self.__r.xread(
+                    streams, count=COUNT, block=int(READER_TTL / 3 * 1000))
+            except CONNECTION_ERRORS:
+                logger.exception('Lost connection to Redis, reading again')
+                time.sleep(RETRY_DELAY)
+                continue
+            except Exception:
+                logger.critical('Stream reader failed, no more messages '
+                                'are received', exc_info=True)
+                raise
+
+            for b_key, entries in response:
+                key = b_key.decode('utf-8')
+                with self.__lock:
+                    if key not in self.__last_ids:
+                        continue
+                    self.__last_ids[key] = entries[-1][0]
+                if key == self.__control:
+                    continue
+
+                channel = key[len(STREAM_PREFIX):]
+                for _, fields in entries:
+                    deliver(channel, self.handlers(channel),
+                            fields[FIELD.encode()])
+
+
+class AsyncStreamDispatcher:
+    """The asyncio counterpart of :class:`StreamDispatcher`. A single
+    task reads the streams.
+    """
+
+    def __init__(self, _redis):
+        self.__r = _redis
+        self.__id = str(uuid.uuid4())
+        self.__handlers = {}
+        self.__last_ids = {}
+        self.__reading = set()
+        self.__control = f'dispatcher:{self.__id}'
+        self.__running = False
+        self.__task = None
+
+    async def start(self):
+        """Start the task that reads messages from Redis.
+        """
+        self.__last_ids[self.__control] = await self.__r.xadd(
+            self.__control, {FIELD: ''}, maxlen=10, approximate=True)
+        self.__running = True
+        self.__task = asyncio.create_task(self.__listen())
+
+    async def stop(self):
+        """Stop the task that reads messages from Redis.
+        """
+        if self.__task is None:
+            return
+
+        self.__running = False
+        await self.__wake()
+        await self.__task
+        self.__task = None
+
+        reading, self.__reading = self.__reading, set()
+        pipe = self.__r.pipeline(transaction=False)
+        for channel in reading:
+            pipe.zrem(_readers(channel), self.__id)
+        pipe.delete(self.__control)
+        await pipe.execute()
+
+    async def subscribe(self, channel, handler, timeout=None):
+        """Register a handler for messages published on a channel.
+        Streams keep their messages, so reading starts at the first
+        message of the game and nothing can be missed.
+
+        :param channel: Channel to subscribe to
+        :param handler: Callable that is called with each Message
+        :param timeout: Not used
+        :return: True
+        """
+        handlers = self.__handlers.setdefault(channel, [])
+        handlers.append(handler)
+        first = len(handlers) == 1
+        if first:
+            logger.info('Subscribing to stream of %s', channel)
+            self.__last_ids[STREAM_PREFIX + channel] = '0-0'
+
+        if players([handler]) == players(handlers) == 1:
+            self.__reading.add(channel)
+            pipe = self.__r.pipeline()
+            _beat(pipe, self.__id, [channel])
+            await pipe.execute()
+
+        if first:
+            await self.__wake()
+        return True
+
+    async def unsubscribe(self, channel, handler):
+        """Remove a handler that was registered with :meth:`subscribe`.
+
+        :param channel: Channel the handler was subscribed to
+        :param handler: Handler to remove
+        """
+        handlers = self.__handlers.get(channel, [])
+        if handler not in handlers:
+            return
+
+        handlers.remove(handler)
+        if not handlers:
+            logger.info('Unsubscribing from stream of %s', channel)
+            del self.__handlers[channel]
+            del self.__last_ids[STREAM_PREFIX + channel]
+
+        if players([handler]) == 1 and not players(handlers):
+            self.__reading.discard(channel)
+            await self.__r.zrem(_readers(channel), self.__id)
+
+    def handlers(self, channel):
+        """Get the handlers in this process for a channel.
+
+        :param channel: Channel to check
+        :return: List of handlers registered for the channel
+        """
+        return list(self.__handlers.get(channel, []))
+
+    async def publish(self, channel, message):
+        """Append a message to the stream of a channel.
+
+        :param channel: Channel to use
+        :param message: Message to publish
+        :return: Number of dispatchers that read the stream for a player
+        """
+        key = STREAM_PREFIX + channel
+        pipe = self.__r.pipeline()
+        pipe.xadd(key, {FIELD: message.pack()}, maxlen=MAXLEN,
+                  approximate=True)
+        pipe.expire(key, EXPIRE)
+        pipe.zcount(_readers(channel), time.time(), '+inf')
+        return (await pipe.execute())[-1]
+
+    async def publish_batch(self, items):
+        """Append several messages to their streams in one pipeline.
+        The expiry of each stream is only moved once per batch.
+
+        :param items: List of (channel, Message) tuples, in order
+        """
+        pipe = self.__r.pipeline(transaction=False)
+        for key in _append(pipe, items):
+            pipe.expire(key, EXPIRE)
+        await pipe.execute()
+
+    async def __wake(self):
+        """Wake up the reading task so it picks up the new streams.
+        """
+        await self.__r.xadd(self.__control, {FIELD: ''}, maxlen=10,
+                            approximate=True)
+
+    async def __heartbeat(self):
+        """Move the deadline of this dispatcher in the readers of the
+        streams it reads for players forward.
+        """
+        if not self.__reading:
+            return
+
+        pipe = self.__r.pipeline(transaction=False)
+        _beat(pipe, self.__id, list(self.__reading), xx=True)
+        await pipe.execute()
+
+    async def __listen(self):
+        """Read the streams of all subscribed games and dispatch their
+        messages to the handlers, until the dispatcher is stopped. A
+        read waits at most until the next heartbeat is due.
+        """
+        next_beat = 0
+        while self.__running:
+            try:
+                if time.monotonic() >= next_beat:
+                    next_beat = time.monotonic() + READER_TTL / 3
+                    await self.__heartbeat()
+                response = await self.__r.xread(
+                    dict(self.__last_ids), count=COUNT,
+                    block=int(READER_TTL / 3 * 1000))
+            except CONNECTION_ERRORS:
+                logger.exception('Lost connection to Redis, reading again')
+                await asyncio.sleep(RETRY_DELAY)
+                continue
+            except Exception:
+                logger.critical('Stream reader failed, no more messages '
+                                'are received', exc_info=True)
+                raise
+
+            for b_key, entries in response:
+                key = b_key.decode('utf-8')
+                if key not in self.__last_ids:
+                    continue
+                self.__last_ids[key] = entries[-1][0]
+                if key == self.__control:
+                    continue
+
+                channel = key[len(STREAM_PREFIX):]
+                for _, fields in entries:
+                    deliver(channel, self.handlers(channel),
+                            fields[FIELD.encode()])
@@ -0,0 +1,267 @@
+import multiprocessing
+import os
+import queue
+import signal
+import threading
+import time
+import urllib.request
+import log
+import main
+import metrics
+from prometheus_client import CollectorRegistry, Counter, Gauge, Metric
+from prometheus_client.parser import text_string_to_metric_families
+
+logger = log.get_logger(__name__)
+
+# Seconds between checks of the server processes
+CHECK_INTERVAL = 1.0
+
+# Seconds to wait before restarting a server process that exited. The
+# delay doubles while a process keeps exiting soon after its start.
+RESTART_DELAY = 1.0
+RESTART_DELAY_MAX = 30.0
+
+# Seconds after which a server process is considered to have started
+# fine, which resets its restart delay
+STABLE_SECONDS = 60.0
+
+# Seconds to wait for the metrics of a server process, and for the
+# server processes to exit
+SCRAPE_TIMEOUT = 1.0
+STOP_TIMEOUT = 10.0
+
+# Metrics of the supervisor itself. The metrics of the server processes
+# are added up, see Supervisor.collect().
+REGISTRY = CollectorRegistry()
+WORKERS_ALIVE = Gauge(
+    'battleship_workers',
+    'Server processes that are running', registry=REGISTRY)
+WORKER_RESTARTS = Counter(
+    'battleship_worker_restarts_total',
+    'Server processes restarted after they exited', ['worker'],
+    registry=REGISTRY)
+
+
+def run_worker(index, processes, ports):
+    """Run a Battleship server process. This is the entry point of the
+    processes started by the supervisor.
+
+    :param index: Index of the server process
+    :param processes: Number of server processes
+    :param ports: Queue to report the port of the metrics endpoint on
+    """
+    settings = main.setup(processes)
+    if settings.metrics_port:
+        server, _ = metrics.start_http_server(0, '127.0.0.1',
+                                              metrics.REGISTRY)
+        ports.put((index, server.server_address[1]))
+    main.serve(settings)
+
+
+class Supervisor:
+    """Run several Battleship server processes that listen on the same
+    port, e.g., one per CPU.
+
+    The kernel spreads the connections over the processes (SO_REUSEPORT),
+    so no load balancer is needed and every process has a core (and a
+    GIL) of its own. The servers share their games through Redis, as
+    servers on different hosts do. Processes that exit are restarted.
+    The metrics of the processes are summed up by :meth:`collect`, so
+    the supervisor serves them in place of the metrics of a single
+    server.
+    """
+
+    def __init__(self, processes, target=run_worker, start_method='spawn',
+                 restart_delay=RESTART_DELAY):
+        """Create a Supervisor.
+
+        :param processes: Number of server processes
+        :param target: Entry point of a server process, which gets the
+                       index, the number of processes and a queue for
+                       the port of its metrics endpoint
+        :param start_method: multiprocessing start method. Processes are
+                             spawned by default, because gRPC does not
+                             support forking a process that uses it.
+        :param restart_delay: Seconds to wait before the first restart
+        """
+        self.__processes = processes
+        self.__target = target
+        self.__mp = multiprocessing.get_context(start_method)
+        self.__restart_delay = restart_delay
+        self.__ports = self.__mp.Queue()
+        self.__workers = [None] * processes
+        self.__started = [0.0] * processes
+        self.__delays = [restart_delay] * processes
+        self.__restart_at = [None] * processes
+        self.__metrics_ports = {}
+        self.__lock = threading.Lock()
+        self.__stopping = threading.Event()
+
+    def start(self):
+        """Start all server processes.
+        """
+        for index in range(self.__processes):
+            self.__start_worker(index)
+        WORKERS_ALIVE.set(self.__processes)
+        logger.info('Started %s server processes', self.__processes)
+
+    def __start_worker(self, index):
+        """Start a server process.
+
+        :param index: Index of the server process
+        """
+        process = self.__mp.Process(
+            target=self.__target,
+            args=(index, self.__processes, self.__ports),
+            name=f'battleship-{index}', daemon=True)
+        process.start()
+        self.__workers[index] = process
+        self.__started[index] = time.monotonic()
+        self.__restart_at[index] = None
+
+    def check(self):
+        """Restart the server processes that have exited, once their
+        restart delay has passed.
+
+        :return: Number of server processes that are running
+        """
+        self.__read_ports()
+
+        now = time.monotonic()
+        alive = 0
+        for index, process in enumerate(self.__workers):
+            if process.is_alive():
+                alive += 1
+            elif self.__restart_at[index] is None:
+                if now - self.__started[index] >= STABLE_SECONDS:
+                    self.__delays[index] = self.__restart_delay
+                delay = self.__delays[index]
+                logger.error('Server process %s exited with code %s, '
+                             'restarting it in %.0f s', index,
+                             process.exitcode, delay)
+                self.__restart_at[index] = now + delay
+                self.__delays[index] = min(delay * 2, RESTART_DELAY_MAX)
+                with self.__lock:
+                    self.__metrics_ports.pop(index, None)
+            elif now >= self.__restart_at[index]:
+                WORKER_RESTARTS.labels(index).inc()
+                self.__start_worker(index)
+                alive += 1
+
+        WORKERS_ALIVE.set(alive)
+        return alive
+
+    def __read_ports(self):
+        """Take note of the metrics endpoints the server processes have
+        reported.
+        """
+        while True:
+            try:
+                index, port = self.__ports.get_nowait()
+            except queue.Empty:
+                return
+            with self.__lock:
+                self.__metrics_ports[index] = port
+
+    def run(self):
+        """Check the server processes until :meth:`stop` is called.
+        """
+        while not self.__stopping.wait(CHECK_INTERVAL):
+            self.check()
+
+    def stop(self):
+        """Terminate the server processes and wait for them to exit.
+        """
+        self.__stopping.set()
+        for process in self.__workers:
+            if process is not None and process.is_alive():
+                process.terminate()
+        for process in self.__workers:
+            if process is None:
+                continue
+            process.join(STOP_TIMEOUT)
+            if process.is_alive():
+                process.kill()
+        WORKERS_ALIVE.set(0)
+
+    def collect(self):
+        """Collect the metrics of the server processes, added up, and
+        the metrics of the supervisor, as a prometheus_client collector.
+
+        :return: Generator of the metric families
+        """
+        self.__read_ports()
+        with self.__lock:
+            ports = list(self.__metrics_ports.items())
+
+        texts = []
+        for index, port in ports:
+            url = f'http://127.0.0.1:{port}/metrics'
+            try:
+                with urllib.request.urlopen(url, timeout=SCRAPE_TIMEOUT) as r:
+                    texts.append(r.read().decode('utf-8'))
+            except OSError:
+                logger.warning('Unable to get the metrics of server '
+                               'process %s', index)
+        yield from aggregate(texts)
+        yield from REGISTRY.collect()
+
+
+def aggregate(texts):
+    """Add up the samples of the metrics of several processes that
+    have the same name and labels.
+
+    :param texts: Metrics of the processes in the Prometheus text format
+    :return: List of the added up metric families
+    """
+    families = {}
+    for text in texts:
+        for family in text_string_to_metric_families(text):
+            total, values = families.setdefault(
+                family.name,
+                (Metric(family.name, family.documentation, family.type), {}))
+            for sample in family.samples:
+                key = (sample.name, tuple(sorted(sample.labels.items())))
+                values[key] = values.get(key, 0.0) + sample.value
+
+    for total, values in families.values():
+        for (name, labels), value in values.items():
+            total.add_sample(name, dict(labels), value)
+    return [total for total, _ in families.values()]
+
+
+def supervise():
+    """Run a Battleship server process per CPU (or PROCESSES) on the
+    same port. The server processes are configured by the same
+    environment variables as main.py; MAX_STREAMS and WORKERS hold per
+    process.
+    """
+    processes = os.getenv('PROCESSES', '')
+    try:
+        processes = int(processes) if processes else main.cpus()
+        if processes < 1:
+            raise ValueError()
+    except ValueError:
+        logger.fatal(f'PROCESSES must be a positive number, not {processes}!')
+        exit(1)
+
+    # Check the settings before any process is started
+    settings = main.setup(processes)
+
+    supervisor = Supervisor(processes)
+    signal.signal(signal.SIGTERM, lambda *args: supervisor.stop())
+    supervisor.start()
+    if settings.metrics_port:
+        metrics.start_http_server(int(settings.metrics_port),
+                                  registry=supervisor)
+
+    try:
+        supervisor.run()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        supervisor.stop()
+
+
+if __name__ == '__main__':
+    supervise()
@@ -0,0 +1,381 @@
+import asyncio
+import threading
+from collections import deque
+import log
+import metrics
+from battleships_pb2 import GameEvent, Shot, Status
+from message import Message
+
+logger = log.get_logger(__name__)
+
+# Events kept per watched game. A viewer that falls further behind gets
+# a snapshot of the game instead of the events it missed, so a slow
+# viewer never holds more than this in memory.
+BUFFER = 64
+
+
+class GameFeed:
+    """The events of a single game for all viewers of a Battleship
+    server process. The feed is the handler that is subscribed to the
+    game's channel, so a game costs one subscription however many
+    viewers watch it.
+
+    The game messages are turned into GameEvents once, numbered and kept
+    in a ring buffer, from which every viewer reads at its own pace. The
+    feed also keeps the state of the game (resolved attacks, turn and
+    pending attack), which a viewer that falls behind the buffer, or
+    starts watching late, gets as a SNAPSHOT in place of the events it
+    missed.
+    """
+
+    def __init__(self, game_id, size=BUFFER):
+        """Create a GameFeed.
+
+        :param game_id: ID of the game
+        :param size: Number of events kept for the viewers
+        """
+        self.__id = game_id
+        self.__events = deque(maxlen=size)
+        self.__sequence = 0
+        self.__closed = False
+
+        # State of the game for snapshots: the resolved attacks, the
+        # players seen so far, the player whose turn it is (if known),
+        # the attack that waits for its report and the END event
+        self.__shots = []
+        self.__players = []
+        self.__turn = ''
+        self.__attack = None
+        self.__end = None
+
+        self.__lock = threading.Lock()
+        self.__changed = threading.Condition(self.__lock)
+
+    @property
+    def id(self):
+        """Get the ID of the game.
+
+        :return: Game ID
+        """
+        return self.__id
+
+    @property
+    def closed(self):
+        """Has the feed been closed?
+
+        :return: True if closed, False otherwise
+        """
+        return self.__closed
+
+    def __call__(self, message):
+        """Handle a message of the game: add its event for the viewers.
+
+        :param message: Message published on the game's channel
+        """
+        with self.__lock:
+            event = self.__apply(message)
+            if event is None:
+                return
+            self.__sequence += 1
+            event.sequence = self.__sequence
+            self.__events.append(event)
+        self.changed()
+
+    def __apply(self, message):
+        """Update the state of the game with a message. The lock must be
+        held.
+
+        :param message: Message of the game
+        :return: GameEvent of the message, or None if it has none
+        """
+        player = message.player
+        if player and player not in self.__players:
+            self.__players.append(player)
+
+        if message.type == Message.BEGIN:
+            return GameEvent(type=GameEvent.BEGIN, player=player)
+
+        if message.type == Message.STOP_TURN:
+            others = [p for p in self.__players if p != player]
+            self.__turn = others[0] if others else ''
+            return GameEvent(type=GameEvent.STOP_TURN, player=player)
+
+        if message.type == Message.ATTACK:
+            self.__turn = player
+            self.__attack = player, message.data
+            return GameEvent(type=GameEvent.ATTACK, player=player,
+                             vector=message.data)
+
+        if message.type in (Message.STATUS, Message.LOST):
+            if message.type == Message.LOST:
+                state = Status.State.DEFEAT
+            elif message.data.isdigit():
+                state = int(message.data)
+            else:
+                logger.error('Invalid STATUS %r in game %s', message.data,
+                             self.__id)
+                return None
+
+            attacker, vector = self.__attack or ('', '')
+            self.__attack = None
+            self.__shots.append(Shot(player=attacker, vector=vector,
+                                     state=state))
+            if message.type == Message.STATUS:
+                return GameEvent(type=GameEvent.REPORT, player=player,
+                                 vector=vector, state=state)
+
+            self.__end = GameEvent(type=GameEvent.END, player=player,
+                                   vector=vector, state=state)
+            return self.__end
+
+        return None
+
+    def events(self, sequence):
+        """Get the events that follow an event, without waiting. A viewer
+        whose next event is no longer kept gets a SNAPSHOT of the game
+        instead, followed by the END event if the game has ended.
+
+        :param sequence: Number of the last event the viewer has, 0 if
+                         it has none
+        :return: List of GameEvents, which is empty if there are no new
+                 events
+        """
+        with self.__lock:
+            if sequence >= self.__sequence:
+                return []
+
+            first = self.__events[0].sequence
+            if sequence + 1 >= first:
+                return list(self.__events)[sequence + 1 - first:]
+
+            if sequence:
+                metrics.WATCH_SKIPPED_EVENTS.inc(self.__sequence - sequence)
+
+            snapshot = GameEvent(type=GameEvent.SNAPSHOT,
+                                 sequence=self.__sequence, player=self.__turn,
+                                 shots=self.__shots)
+            if self.__attack is not None:
+                snapshot.vector = self.__attack[1]
+            if self.__end is not None:
+                return [snapshot, self.__end]
+            return [snapshot]
+
+    def read(self, sequence, is_active=lambda: True, timeout=None):
+        """Wait for the events that follow an event, see :meth:`events`.
+
+        :param sequence: Number of the last event the viewer has, 0 if
+                         it has none
+        :param is_active: Function that tells whether the viewer is still
+                          connected; call :meth:`changed` when it is not
+        :param timeout: Seconds to wait, or None to wait until there are
+                        events
+        :return: List of GameEvents, which is empty if the feed was
+                 closed or the viewer is gone, or None if no event
+                 arrived in time
+        """
+        with self.__changed:
+            if not self.__changed.wait_for(
+                    lambda: self.__sequence > sequence or self.__closed
+                    or not is_active(), timeout):
+                return None
+        if not is_active():
+            return []
+        return self.events(sequence)
+
+    def changed(self):
+        """Wake up the viewers that wait for events.
+        """
+        with self.__changed:
+            self.__changed.notify_all()
+
+    def close(self):
+        """Stop waiting for events; the viewers get the events they have
+        not read yet and then none.
+        """
+        self.__closed = True
+        self.changed()
+
+
+class AsyncGameFeed(GameFeed):
+    """The asyncio counterpart of :class:`GameFeed`. The messages are
+    handled on the event loop, which wakes the viewers with an
+    asyncio.Event that is replaced after every change.
+    """
+
+    def __init__(self, game_id, size=BUFFER):
+        super().__init__(game_id, size)
+        self.__changed = asyncio.Event()
+
+    async def read(self, sequence, timeout=None):
+        """Wait for the events that follow an event, see :meth:`events`.
+
+        :param sequence: Number of the last event the viewer has, 0 if
+                         it has none
+        :param timeout: Seconds to wait, or None to wait until there are
+                        events
+        :return: List of GameEvents, which is empty if the feed was
+                 closed, or None if no event arrived in time
+        """
+        loop = asyncio.get_running_loop()
+        deadline = None if timeout is None else loop.time() + timeout
+        while True:
+            changed = self.__changed
+            events = self.events(sequence)
+            if events or self.closed:
+                return events
+
+            remaining = None if deadline is None else deadline - loop.time()
+            try:
+                await asyncio.wait_for(changed.wait(), remaining)
+            except asyncio.TimeoutError:
+                return None
+
+    def changed(self):
+        """Wake up the viewers that wait for events.
+        """
+        changed, self.__changed = self.__changed, asyncio.Event()
+        changed.set()
+
+
+class Spectators:
+    """The games watched by the viewers of a Battleship server process.
+    A game gets a single GameFeed, subscribed to its channel with the
+    dispatcher, when its first viewer arrives, and is unsubscribed when
+    its last viewer leaves.
+
+    Unless both players of the game are connected to this process, a
+    WATCH message is published on the game's channel when its feed is
+    subscribed. It tells the servers of the players to route the game
+    through Redis even if both are connected to the same server.
+    """
+
+    def __init__(self, dispatcher, router):
+        """Create Spectators.
+
+        :param dispatcher: Dispatcher that is shared by all players of
+                           this process
+        :param router: LocalRouter of this process
+        """
+        self.__dispatcher = dispatcher
+        self.__router = router
+
+        # Feed and number of viewers per game ID
+        self.__feeds = {}
+        self.__lock = threading.Lock()
+
+    def watch(self, game_id):
+        """Start watching a game.
+
+        :param game_id: ID of the game
+        :return: GameFeed of the game, which must be handed back to
+                 :meth:`unwatch`, or None if the game's channel could not
+                 be subscribed to
+        """
+        with self.__lock:
+            entry = self.__feeds.get(game_id)
+            is_new = entry is None
+            if is_new:
+                entry = self.__feeds[game_id] = [GameFeed(game_id), 0]
+                metrics.WATCHED_GAMES.inc()
+            entry[1] += 1
+        metrics.WATCHERS.inc()
+
+        feed = entry[0]
+        if not is_new:
+            return feed
+
+        if not self.__dispatcher.subscribe(game_id, feed):
+            logger.error('Unable to subscribe to channel %s', game_id)
+            self.unwatch(feed)
+            return None
+
+        if not self.__router.is_local(game_id):
+            metrics.MESSAGES_PUBLISHED.labels(Message.WATCH).inc()
+            self.__dispatcher.publish(game_id, Message(Message.WATCH, '', ''))
+        return feed
+
+    def unwatch(self, feed):
+        """Stop watching a game.
+
+        :param feed: GameFeed returned by :meth:`watch`
+        """
+        metrics.WATCHERS.dec()
+        with self.__lock:
+            entry = self.__feeds[feed.id]
+            entry[1] -= 1
+            if entry[1]:
+                return
+            del self.__feeds[feed.id]
+            metrics.WATCHED_GAMES.dec()
+        self.__dispatcher.unsubscribe(feed.id, feed)
+
+    def close(self):
+        """Close the feeds of all games, which ends the streams of their
+        viewers.
+        """
+        with self.__lock:
+            feeds = [feed for feed, _ in self.__feeds.values()]
+        for feed in feeds:
+            feed.close()
+
+
+class AsyncSpectators:
+    """The asyncio counterpart of :class:`Spectators`.
+    """
+
+    def __init__(self, dispatcher, router):
+        self.__dispatcher = dispatcher
+        self.__router = router
+        self.__feeds = {}
+
+    async def watch(self, game_id):
+        """Start watching a game.
+
+        :param game_id: ID of the game
+        :return: AsyncGameFeed of the game, which must be handed back to
+                 :meth:`unwatch`, or None if the game's channel could not
+                 be subscribed to
+        """
+        entry = self.__feeds.get(game_id)
+        is_new = entry is None
+        if is_new:
+            entry = self.__feeds[game_id] = [AsyncGameFeed(game_id), 0]
+            metrics.WATCHED_GAMES.inc()
+        entry[1] += 1
+        metrics.WATCHERS.inc()
+
+        feed = entry[0]
+        if not is_new:
+            return feed
+
+        if not await self.__dispatcher.subscribe(game_id, feed):
+            logger.error('Unable to subscribe to channel %s', game_id)
+            await self.unwatch(feed)
+            return None
+
+        if not self.__router.is_local(game_id):
+            metrics.MESSAGES_PUBLISHED.labels(Message.WATCH).inc()
+            await self.__dispatcher.publish(game_id,
+                                            Message(Message.WATCH, '', ''))
+        return feed
+
+    async def unwatch(self, feed):
+        """Stop watching a game.
+
+        :param feed: AsyncGameFeed returned by :meth:`watch`
+        """
+        metrics.WATCHERS.dec()
+        entry = self.__feeds[feed.id]
+        entry[1] -= 1
+        if entry[1]:
+            return
+        del self.__feeds[feed.id]
+        metrics.WATCHED_GAMES.dec()
+        await self.__dispatcher.unsubscribe(feed.id, feed)
+
+    def close(self):
+        """Close the feeds of all games, which ends the streams of their
+        viewers.
+        """
+        for feed, _ in list(self.__feeds.values()):
+            feed.close()
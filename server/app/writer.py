@@ -0,0 +1,197 @@
+import asyncio
+import threading
+import time
+from collections import deque
+import log
+import metrics
+
+logger = log.get_logger(__name__)
+
+# Seconds to wait for more messages before a batch that is not yet full
+# is sent
+FLUSH_INTERVAL = 0.002
+
+# Maximum number of messages sent in a single pipeline
+BATCH_SIZE = 100
+
+
+class PublishWriter:
+    """Publish the messages of all players of a Battleship server
+    process from a single thread.
+
+    Messages are queued by :meth:`publish`, which never waits for Redis,
+    so the threads that handle PubSub messages are not blocked by
+    network I/O. The writer thread sends the queued messages in batches,
+    each in a single pipeline (i.e., one round trip to Redis). A batch is
+    sent once it is full or when no more messages arrived within the
+    flush interval. Messages reach Redis in the order they were queued.
+    The time at which a message is queued is recorded in the message, so
+    the receivers can measure the delivery lag.
+    """
+
+    def __init__(self, dispatcher, interval=FLUSH_INTERVAL,
+                 batch=BATCH_SIZE):
+        """Create a PublishWriter.
+
+        :param dispatcher: Dispatcher whose publish_batch sends messages
+        :param interval: Seconds to wait for a batch to fill up
+        :param batch: Maximum number of messages per pipeline
+        """
+        self.__dispatcher = dispatcher
+        self.__interval = interval
+        self.__batch = batch
+        self.__messages = deque()
+        self.__cond = threading.Condition()
+        self.__running = False
+        self.__thread = None
+
+    def start(self):
+        """Start the thread that sends the queued messages.
+        """
+        self.__running = True
+        self.__thread = threading.Thread(target=self.__run, daemon=True)
+        self.__thread.start()
+
+    def stop(self, timeout=1.0):
+        """Send the messages that are still queued and stop the thread.
+
+        :param timeout: Maximum number of seconds to wait for the queue
+        """
+        if self.__thread is None:
+            return
+
+        with self.__cond:
+            self.__running = False
+            self.__cond.notify()
+        self.__thread.join(timeout)
+        if self.__thread.is_alive():
+            logger.error('Timeout flushing queued messages to Redis')
+        self.__thread = None
+
+    def publish(self, channel, message):
+        """Queue a message for publication on a certain channel.
+
+        :param channel: Channel to use
+        :param message: Message to publish
+        """
+        message.sent = time.time()
+        with self.__cond:
+            self.__messages.append((channel, message))
+            self.__cond.notify()
+
+    def __run(self):
+        """Send batches of queued messages until the writer is stopped
+        and the queue is empty.
+        """
+        while True:
+            with self.__cond:
+                self.__cond.wait_for(
+                    lambda: not self.__running or self.__messages)
+                if self.__running and self.__interval:
+                    self.__cond.wait_for(
+                        lambda: not self.__running
+                        or len(self.__messages) >= self.__batch,
+                        self.__interval)
+                if not self.__messages:
+                    return
+
+                n = min(len(self.__messages), self.__batch)
+                items = [self.__messages.popleft() for _ in range(n)]
+
+            start = time.perf_counter()
+            try:
+                self.__dispatcher.publish_batch(items)
+                metrics.PUBLISH_SECONDS.observe(time.perf_counter() - start)
+            except Exception:
+                logger.exception('Unable to publish %s messages', n)
+
+
+class AsyncPublishWriter:
+    """The asyncio counterpart of :class:`PublishWriter`. A single task
+    sends the queued messages.
+    """
+
+    def __init__(self, dispatcher, interval=FLUSH_INTERVAL,
+                 batch=BATCH_SIZE):
+        """Create an AsyncPublishWriter.
+
+        :param dispatcher: Dispatcher whose publish_batch sends messages
+        :param interval: Seconds to wait for a batch to fill up
+        :param batch: Maximum number of messages per pipeline
+        """
+        self.__dispatcher = dispatcher
+        self.__interval = interval
+        self.__batch = batch
+        self.__messages = deque()
+        self.__ready = None
+        self.__full = None
+        self.__running = False
+        self.__task = None
+
+    async def start(self):
+        """Start the task that sends the queued messages.
+        """
+        self.__ready = asyncio.Event()
+        self.__full = asyncio.Event()
+        self.__running = True
+        self.__task = asyncio.create_task(self.__run())
+
+    async def stop(self, timeout=1.0):
+        """Send the messages that are still queued and stop the task.
+
+        :param timeout: Maximum number of seconds to wait for the queue
+        """
+        if self.__task is None:
+            return
+
+        self.__running = False
+        self.__ready.set()
+        self.__full.set()
+        try:
+            await asyncio.wait_for(self.__task, timeout)
+        except asyncio.TimeoutError:
+            logger.error('Timeout flushing queued messages to Redis')
+        self.__task = None
+
+    def publish(self, channel, message):
+        """Queue a message for publication on a certain channel.
+
+        :param channel: Channel to use
+        :param message: Message to publish
+        """
+        message.sent = time.time()
+        self.__messages.append((channel, message))
+        self.__ready.set()
+        if len(self.__messages) >= self.__batch:
+            self.__full.set()
+
+    async def __run(self):
+        """Send batches of queued messages until the writer is stopped
+        and the queue is empty.
+        """
+        while True:
+            await self.__ready.wait()
+            if self.__running and self.__interval \
+                    and len(self.__messages) < self.__batch:
+                try:
+                    await asyncio.wait_for(self.__full.wait(),
+                                           self.__interval)
+                except asyncio.TimeoutError:
+                    pass
+            if not self.__messages:
+                return
+
+            n = min(len(self.__messages), self.__batch)
+            items = [self.__messages.popleft() for _ in range(n)]
+            if self.__running:
+                if not self.__messages:
+                    self.__ready.clear()
+                if len(self.__messages) < self.__batch:
+                    self.__full.clear()
+
+            start = time.perf_counter()
+            try:
+                await self.__dispatcher.publish_batch(items)
+                metrics.PUBLISH_SECONDS.observe(time.perf_counter() - start)
+            except Exception:
+                logger.exception('Unable to publish %s messages', n)
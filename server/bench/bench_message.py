@@ -0,0 +1,51 @@
+"""Microbenchmark of the encoding and decoding of Message objects, as
+done for every message that goes through Redis.
+
+Run from the server directory: python bench/bench_message.py
+"""
+import os
+import sys
+import timeit
+
+sys.path.insert(0, os.path.join(os.path.dirname(__file__), '..', 'app'))
+
+from message import Message  # noqa: E402
+
+N = 200000
+
+MESSAGES = [
+    Message(Message.ATTACK, '6f1c1c3e-3f3a-4c5e-9d2e-1b7a3e0f4c21', 'J10'),
+    Message(Message.STATUS, '6f1c1c3e-3f3a-4c5e-9d2e-1b7a3e0f4c21', '1'),
+    Message(Message.STOP_TURN, '6f1c1c3e-3f3a-4c5e-9d2e-1b7a3e0f4c21', ''),
+]
+
+
+def bench(label, encode):
+    """Time encoding, decoding and the round trip of the messages.
+
+    :param label: Name of the wire format
+    :param encode: Function that encodes a Message (as bytes)
+    :return: Round trip time per message in microseconds
+    """
+    encoded = [encode(m) for m in MESSAGES]
+    size = sum(len(e) for e in encoded) / len(encoded)
+    n = N * len(MESSAGES)
+
+    t_enc = timeit.timeit(lambda: [encode(m) for m in MESSAGES], number=N)
+    t_dec = timeit.timeit(lambda: [Message.recreate(e) for e in encoded],
+                          number=N)
+
+    enc, dec = t_enc / n * 1e6, t_dec / n * 1e6
+    print(f'{label:8} {size:6.1f} bytes  encode {enc:6.3f} us  '
+          f'decode {dec:6.3f} us  total {enc + dec:6.3f} us')
+    return enc + dec
+
+
+def main():
+    t_json = bench('json', lambda m: m.dumps().encode('utf-8'))
+    t_binary = bench('binary', Message.encode)
+    print(f'speedup  {t_json / t_binary:.2f}x per message')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,348 @@
+import asyncio
+import grpc
+import unittest
+import uuid
+from unittest import mock
+from aio_server import AsyncBattleship
+from battleships_pb2 import Attack, GameEvent, Request, Response, Ship, \
+    Status, WatchRequest
+from memory import AsyncMemoryMatchmaker
+from server import MEMORY, RETRY_AFTER_KEY, STREAMS
+
+REDIS_HOST = 'localhost'
+
+# A complete fleet, one ship per row from the left edge of the board
+FLEET = [Ship(vector=f'a{row}', size=size, horizontal=True)
+         for row, size in enumerate((5, 4, 3, 3, 3, 3, 2, 2, 1, 1), 1)]
+
+
+async def stream(q):
+    while True:
+        s = await q.get()
+        if s is None:
+            return
+        yield s
+
+
+async def read_incoming(responses, q):
+    async for response in responses:
+        await q.put(response)
+
+
+class Aborted(Exception):
+    pass
+
+
+class Context(dict):
+    """gRPC context that records how a call was aborted or ended.
+    """
+
+    async def abort(self, code, details='', trailing_metadata=()):
+        self['code'] = code
+        self['metadata'] = dict(trailing_metadata)
+        raise Aborted()
+
+    def set_code(self, code):
+        self['code'] = code
+
+    def set_details(self, details):
+        self['details'] = details
+
+
+class Lobby(AsyncMemoryMatchmaker):
+    """An AsyncMemoryMatchmaker that tells the test when games are
+    opened, so a player joins once the game of the previous player is
+    open instead of after a delay.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.__opened = asyncio.Queue()
+
+    async def add_open_game(self, game_id):
+        added = await super().add_open_game(game_id)
+        self.__opened.put_nowait(game_id)
+        return added
+
+    async def opened(self):
+        """Wait for a game to be opened.
+
+        :return: ID of the game
+        """
+        return await asyncio.wait_for(self.__opened.get(), 5)
+
+
+class TestAsyncServer(unittest.IsolatedAsyncioTestCase):
+    """Please note that the tests in this suite only work if a Redis
+    host is available (see REDIS_HOST above).
+    """
+    async def asyncSetUp(self):
+        self.battleship = AsyncBattleship(REDIS_HOST, db=1)
+        self.assertTrue(await self.battleship.ping_redis())
+        await self.battleship.start()
+
+    async def asyncTearDown(self):
+        await self.battleship.close()
+
+    def connect(self, battleship=None, context=None):
+        battleship = battleship or self.battleship
+        if context is None:
+            context = {}
+        requests, responses = asyncio.Queue(), asyncio.Queue()
+        task = asyncio.create_task(read_incoming(
+            battleship.Game(stream(requests), context), responses))
+        return requests, responses, task
+
+    async def expect(self, q, response):
+        self.assertEqual(await asyncio.wait_for(q.get(), 5), response)
+
+    async def expect_begin(self, q):
+        """Wait for the BEGIN of a game, which tells its ID.
+
+        :return: BEGIN response
+        """
+        begin = await asyncio.wait_for(q.get(), 5)
+        self.assertEqual(begin.turn, Response.State.BEGIN)
+        self.assertTrue(begin.game_id)
+        return begin
+
+    async def test_simple_game_play(self):
+        """Play a short game between two players that are both handled
+        by the asyncio server.
+        """
+        alice, alice_in, alice_task = self.connect()
+        bob, bob_in, bob_task = self.connect()
+        await self.play(alice, alice_in, bob, bob_in)
+        await asyncio.wait_for(asyncio.gather(alice_task, bob_task), 5)
+
+    async def test_game_play_streams(self):
+        """Play a short game between two players that are handled by
+        different servers, which talk through Redis Streams.
+        """
+        other = AsyncBattleship(REDIS_HOST, db=1, transport=STREAMS)
+        battleship = AsyncBattleship(REDIS_HOST, db=1, transport=STREAMS)
+        await other.start()
+        await battleship.start()
+        try:
+            alice, alice_in, alice_task = self.connect(battleship)
+            bob, bob_in, bob_task = self.connect(other)
+            await self.play(alice, alice_in, bob, bob_in)
+            await asyncio.wait_for(asyncio.gather(alice_task, bob_task), 5)
+        finally:
+            await battleship.close()
+            await other.close()
+
+    async def test_game_play_memory(self):
+        """Play a short game on a server that does without Redis.
+        """
+        battleship = AsyncBattleship(None, transport=MEMORY)
+        self.assertTrue(await battleship.ping_redis())
+        await battleship.start()
+        try:
+            alice, alice_in, alice_task = self.connect(battleship)
+            bob, bob_in, bob_task = self.connect(battleship)
+            await self.play(alice, alice_in, bob, bob_in)
+            await asyncio.wait_for(asyncio.gather(alice_task, bob_task), 5)
+        finally:
+            await battleship.close()
+
+    async def test_rejected_request(self):
+        """A second attack before the report on the first ends the
+        stream of the attacker with FAILED_PRECONDITION, and nothing is
+        published for it.
+        """
+        lobby = Lobby()
+        with mock.patch('aio_server.AsyncMemoryMatchmaker', lambda: lobby):
+            battleship = AsyncBattleship(None, transport=MEMORY)
+        await battleship.start()
+        try:
+            context = Context()
+            alice, alice_in, alice_task = self.connect(battleship, context)
+            bob, bob_in, bob_task = self.connect(battleship)
+            await alice.put(Request(join=Request.Player(id='Alice')))
+            begin = Response(turn=Response.State.BEGIN,
+                             game_id=await lobby.opened())
+            await bob.put(Request(join=Request.Player(id='Bob')))
+            await self.expect(alice_in, begin)
+            await self.expect(alice_in,
+                              Response(turn=Response.State.START_TURN))
+
+            await alice.put(Request(move=Attack(vector='a1')))
+            await alice.put(Request(move=Attack(vector='b1')))
+            await asyncio.wait_for(alice_task, 5)
+            self.assertEqual(context['code'],
+                             grpc.StatusCode.FAILED_PRECONDITION)
+
+            await self.expect(bob_in, begin)
+            await self.expect(bob_in, Response(turn=Response.State.STOP_TURN))
+            await self.expect(bob_in, Response(move=Attack(vector='a1')))
+            await bob.put(None)
+            await asyncio.wait_for(bob_task, 5)
+            self.assertTrue(bob_in.empty())
+        finally:
+            await battleship.close()
+
+    async def test_cancelled_stream(self):
+        """A stream that the client cancels stops reading its requests.
+        """
+        def readers():
+            return [task for task in asyncio.all_tasks()
+                    if task.get_coro().__qualname__.endswith('handle_grpc')]
+
+        lobby = Lobby()
+        with mock.patch('aio_server.AsyncMemoryMatchmaker', lambda: lobby):
+            battleship = AsyncBattleship(None, transport=MEMORY)
+        await battleship.start()
+        try:
+            alice, alice_in, alice_task = self.connect(battleship)
+            bob, bob_in, bob_task = self.connect(battleship)
+            await alice.put(Request(join=Request.Player(id='Alice')))
+            await lobby.opened()
+            await bob.put(Request(join=Request.Player(id='Bob')))
+            await self.expect_begin(alice_in)
+            self.assertEqual(len(readers()), 2)
+
+            alice_task.cancel()
+            await asyncio.sleep(0.1)
+            self.assertEqual(len(readers()), 1)
+
+            await bob.put(None)
+            await asyncio.wait_for(bob_task, 5)
+            self.assertEqual(readers(), [])
+        finally:
+            await battleship.close()
+
+    async def test_server_resolves_attacks(self):
+        """The server answers the attacks on a player that submitted
+        its fleet at join, without a report from that player.
+        """
+        alice, alice_in, alice_task = self.connect()
+        bob, bob_in, bob_task = self.connect()
+        await alice.put(Request(join=Request.Player(id='Alice')))
+        await asyncio.sleep(0.2)
+        await bob.put(Request(join=Request.Player(id='Bob', fleet=FLEET)))
+
+        begin = await self.expect_begin(alice_in)
+        await self.expect(bob_in, begin)
+        await self.expect(bob_in, Response(turn=Response.State.STOP_TURN))
+        await self.expect(alice_in, Response(turn=Response.State.START_TURN))
+
+        # Bob is told about the attack, but the server reports on it
+        await alice.put(Request(move=Attack(vector='j1')))
+        await self.expect(bob_in, Response(move=Attack(vector='j1')))
+        await self.expect(alice_in,
+                          Response(report=Status(state=Status.State.MISS)))
+        await self.expect(alice_in, Response(turn=Response.State.STOP_TURN))
+        await self.expect(bob_in, Response(turn=Response.State.START_TURN))
+
+        await bob.put(Request(move=Attack(vector='a1')))
+        await self.expect(alice_in, Response(move=Attack(vector='a1')))
+        await alice.put(Request(report=Status(state=Status.State.DEFEAT)))
+        await self.expect(alice_in, Response(turn=Response.State.LOSE))
+        await self.expect(bob_in, Response(turn=Response.State.WIN))
+        await asyncio.wait_for(asyncio.gather(alice_task, bob_task), 5)
+
+    async def test_invalid_fleet(self):
+        """A player whose fleet breaks the placement rules does not
+        join a game.
+        """
+        alice, alice_in, alice_task = self.connect()
+        fleet = FLEET[:-1] + [Ship(vector='a1', size=1)]
+        await alice.put(Request(join=Request.Player(id='Alice', fleet=fleet)))
+        await asyncio.wait_for(alice_task, 5)
+        self.assertTrue(alice_in.empty())
+
+    async def test_full_server(self):
+        """A stream that arrives while the server is full is rejected
+        right away with a hint when to join again.
+        """
+        battleship = AsyncBattleship(REDIS_HOST, db=1, max_streams=1)
+        await battleship.start()
+        try:
+            alice, alice_in, alice_task = self.connect(battleship)
+            await alice.put(Request(join=Request.Player(id='Alice')))
+            await asyncio.sleep(0.2)
+
+            context = Context()
+            with self.assertRaises(Aborted):
+                async for _ in battleship.Game(stream(asyncio.Queue()),
+                                               context):
+                    pass
+            self.assertEqual(context['code'],
+                             grpc.StatusCode.RESOURCE_EXHAUSTED)
+            self.assertIn(RETRY_AFTER_KEY, context['metadata'])
+
+            await alice.put(None)
+            await asyncio.wait_for(alice_task, 5)
+        finally:
+            await battleship.close()
+
+    async def test_watch_refused(self):
+        """A spectator must name a game in progress.
+        """
+        for game_id, code in (('game', grpc.StatusCode.INVALID_ARGUMENT),
+                              (str(uuid.uuid4()), grpc.StatusCode.NOT_FOUND)):
+            context = Context()
+            with self.assertRaises(Aborted):
+                async for _ in self.battleship.Watch(
+                        WatchRequest(game_id=game_id), context):
+                    pass
+            self.assertEqual(context['code'], code)
+
+    async def test_watch(self):
+        """A spectator watches a game by the ID its players got with
+        BEGIN until the game has ended, after which it can no longer be
+        watched.
+        """
+        alice, alice_in, alice_task = self.connect()
+        bob, bob_in, bob_task = self.connect()
+        await alice.put(Request(join=Request.Player(id='Alice')))
+        await asyncio.sleep(0.2)
+        await bob.put(Request(join=Request.Player(id='Bob')))
+        begin = await self.expect_begin(alice_in)
+        await self.expect(bob_in, begin)
+        await self.expect(bob_in, Response(turn=Response.State.STOP_TURN))
+        await self.expect(alice_in, Response(turn=Response.State.START_TURN))
+
+        async def watch():
+            return [event.type async for event in self.battleship.Watch(
+                WatchRequest(game_id=begin.game_id), Context())]
+
+        carol = asyncio.create_task(watch())
+        await asyncio.sleep(0.2)
+        await alice.put(Request(move=Attack(vector='a1')))
+        await self.expect(bob_in, Response(move=Attack(vector='a1')))
+        await bob.put(Request(report=Status(state=Status.State.DEFEAT)))
+        await self.expect(alice_in, Response(turn=Response.State.WIN))
+        await self.expect(bob_in, Response(turn=Response.State.LOSE))
+
+        events = await asyncio.wait_for(carol, 5)
+        self.assertEqual(events[-2:], [GameEvent.ATTACK, GameEvent.END])
+
+        await alice.put(None)
+        await bob.put(None)
+        await asyncio.wait_for(asyncio.gather(alice_task, bob_task), 5)
+
+        context = Context()
+        with self.assertRaises(Aborted):
+            async for _ in self.battleship.Watch(
+                    WatchRequest(game_id=begin.game_id), context):
+                pass
+        self.assertEqual(context['code'], grpc.StatusCode.NOT_FOUND)
+
+    async def play(self, alice, alice_in, bob, bob_in):
+        await alice.put(Request(join=Request.Player(id='Alice')))
+        await asyncio.sleep(0.2)
+        await bob.put(Request(join=Request.Player(id='Bob')))
+
+        begin = await self.expect_begin(alice_in)
+        await self.expect(bob_in, begin)
+        await self.expect(bob_in, Response(turn=Response.State.STOP_TURN))
+        await self.expect(alice_in, Response(turn=Response.State.START_TURN))
+
+        await alice.put(Request(move=Attack(vector='a1')))
+        await self.expect(bob_in, Response(move=Attack(vector='a1')))
+
+        await bob.put(Request(report=Status(state=Status.State.DEFEAT)))
+        await self.expect(alice_in, Response(turn=Response.State.WIN))
+        await self.expect(bob_in, Response(turn=Response.State.LOSE))
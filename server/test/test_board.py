@@ -0,0 +1,61 @@
+import unittest
+from battleships_pb2 import Ship, Status
+from board import CELLS, FLEET, Board
+
+# A complete fleet, one ship per column from the top of the board
+FLEET_COLUMNS = [(f'{x}1', size, False) for x, size in zip('abcdefghij',
+                                                            FLEET)]
+
+
+class TestBoard(unittest.TestCase):
+    def test_attack(self):
+        """Attacks on ships are hits until the last one, which is a
+        defeat; everything else is a miss.
+        """
+        board = Board(CELLS['a1'] | CELLS['j10'])
+        self.assertEqual(board.attack('b1'), Status.State.MISS)
+        self.assertEqual(board.attack('A1'), Status.State.HIT)
+        self.assertEqual(board.attack('a1'), Status.State.MISS)
+        self.assertEqual(board.attack('k1'), Status.State.MISS)
+        self.assertEqual(board.attack(''), Status.State.MISS)
+        self.assertFalse(board.defeated)
+        self.assertEqual(board.attack('j10'), Status.State.DEFEAT)
+        self.assertTrue(board.defeated)
+
+    def test_from_fleet(self):
+        """A complete fleet is put on the board, from tuples as well as
+        from Ship messages.
+        """
+        board = Board.from_fleet(FLEET_COLUMNS)
+        self.assertEqual(bin(board.remaining).count('1'), sum(FLEET))
+        self.assertEqual(board.remaining & CELLS['a5'], CELLS['a5'])
+        self.assertEqual(board.remaining & CELLS['a6'], 0)
+
+        ships = [Ship(vector=v, size=s, horizontal=h)
+                 for v, s, h in FLEET_COLUMNS]
+        self.assertEqual(Board.from_fleet(ships).remaining, board.remaining)
+
+        results = [board.attack(f'{x}{y}')
+                   for x in 'abcdefghij' for y in range(1, 11)]
+        self.assertEqual(results.count(Status.State.HIT), sum(FLEET) - 1)
+        self.assertEqual(results[-1], Status.State.MISS)
+        self.assertIn(Status.State.DEFEAT, results)
+
+    def test_invalid_fleet(self):
+        """Fleets that break the placement rules are rejected.
+        """
+        invalid = [
+            # Incomplete fleet
+            FLEET_COLUMNS[:-1],
+            # Ship does not fit on the board
+            FLEET_COLUMNS[:-1] + [('j10', 2, False)],
+            FLEET_COLUMNS[:-1] + [('j10', 1, True)] + [('j9', 2, True)],
+            # Overlapping ships
+            FLEET_COLUMNS[:-1] + [('a1', 1, True)],
+            # Unknown cell and empty ship
+            FLEET_COLUMNS[:-1] + [('z1', 1, True)],
+            FLEET_COLUMNS[:-1] + [('j10', 0, True)],
+        ]
+        for fleet in invalid:
+            with self.assertRaises(ValueError):
+                Board.from_fleet(fleet)
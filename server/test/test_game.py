@@ -9,10 +9,58 @@ class TestGame(unittest.TestCase):
         game_id = 'Some new game'
         game = Game(game_id)
         self.assertEqual(game.id, game_id)
+        self.assertEqual(game.phase, Game.WAITING)
         self.assertFalse(game.my_turn)
 
-        game.start_turn()
+        self.assertTrue(game.advance(Game.BEGIN))
+        self.assertTrue(game.advance(Game.START_TURN))
         self.assertTrue(game.my_turn)
 
-        game.end_turn()
+        self.assertTrue(game.advance(Game.ATTACK))
+        self.assertTrue(game.my_turn)
+        self.assertTrue(game.advance(Game.REPORTED))
+        self.assertTrue(game.advance(Game.STOP_TURN))
         self.assertFalse(game.my_turn)
+
+    def test_turns(self):
+        """The phases follow the turns of both players, here from the
+        view of the player that joined the game.
+        """
+        game = Game('game')
+        for event, phase in (
+                (Game.BEGIN, Game.BEGUN),
+                (Game.STOP_TURN, Game.THEIR_TURN),
+                (Game.ATTACKED, Game.MY_REPORT),
+                (Game.REPORT, Game.THEIR_TURN),
+                (Game.START_TURN, Game.MY_ATTACK),
+                (Game.ATTACK, Game.THEIR_REPORT),
+                (Game.REPORTED, Game.THEIR_TURN),
+                (Game.STOP_TURN, Game.THEIR_TURN),
+                (Game.ATTACKED, Game.MY_REPORT),
+                (Game.REPORT, Game.THEIR_TURN),
+                (Game.END, Game.FINISHED)):
+            self.assertTrue(game.advance(event), event)
+            self.assertEqual(game.phase, phase)
+
+    def test_invalid_events(self):
+        """Events that are not valid in a phase leave it unchanged.
+        """
+        game = Game('game')
+
+        def assert_invalid(*events):
+            phase = game.phase
+            for event in events:
+                self.assertFalse(game.advance(event), event)
+                self.assertEqual(game.phase, phase)
+
+        assert_invalid(Game.ATTACK, Game.REPORT, Game.START_TURN, Game.END)
+        game.advance(Game.BEGIN)
+        assert_invalid(Game.ATTACK, Game.REPORT, Game.ATTACKED)
+        game.advance(Game.START_TURN)
+        assert_invalid(Game.REPORT, Game.BEGIN, Game.ATTACKED)
+        game.advance(Game.ATTACK)
+        assert_invalid(Game.ATTACK, Game.REPORT, Game.STOP_TURN)
+        game.advance(Game.REPORTED)
+        assert_invalid(Game.ATTACK, Game.REPORT)
+        game.advance(Game.END)
+        assert_invalid(Game.BEGIN, Game.ATTACK, Game.REPORT, Game.END)
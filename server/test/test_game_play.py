@@ -1,99 +1,712 @@
+import contextlib
+import grpc
 import queue
+import random
 import threading
 import time
 import unittest
-from datetime import datetime
-from battleships_pb2 import Attack, Request, Status
-from server import Battleship
+import uuid
+import metrics
+from concurrent.futures import ThreadPoolExecutor
+from unittest import mock
+from battleships_pb2 import Attack, GameEvent, Request, Response, Ship, \
+    Status, WatchRequest
+from board import CELLS, FLEET, Board
+from memory import MemoryMatchmaker
+from ratelimit import RateLimiter
+from server import MEMORY, THROTTLED_DETAILS, Battleship
 
-REDIS_HOST = 'localhost'
+# Seconds to wait for a response before a test fails
+TIMEOUT = 5
 
+# A complete fleet, one ship per column from the top of the board
+FLEET_COLUMNS = [Ship(vector=f'{x}1', size=size, horizontal=False)
+                 for x, size in zip('abcdefghij', FLEET)]
 
-def stream(q, p):
-    while True:
-        s = q.get()
-        if s is not None:
-            print(f'{datetime.now()} - {p} - Sending -', s, flush=True)
-            yield s
-        else:
-            return
+START_TURN = Response(turn=Response.State.START_TURN)
+STOP_TURN = Response(turn=Response.State.STOP_TURN)
+WIN = Response(turn=Response.State.WIN)
+LOSE = Response(turn=Response.State.LOSE)
 
+MISS = Status.State.MISS
+HIT = Status.State.HIT
+DEFEAT = Status.State.DEFEAT
 
-def read_incoming(input_stream, s):
-    while True:
-        try:
-            response = next(input_stream)
-            print(f'{datetime.now()} - {s} - Received -', response, flush=True)
-        except StopIteration:
-            return
+VECTORS = sorted(CELLS)
+
+# The matchmaker of a server is replaced while it is created, see serve()
+_patch_lock = threading.Lock()
 
 
 def attack(vector):
-    return Request(move=Attack(vector=vector))
+    return Response(move=Attack(vector=vector))
 
 
 def report(state):
-    return Request(report=Status(state=state))
+    return Response(report=Status(state=state))
+
+
+def rejected(request_type):
+    """Get the number of requests of a type rejected so far.
+    """
+    return metrics.REGISTRY.get_sample_value(
+        'battleship_rejected_requests_total', {'type': request_type}) or 0
+
+
+class Lobby(MemoryMatchmaker):
+    """A MemoryMatchmaker that tells the test when games are opened and
+    closed, so a player joins once the game of the previous player is
+    open instead of after a delay.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.__opened = queue.Queue()
+        self.__closed = queue.Queue()
+
+    def add_open_game(self, game_id):
+        added = super().add_open_game(game_id)
+        self.__opened.put(game_id)
+        return added
+
+    def close_open_game(self, game_id):
+        super().close_open_game(game_id)
+        self.__closed.put(game_id)
+
+    def opened(self):
+        """Wait for a game to be opened.
+
+        :return: ID of the game
+        """
+        return _get(self.__opened, 'No game was opened')
+
+    def closed(self):
+        """Wait for a game to be closed.
+
+        :return: ID of the game
+        """
+        return _get(self.__closed, 'No game was closed')
+
+
+def _get(q, error):
+    try:
+        return q.get(timeout=TIMEOUT)
+    except queue.Empty:
+        raise AssertionError(error) from None
+
+
+class Aborted(Exception):
+    pass
+
+
+class Context(dict):
+    """gRPC context that records the status a stream ended with. The
+    stream can be cancelled as if the client had gone away.
+    """
+
+    def __init__(self):
+        super().__init__()
+        self.callbacks = queue.Queue()
+
+    def set_code(self, code):
+        self['code'] = code
+
+    def set_details(self, details):
+        self['details'] = details
+
+    def set_trailing_metadata(self, metadata):
+        self['metadata'] = dict(metadata)
+
+    def abort(self, code, details):
+        self['code'] = code
+        self['details'] = details
+        raise Aborted()
+
+    def add_callback(self, callback):
+        self.callbacks.put(callback)
+        return True
+
+    def is_active(self):
+        return 'cancelled' not in self
+
+    def cancel(self):
+        self['cancelled'] = True
+        while not self.callbacks.empty():
+            self.callbacks.get()()
+
+
+@contextlib.contextmanager
+def serve(limiter=None, max_streams=None):
+    """Run a threaded Battleship server without Redis.
+
+    :param limiter: RateLimiter of the server, or None for no limits
+    :param max_streams: Maximum number of concurrent streams, or None
+                        for no limit
+    :return: Context manager of a tuple of the server and its Lobby
+    """
+    lobby = Lobby()
+    with _patch_lock, mock.patch('server.MemoryMatchmaker', lambda: lobby):
+        battleship = Battleship(None, transport=MEMORY,
+                                max_streams=max_streams, limiter=limiter)
+    try:
+        yield battleship, lobby
+    finally:
+        battleship.close()
+
+
+class Player:
+    """A client of a server that is driven by a test: requests are sent
+    on its stream in order, and the responses are checked as they
+    arrive.
+    """
+
+    def __init__(self, battleship, player_id, fleet=()):
+        """Connect a player to a server.
+
+        :param battleship: Battleship server
+        :param player_id: ID of the player
+        :param fleet: Ships the player submits at join, if any; the
+                      server then resolves the attacks on it
+        """
+        self.id = player_id
+        self.__fleet = fleet
+        self.__board = Board.from_fleet(fleet) if fleet else None
+        self.__requests = queue.Queue()
+        self.__responses = queue.Queue()
+        self.__context = Context()
+
+        def read():
+            for response in battleship.Game(self.__stream(), self.__context):
+                self.__responses.put(response)
+
+        self.__thread = threading.Thread(target=read, daemon=True)
+        self.__thread.start()
+
+    def __stream(self):
+        while True:
+            request = self.__requests.get()
+            if request is None:
+                return
+            yield request
+
+    def send(self, request):
+        self.__requests.put(request)
+
+    def join(self):
+        self.send(Request(join=Request.Player(id=self.id,
+                                              fleet=self.__fleet)))
+
+    def attack(self, vector):
+        self.send(Request(move=Attack(vector=vector)))
+
+    def report(self, state):
+        self.send(Request(report=Status(state=state)))
+
+    def defend(self, vector, state):
+        """Answer an attack on this player.
+
+        :param vector: Vector of the attack
+        :param state: Status.State to report, which the server ignores
+                      if the player has submitted its fleet
+        :return: Status.State the other player is told
+        """
+        self.report(state)
+        if self.__board is None:
+            return state
+        return self.__board.attack(vector)
+
+    def expect(self, *responses):
+        """Wait for the next responses of the server.
+
+        :param responses: Responses that must arrive, in order
+        """
+        for expected in responses:
+            response = _get(self.__responses,
+                            f'{self.id} did not get {expected}')
+            if response != expected:
+                raise AssertionError(f'{self.id} got {response} instead of '
+                                     f'{expected}')
+
+    def leave(self):
+        """End the stream of requests and wait for the server to end the
+        responses. There must be no responses left.
+        """
+        self.send(None)
+        self.__wait()
+        if 'code' in self.__context:
+            raise AssertionError(f'Stream of {self.id} ended with '
+                                 f'{self.__context["code"]}')
+        if not self.__responses.empty():
+            raise AssertionError(f'{self.id} got {self.__responses.get()} '
+                                 f'unexpectedly')
+
+    def rejected(self, code=grpc.StatusCode.FAILED_PRECONDITION):
+        """Wait for the server to end the responses because of an invalid
+        request.
+
+        :param code: grpc.StatusCode the stream must end with
+        :return: Details of the status the stream ended with
+        """
+        self.__wait()
+        if self.__context.get('code') != code:
+            raise AssertionError(f'Stream of {self.id} was not rejected')
+        return self.__context['details']
+
+    def __wait(self):
+        self.__thread.join(TIMEOUT)
+        if self.__thread.is_alive():
+            raise AssertionError(f'Stream of {self.id} did not end')
+
+
+class Spectator:
+    """A viewer of a game on a server that is driven by a test: the
+    events are checked as they arrive.
+    """
+
+    def __init__(self, battleship, game_id):
+        """Start watching a game, and wait until the server does.
+
+        :param battleship: Battleship server
+        :param game_id: ID of the game to watch
+        """
+        self.__events = queue.Queue()
+        self.__context = Context()
+        self.__sequence = 0
+
+        def read():
+            with contextlib.suppress(Aborted):
+                for event in battleship.Watch(WatchRequest(game_id=game_id),
+                                              self.__context):
+                    self.__events.put(event)
+
+        self.__thread = threading.Thread(target=read, daemon=True)
+        self.__thread.start()
+
+        # The server registers a callback once it has subscribed
+        self.__context.callbacks.put(
+            _get(self.__context.callbacks, 'Spectator did not watch'))
+
+    def expect(self, *events):
+        """Wait for the next events of the game, which must be numbered
+        one after the other.
+
+        :param events: Tuples of the type, player, vector and state of
+                       the events that must arrive, in order
+        """
+        for event_type, player, vector, state in events:
+            self.__sequence += 1
+            expected = GameEvent(sequence=self.__sequence, type=event_type,
+                                 player=player, vector=vector, state=state)
+            event = _get(self.__events, f'Spectator did not get {expected}')
+            if event != expected:
+                raise AssertionError(f'Spectator got {event} instead of '
+                                     f'{expected}')
+
+    def ended(self):
+        """Wait for the server to end the stream after the game. There
+        must be no events left.
+        """
+        self.__wait()
+        if not self.__events.empty():
+            raise AssertionError(f'Spectator got {self.__events.get()} '
+                                 f'unexpectedly')
+
+    def aborted(self):
+        """Wait for the server to end the stream with a status other
+        than OK.
+
+        :return: Status code of the stream
+        """
+        self.__wait()
+        if 'code' not in self.__context:
+            raise AssertionError('Stream of spectator ended with OK')
+        return self.__context['code']
+
+    def leave(self):
+        """Cancel the stream and wait for the server to end it.
+        """
+        self.__context.cancel()
+        self.__wait()
+
+    def __wait(self):
+        self.__thread.join(TIMEOUT)
+        if self.__thread.is_alive():
+            raise AssertionError('Stream of spectator did not end')
+
+
+def refuse(battleship, game_id):
+    """Watch a game, which the server must refuse.
+
+    :param battleship: Battleship server
+    :param game_id: ID of the game to watch
+    :return: Status code the stream was ended with
+    """
+    context = Context()
+    try:
+        next(battleship.Watch(WatchRequest(game_id=game_id), context))
+    except Aborted:
+        return context['code']
+    raise AssertionError(f'Watching {game_id!r} was not refused')
+
+
+def begin(lobby, creator, joiner):
+    """Let two players join a game: the second joins once the game of
+    the first is open.
+
+    :return: ID of the game
+    """
+    creator.join()
+    game_id = lobby.opened()
+    joiner.join()
+    begin = Response(turn=Response.State.BEGIN, game_id=game_id)
+    creator.expect(begin, START_TURN)
+    joiner.expect(begin, STOP_TURN)
+    return game_id
+
+
+def play(creator, joiner, moves):
+    """Play a game that has begun. The players take turns, starting with
+    the creator of the game, and every response is checked.
+
+    :param creator: Player that created the game
+    :param joiner: Player that joined it
+    :param moves: List of the vector of every attack and the state the
+                  attacked player reports
+    :return: Number of attacks until a player was defeated, or None if
+             the moves ran out before
+    """
+    players = creator, joiner
+    for i, (vector, state) in enumerate(moves):
+        attacker, defender = players[i % 2], players[1 - i % 2]
+        attacker.attack(vector)
+        defender.expect(attack(vector))
+        state = defender.defend(vector, state)
+        if state == DEFEAT:
+            defender.expect(LOSE)
+            attacker.expect(WIN)
+            return i + 1
+
+        attacker.expect(report(state), STOP_TURN)
+        defender.expect(START_TURN)
+    return None
+
+
+def random_moves(rng, length, fleet=()):
+    """Script a game: random attacks and reports, until the creator of
+    the game reports a defeat on the length'th attack on it. Half of the
+    attacks on a fleet are aimed at its ships.
+
+    :param rng: Random number generator to use
+    :param length: Number of attacks on the creator
+    :param fleet: Ships of the joiner if it submits its fleet
+    :return: List of the vector and state of every attack
+    """
+    ships = Board.from_fleet(fleet).remaining if fleet else 0
+    targets = [v for v in VECTORS if CELLS[v] & ships]
+    moves = []
+    for i in range(length):
+        vector = rng.choice(targets) if targets and rng.random() < 0.5 \
+            else rng.choice(VECTORS)
+        moves.append((vector, rng.choice((MISS, HIT))))
+        moves.append((rng.choice(VECTORS),
+                      DEFEAT if i == length - 1 else rng.choice((MISS, HIT))))
+    return moves
+
+
+class TestGamePlay(unittest.TestCase):
+    def test_game(self):
+        """Two players take turns until one of them is defeated.
+        """
+        with serve() as (battleship, lobby):
+            alice = Player(battleship, 'Alice')
+            bob = Player(battleship, 'Bob')
+            game_id = begin(lobby, alice, bob)
+            moves = [('a1', MISS), ('j10', HIT), ('c5', MISS), ('e3', DEFEAT)]
+            self.assertEqual(play(alice, bob, moves), 4)
+            alice.leave()
+            bob.leave()
+            self.assertEqual(lobby.closed(), game_id)
+
+    def test_watch(self):
+        """Spectators of a game share its feed and get its events until
+        it has ended; the players do not notice them.
+        """
+        watchers = metrics.REGISTRY.get_sample_value('battleship_watchers')
+        with serve() as (battleship, lobby):
+            alice = Player(battleship, 'Alice')
+            bob = Player(battleship, 'Bob')
+            game_id = begin(lobby, alice, bob)
+            carol = Spectator(battleship, game_id)
+            dave = Spectator(battleship, game_id)
+            self.assertEqual(metrics.REGISTRY.get_sample_value(
+                'battleship_watchers'), watchers + 2)
+
+            moves = [('a1', MISS), ('j10', HIT), ('c5', DEFEAT)]
+            self.assertEqual(play(alice, bob, moves), 3)
+            alice.leave()
+            bob.leave()
+
+            events = [
+                (GameEvent.ATTACK, 'Alice', 'a1', MISS),
+                (GameEvent.REPORT, 'Bob', 'a1', MISS),
+                (GameEvent.STOP_TURN, 'Alice', '', MISS),
+                (GameEvent.ATTACK, 'Bob', 'j10', MISS),
+                (GameEvent.REPORT, 'Alice', 'j10', HIT),
+                (GameEvent.STOP_TURN, 'Bob', '', MISS),
+                (GameEvent.ATTACK, 'Alice', 'c5', MISS),
+                (GameEvent.END, 'Bob', 'c5', DEFEAT),
+            ]
+            carol.expect(*events)
+            carol.ended()
+            dave.expect(*events[:2])
+            dave.leave()
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_watchers'), watchers)
+
+    def test_watch_invalid(self):
+        """A spectator must name a game in progress, and counts as a
+        stream of a full server.
+        """
+        with serve(max_streams=3) as (battleship, lobby):
+            for game_id in ('', 'game', str(uuid.uuid4()).upper()):
+                self.assertEqual(refuse(battleship, game_id),
+                                 grpc.StatusCode.INVALID_ARGUMENT)
+            self.assertEqual(refuse(battleship, str(uuid.uuid4())),
+                             grpc.StatusCode.NOT_FOUND)
+
+            alice = Player(battleship, 'Alice')
+            bob = Player(battleship, 'Bob')
+            game_id = begin(lobby, alice, bob)
+            carol = Spectator(battleship, game_id)
+            self.assertEqual(refuse(battleship, game_id),
+                             grpc.StatusCode.RESOURCE_EXHAUSTED)
+            carol.leave()
+
+            # The game is over once a player has left it
+            alice.leave()
+            self.assertEqual(refuse(battleship, game_id),
+                             grpc.StatusCode.NOT_FOUND)
+            bob.leave()
+
+    def test_watch_unavailable(self):
+        """A spectator whose game the server is unable to subscribe to
+        is told to come back later.
+        """
+        with serve() as (battleship, lobby):
+            alice = Player(battleship, 'Alice')
+            bob = Player(battleship, 'Bob')
+            game_id = begin(lobby, alice, bob)
+            with mock.patch('watch.Spectators.watch', return_value=None):
+                self.assertEqual(refuse(battleship, game_id),
+                                 grpc.StatusCode.UNAVAILABLE)
+            alice.leave()
+            bob.leave()
+
+    def test_watch_idle(self):
+        """A spectator of a game that has no events for too long is
+        disconnected.
+        """
+        with serve() as (battleship, lobby), \
+                mock.patch('server.WATCH_TIMEOUT', 0.1):
+            alice = Player(battleship, 'Alice')
+            bob = Player(battleship, 'Bob')
+            game_id = begin(lobby, alice, bob)
+            carol = Spectator(battleship, game_id)
+            self.assertEqual(carol.aborted(),
+                             grpc.StatusCode.DEADLINE_EXCEEDED)
+            alice.leave()
+            bob.leave()
+
+    def test_rejected(self):
+        """A request that is not valid in the phase of the game ends the
+        stream with FAILED_PRECONDITION, and nothing is published for it:
+        the other player gets no response.
+        """
+        def attack_out_of_turn(alice, bob):
+            bob.attack('a1')
+            return bob, alice, 'move'
+
+        def attack_twice(alice, bob):
+            alice.attack('a1')
+            alice.attack('b1')
+            bob.expect(attack('a1'))
+            return alice, bob, 'move'
+
+        def report_in_turn(alice, bob):
+            alice.report(MISS)
+            return alice, bob, 'report'
+
+        def report_without_attack(alice, bob):
+            bob.report(HIT)
+            return bob, alice, 'report'
+
+        def report_twice(alice, bob):
+            alice.attack('a1')
+            bob.expect(attack('a1'))
+            bob.report(MISS)
+            bob.report(DEFEAT)
+            alice.expect(report(MISS), STOP_TURN)
+            return bob, alice, 'report'
 
+        def join_again(alice, bob):
+            alice.join()
+            return alice, bob, 'join'
 
-def start_thread(_stream, name):
-    t = threading.Thread(target=lambda: read_incoming(_stream, name))
-    t.daemon = True
-    t.start()
+        def empty_request(alice, bob):
+            bob.send(Request())
+            return bob, alice, 'empty'
 
+        for case in (attack_out_of_turn, attack_twice, report_in_turn,
+                     report_without_attack, report_twice, join_again,
+                     empty_request):
+            with self.subTest(case.__name__), serve() as (battleship, lobby):
+                alice = Player(battleship, 'Alice')
+                bob = Player(battleship, 'Bob')
+                begin(lobby, alice, bob)
+                counts = {t: rejected(t)
+                          for t in ('move', 'report', 'join', 'empty')}
 
-def test_simple_game_play():
-    delay = 0.5
+                offender, other, request_type = case(alice, bob)
+                self.assertIn(f'{request_type} request', offender.rejected())
+                self.assertEqual(rejected(request_type),
+                                 counts[request_type] + 1)
+                other.leave()
 
-    player_1 = 'Alice'
-    player_2 = 'Bob'
+    def test_throttled(self):
+        """A client that keeps sending faster than its budget allows is
+        disconnected with RESOURCE_EXHAUSTED before its request is
+        handled.
+        """
+        # The clock stands still, so the budgets are never refilled
+        limiter = RateLimiter(rate=0.5, burst=3, clock=lambda: 0.0)
+        with serve(limiter) as (battleship, lobby):
+            alice = Player(battleship, 'Alice')
+            bob = Player(battleship, 'Bob')
+            begin(lobby, alice, bob)
+            throttled = metrics.REGISTRY.get_sample_value(
+                'battleship_throttled_streams_total')
 
-    alice = queue.Queue()
-    bob = queue.Queue()
-    game_server_1 = Battleship(REDIS_HOST)
-    game_server_2 = Battleship(REDIS_HOST)
+            alice.attack('a1')
+            bob.expect(attack('a1'))
+            bob.report(MISS)
+            alice.expect(report(MISS), STOP_TURN)
+            bob.expect(START_TURN)
+            bob.attack('b1')
+            alice.expect(attack('b1'))
+            alice.report(MISS)
+            bob.expect(report(MISS), STOP_TURN)
+            alice.expect(START_TURN)
 
-    input_stream_1 = game_server_1.Game(stream(alice, player_1), {})
-    input_stream_2 = game_server_2.Game(stream(bob, player_2), {})
+            # The fourth request of Alice would have to wait for 2 seconds
+            alice.attack('c1')
+            details = alice.rejected(grpc.StatusCode.RESOURCE_EXHAUSTED)
+            self.assertEqual(details, THROTTLED_DETAILS)
+            self.assertEqual(metrics.REGISTRY.get_sample_value(
+                'battleship_throttled_streams_total'), throttled + 1)
+            bob.leave()
 
-    start_thread(input_stream_1, player_1)
-    start_thread(input_stream_2, player_2)
+    def test_fleet(self):
+        """The attacks on a player that submitted its fleet are resolved
+        by the server, whatever the player reports.
+        """
+        with serve() as (battleship, lobby):
+            alice = Player(battleship, 'Alice')
+            bob = Player(battleship, 'Bob', FLEET_COLUMNS)
+            begin(lobby, alice, bob)
 
-    # Both players join
-    alice.put(Request(join=Request.Player(id=player_1)))
-    time.sleep(delay)
-    bob.put(Request(join=Request.Player(id=player_2)))
-    time.sleep(delay)
+            cells = [v for v in VECTORS
+                     if CELLS[v] & Board.from_fleet(FLEET_COLUMNS).remaining]
+            moves = []
+            for vector in cells:
+                moves += [(vector, MISS), ('j10', MISS)]
+            self.assertEqual(play(alice, bob, moves), 2 * len(cells) - 1)
+            alice.leave()
+            bob.leave()
 
-    # Player 1 gets to start
-    alice.put(attack("a1"))
-    bob.put(report(Status.State.MISS))
-    time.sleep(delay)
+    def test_no_join(self):
+        """A stream that does not start with a valid join ends without
+        a game.
+        """
+        with serve() as (battleship, lobby):
+            for request in (
+                    Request(move=Attack(vector='a1')),
+                    Request(join=Request.Player(id='')),
+                    Request(join=Request.Player(id='Alice',
+                                                fleet=FLEET_COLUMNS[1:]))):
+                player = Player(battleship, 'Alice')
+                player.send(request)
+                player.leave()
 
-    # Now it is Player 2's turn
-    bob.put(attack("j10"))
-    alice.put(report(Status.State.HIT))
-    time.sleep(delay)
+            alice = Player(battleship, 'Alice')
+            bob = Player(battleship, 'Bob')
+            begin(lobby, alice, bob)
+            alice.leave()
+            bob.leave()
 
-    # Now it is Player 1's turn
-    alice.put(attack("c5"))
-    bob.put(report(Status.State.MISS))
-    time.sleep(delay)
+    def test_leave_before_begin(self):
+        """A game whose creator leaves before anyone joins is closed, so
+        the next player opens a new game.
+        """
+        with serve() as (battleship, lobby):
+            alice = Player(battleship, 'Alice')
+            alice.join()
+            game_id = lobby.opened()
+            alice.leave()
+            self.assertEqual(lobby.closed(), game_id)
 
-    # Now it is Player 2's turn
-    bob.put(attack("e3"))
-    alice.put(report(Status.State.DEFEAT))
-    time.sleep(delay)
+            bob = Player(battleship, 'Bob')
+            carol = Player(battleship, 'Carol')
+            begin(lobby, bob, carol)
+            self.assertEqual(play(bob, carol, [('a1', DEFEAT)]), 1)
+            bob.leave()
+            carol.leave()
 
-    alice.put(None)
-    bob.put(None)
-    time.sleep(1)
+    def test_leave_during_game(self):
+        """A player that leaves during a game does not end the stream of
+        the other player, which gets no more responses.
+        """
+        with serve() as (battleship, lobby):
+            alice = Player(battleship, 'Alice')
+            bob = Player(battleship, 'Bob')
+            begin(lobby, alice, bob)
+            alice.attack('a1')
+            bob.expect(attack('a1'))
+            bob.leave()
+            alice.leave()
 
+    def test_many_games(self):
+        """Two hundred random games, with fleets submitted by some of the
+        players, are played concurrently. A quarter of them end early
+        because a player attacks out of turn.
+        """
+        def game(seed):
+            rng = random.Random(seed)
+            fleet = FLEET_COLUMNS if seed % 3 == 0 else ()
+            with serve() as (battleship, lobby):
+                alice = Player(battleship, f'Alice-{seed}')
+                bob = Player(battleship, f'Bob-{seed}', fleet)
+                begin(lobby, alice, bob)
+                moves = random_moves(rng, rng.randint(1, 30), fleet)
+                if seed % 4:
+                    played = play(alice, bob, moves)
+                    alice.leave()
+                    bob.leave()
+                    return played
 
-# class TestGamePlay(unittest.TestCase):
-#     def test_simple_game_play(self):
-#         test_simple_game_play()
+                moves = moves[:rng.randrange(len(moves))]
+                self.assertIsNone(play(alice, bob, moves))
+                attacker, waiting = (alice, bob) if len(moves) % 2 == 0 \
+                    else (bob, alice)
+                waiting.attack('a1')
+                waiting.rejected()
+                attacker.leave()
+                return None
 
+        start = time.perf_counter()
+        with ThreadPoolExecutor(8) as pool:
+            played = list(pool.map(game, range(200)))
+        elapsed = time.perf_counter() - start
 
-if __name__ == '__main__':
-    test_simple_game_play()
+        self.assertEqual(len(played), 200)
+        self.assertEqual(played.count(None), 50)
+        self.assertLess(elapsed, 60)
@@ -0,0 +1,69 @@
+import io
+import logging
+import unittest
+import log
+
+
+class Lazy:
+    """Argument that counts how often it is formatted.
+    """
+
+    def __init__(self):
+        self.formatted = 0
+
+    def __str__(self):
+        self.formatted += 1
+        return 'lazy'
+
+
+class TestLog(unittest.TestCase):
+    def setUp(self):
+        self.stream = io.StringIO()
+        self.handler = logging.StreamHandler(self.stream)
+        self.handler.setFormatter(
+            log.ContextFormatter('%(message)s%(fields)s'))
+        self.logger = logging.getLogger('test_log')
+        self.logger.setLevel(logging.DEBUG)
+        self.logger.propagate = False
+        self.logger.addHandler(self.handler)
+
+    def tearDown(self):
+        self.logger.removeHandler(self.handler)
+
+    def test_get_logger_once(self):
+        """Getting a logger again does not add another handler.
+        """
+        logger = log.get_logger('test_log_once')
+        n = len(logger.handlers)
+        self.assertIs(log.get_logger('test_log_once'), logger)
+        self.assertEqual(len(logger.handlers), n)
+
+    def test_context(self):
+        adapter = log.ContextAdapter(self.logger, player='Alice')
+        adapter.bind(game='g1').info('Attack %s', 'a1')
+        adapter.info('Joined')
+        self.assertEqual(self.stream.getvalue().splitlines(), [
+            'Attack a1 [player=Alice game=g1]', 'Joined [player=Alice]'])
+
+    def test_sampling(self):
+        """A sampled adapter drops records below WARNING without
+        formatting their arguments.
+        """
+        adapter = log.ContextAdapter(self.logger).sampled(0.0)
+        lazy = Lazy()
+        adapter.info('Attack %s', lazy)
+        self.assertEqual(lazy.formatted, 0)
+        adapter.warning('Not my turn %s', lazy)
+        self.assertEqual(self.stream.getvalue(), 'Not my turn lazy\n')
+
+    def test_queue_handler(self):
+        """Queued records are written by the time the listener thread
+        stops.
+        """
+        logger = log.get_logger('test_log_queue')
+        logger.propagate = False
+        lazy = Lazy()
+        logger.debug('Attack %s', lazy)
+        log.stop()
+        self.assertGreaterEqual(lazy.formatted, 1)
+        log.get_logger('test_log_queue')
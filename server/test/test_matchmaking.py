@@ -0,0 +1,106 @@
+import redis
+import time
+import unittest
+import metrics
+from matchmaking import Matchmaker
+
+REDIS_HOST = 'localhost'
+
+
+class TestMatchmaker(unittest.TestCase):
+    """Please note that the tests in this suite only work if a Redis
+    host is available (see REDIS_HOST above).
+    """
+    def setUp(self):
+        self.r = redis.Redis(host=REDIS_HOST, db=1)
+        self.r.delete(Matchmaker.OpenGames, Matchmaker.GamePrefix + 'game')
+        self.matchmaker = Matchmaker(self.r)
+        self.matchmaker.start()
+
+    def tearDown(self):
+        self.matchmaker.stop()
+        self.r.delete(Matchmaker.OpenGames, Matchmaker.GamePrefix + 'game')
+        self.r.close()
+
+    def test_claim_open_game(self):
+        """An open game can be claimed exactly once.
+        """
+        self.assertIsNone(self.matchmaker.claim_open_game())
+
+        self.assertTrue(self.matchmaker.add_open_game('game'))
+        self.assertEqual(self.matchmaker.claim_open_game(), 'game')
+        self.assertIsNone(self.matchmaker.claim_open_game())
+
+    def test_skip_abandoned_game(self):
+        """Open games whose deadline has passed are skipped.
+        """
+        self.r.zadd(Matchmaker.OpenGames, {'abandoned': time.time() - 1})
+        self.matchmaker.add_open_game('alive')
+
+        self.assertEqual(self.matchmaker.claim_open_game(), 'alive')
+        self.assertIsNone(self.matchmaker.claim_open_game())
+
+    def test_sweep(self):
+        """Sweeping removes all abandoned games, in batches, and leaves
+        the open games alone.
+        """
+        deadline = time.time() - 1
+        self.r.zadd(Matchmaker.OpenGames,
+                    {f'abandoned-{i}': deadline for i in range(25)})
+        self.matchmaker.add_open_game('alive')
+
+        self.assertEqual(self.matchmaker.sweep(batch=10), 25)
+        self.assertEqual(self.r.zcard(Matchmaker.OpenGames), 1)
+
+    def test_refresh(self):
+        """Refreshing moves the deadline of open games forward but does
+        not add games that were claimed in the meantime.
+        """
+        self.matchmaker.add_open_game('claimed')
+        self.matchmaker.add_open_game('open')
+        self.r.zrem(Matchmaker.OpenGames, 'claimed')
+        before = self.r.zscore(Matchmaker.OpenGames, 'open')
+
+        self.matchmaker.refresh()
+        self.assertIsNone(self.r.zscore(Matchmaker.OpenGames, 'claimed'))
+        self.assertGreater(self.r.zscore(Matchmaker.OpenGames, 'open'),
+                           before)
+
+    def test_close_open_game(self):
+        """A closed game can no longer be claimed.
+        """
+        self.matchmaker.add_open_game('game')
+        self.matchmaker.close_open_game('game')
+        self.assertIsNone(self.matchmaker.claim_open_game())
+
+    def test_claimed(self):
+        """A game that an opponent has joined no longer counts as open,
+        also when its creator leaves later.
+        """
+        open_games = metrics.REGISTRY.get_sample_value('battleship_open_games')
+        self.matchmaker.add_open_game('game')
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_open_games'), open_games + 1)
+
+        self.assertEqual(self.matchmaker.claim_open_game(), 'game')
+        self.assertTrue(self.matchmaker.claimed('game'))
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_open_games'), open_games)
+
+        self.assertFalse(self.matchmaker.claimed('game'))
+        self.matchmaker.close_open_game('game')
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_open_games'), open_games)
+
+    def test_game_in_progress(self):
+        """A game is in progress from its beginning until a player leaves
+        it, and expires in case nobody does.
+        """
+        self.assertFalse(self.matchmaker.game_exists('game'))
+        self.matchmaker.begin_game('game')
+        self.assertTrue(self.matchmaker.game_exists('game'))
+        self.assertGreater(self.r.ttl(Matchmaker.GamePrefix + 'game'), 0)
+
+        self.matchmaker.end_game('game')
+        self.assertFalse(self.matchmaker.game_exists('game'))
+        self.matchmaker.end_game('game')
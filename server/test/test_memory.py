@@ -0,0 +1,164 @@
+import queue
+import threading
+import time
+import unittest
+import metrics
+from battleships_pb2 import Attack, Request, Response, Status
+from memory import MemoryDispatcher, MemoryMatchmaker
+from message import Message
+from server import MEMORY, Battleship
+
+
+def stream(q):
+    while True:
+        s = q.get()
+        if s is None:
+            return
+        yield s
+
+
+def connect(battleship):
+    requests, responses = queue.Queue(), queue.Queue()
+
+    def read_incoming():
+        for response in battleship.Game(stream(requests), {}):
+            responses.put(response)
+
+    t = threading.Thread(target=read_incoming, daemon=True)
+    t.start()
+    return requests, responses, t
+
+
+class TestMemoryDispatcher(unittest.TestCase):
+    def test_publish(self):
+        """Messages are handed to the handlers of their channel, until
+        they unsubscribe.
+        """
+        dispatcher = MemoryDispatcher()
+        received = []
+        self.assertTrue(dispatcher.subscribe('game', received.append))
+        self.assertTrue(dispatcher.subscribe('game', received.append))
+        self.assertEqual(len(dispatcher.handlers('game')), 2)
+
+        msg = Message(Message.ATTACK, 'Alice', 'a1')
+        self.assertEqual(dispatcher.publish('game', msg), 2)
+        self.assertEqual(dispatcher.publish('other', msg), 0)
+        self.assertEqual(received, [msg, msg])
+
+        dispatcher.unsubscribe('game', received.append)
+        dispatcher.publish_batch([('game', msg), ('other', msg)])
+        self.assertEqual(len(received), 3)
+
+        dispatcher.unsubscribe('game', received.append)
+        self.assertEqual(dispatcher.handlers('game'), [])
+
+
+class TestMemoryMatchmaker(unittest.TestCase):
+    def test_claim(self):
+        """Open games are claimed once, the oldest first, unless they
+        have been closed.
+        """
+        matchmaker = MemoryMatchmaker()
+        open_games = metrics.REGISTRY.get_sample_value('battleship_open_games')
+        self.assertIsNone(matchmaker.claim_open_game())
+        for game_id in ('a', 'b', 'c'):
+            self.assertTrue(matchmaker.add_open_game(game_id))
+        matchmaker.close_open_game('b')
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_open_games'), open_games + 2)
+
+        # Claimed games no longer count as open, also when their
+        # creators close them later
+        self.assertEqual(matchmaker.claim_open_game(), 'a')
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_open_games'), open_games + 1)
+        self.assertEqual(matchmaker.claim_open_game(), 'c')
+        self.assertIsNone(matchmaker.claim_open_game())
+        matchmaker.close_open_game('a')
+        matchmaker.close_open_game('c')
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_open_games'), open_games)
+
+    def test_game_in_progress(self):
+        """A game is in progress from its beginning until a player leaves
+        it.
+        """
+        matchmaker = MemoryMatchmaker()
+        self.assertFalse(matchmaker.game_exists('game'))
+        matchmaker.begin_game('game')
+        self.assertTrue(matchmaker.game_exists('game'))
+        matchmaker.end_game('game')
+        self.assertFalse(matchmaker.game_exists('game'))
+        matchmaker.end_game('game')
+
+    def test_concurrent_claims(self):
+        """Every open game is claimed by a single thread.
+        """
+        matchmaker = MemoryMatchmaker()
+        games = [str(i) for i in range(10000)]
+        for game_id in games:
+            matchmaker.add_open_game(game_id)
+
+        claimed = [[] for _ in range(4)]
+
+        def claim(into):
+            while True:
+                game_id = matchmaker.claim_open_game()
+                if game_id is None:
+                    return
+                into.append(game_id)
+
+        threads = [threading.Thread(target=claim, args=(c,))
+                   for c in claimed]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+        self.assertEqual(sorted(sum(claimed, []), key=int), games)
+
+        for game_id in games:
+            matchmaker.close_open_game(game_id)
+
+
+class TestMemoryServer(unittest.TestCase):
+    def test_game_play(self):
+        """Play a short game on the threaded server without Redis.
+        """
+        battleship = Battleship(None, transport=MEMORY)
+        try:
+            alice, alice_in, alice_thread = connect(battleship)
+            bob, bob_in, bob_thread = connect(battleship)
+            alice.put(Request(join=Request.Player(id='Alice')))
+            time.sleep(0.2)
+            bob.put(Request(join=Request.Player(id='Bob')))
+
+            def expect(q, response):
+                self.assertEqual(q.get(timeout=5), response)
+
+            begin = alice_in.get(timeout=5)
+            self.assertEqual(begin.turn, Response.State.BEGIN)
+            self.assertTrue(begin.game_id)
+            expect(bob_in, begin)
+            expect(bob_in, Response(turn=Response.State.STOP_TURN))
+            expect(alice_in, Response(turn=Response.State.START_TURN))
+
+            alice.put(Request(move=Attack(vector='a1')))
+            expect(bob_in, Response(move=Attack(vector='a1')))
+            bob.put(Request(report=Status(state=Status.State.MISS)))
+            expect(alice_in, Response(report=Status(state=Status.State.MISS)))
+            expect(alice_in, Response(turn=Response.State.STOP_TURN))
+            expect(bob_in, Response(turn=Response.State.START_TURN))
+
+            bob.put(Request(move=Attack(vector='j10')))
+            expect(alice_in, Response(move=Attack(vector='j10')))
+            alice.put(Request(report=Status(state=Status.State.DEFEAT)))
+            expect(alice_in, Response(turn=Response.State.LOSE))
+            expect(bob_in, Response(turn=Response.State.WIN))
+
+            alice.put(None)
+            bob.put(None)
+            alice_thread.join(5)
+            bob_thread.join(5)
+            self.assertFalse(alice_thread.is_alive() or bob_thread.is_alive())
+        finally:
+            battleship.close()
@@ -28,3 +28,60 @@ class TestMessage(unittest.TestCase):
         # We check that the recreated message is not the same instance as
         # the original message
         self.assertIsNot(self.msg, x)
+
+    def test_binary_encode_message(self):
+        b = self.msg.encode()
+        self.assertIsInstance(b, bytes)
+        self.assertLess(len(b), len(self.msg.dumps()))
+
+    def test_decode_binary_encoded_message(self):
+        for msg_type in [Message.BEGIN, Message.STOP_TURN, Message.ATTACK,
+                         Message.STATUS, Message.LOST]:
+            msg = Message(msg_type, self.player, 'J10 \u2716')
+            self.assertEqual(Message.recreate(msg.encode()), msg)
+
+    def test_decode_json_encoded_bytes(self):
+        """JSON as it is received from Redis (i.e., bytes) is still
+        accepted.
+        """
+        x = Message.recreate(self.msg.dumps().encode('utf-8'))
+        self.assertEqual(self.msg, x)
+
+    def test_encode_unknown_type(self):
+        """Message types without a type code fall back to JSON.
+        """
+        msg = Message('unknown', self.player, self.data)
+        self.assertEqual(Message.recreate(msg.encode()), msg)
+
+    def test_decode_truncated_message(self):
+        with self.assertRaises(ValueError):
+            Message.recreate(self.msg.encode()[:3])
+
+    def test_decode_json_not_an_object(self):
+        """JSON that is not an object is no message.
+        """
+        for s in (b'[1,2]', b'5', b'"x"', b'{"type": "begin"}'):
+            with self.subTest(s=s), self.assertRaises(ValueError):
+                Message.recreate(s)
+
+    def test_pack_message(self):
+        self.assertEqual(self.msg.pack(), self.msg.encode())
+        try:
+            Message.use_format(Message.JSON)
+            self.assertEqual(self.msg.pack(), self.msg.dumps())
+        finally:
+            Message.use_format(Message.BINARY)
+
+        with self.assertRaises(ValueError):
+            Message.use_format('xml')
+
+    def test_sent_timestamp(self):
+        """The time at which a message was sent survives both formats
+        but does not make messages unequal.
+        """
+        msg = Message(Message.ATTACK, self.player, 'a1', 1234.5)
+        self.assertEqual(msg, Message(Message.ATTACK, self.player, 'a1'))
+
+        for s in (msg.encode(), msg.dumps()):
+            self.assertEqual(Message.recreate(s).sent, 1234.5)
+        self.assertIsNone(Message.recreate(self.msg.encode()).sent)
@@ -0,0 +1,45 @@
+import unittest
+import urllib.request
+import metrics
+from prometheus_client import generate_latest
+from prometheus_client.parser import text_string_to_metric_families
+
+
+class TestMetrics(unittest.TestCase):
+    def test_exposition(self):
+        """The metrics of a server are rendered in the text format under
+        the names the README documents, without creation times.
+        """
+        metrics.REJECTED_REQUESTS.labels('move').inc()
+        metrics.RESPONSE_QUEUE_DEPTH.observe(3)
+
+        text = generate_latest(metrics.REGISTRY).decode('utf-8')
+        self.assertIn('# TYPE battleship_rejected_requests_total counter\n',
+                      text)
+        self.assertIn('# TYPE battleship_active_streams gauge\n', text)
+        self.assertIn('battleship_response_queue_depth_bucket{le="5.0"}',
+                      text)
+        self.assertNotIn('_created', text)
+
+        types = {family.name: family.type
+                 for family in text_string_to_metric_families(text)}
+        self.assertEqual(types['battleship_rejected_requests'], 'counter')
+        self.assertEqual(types['battleship_publish_seconds'], 'histogram')
+
+    def test_http_server(self):
+        """The metrics can be scraped over HTTP.
+        """
+        metrics.MAX_STREAMS.set(3)
+        server, _ = metrics.start_http_server(0, 'localhost',
+                                              metrics.REGISTRY)
+        try:
+            port = server.server_address[1]
+            with urllib.request.urlopen(
+                    f'http://localhost:{port}/metrics') as response:
+                self.assertEqual(response.headers['Content-Type'],
+                                 metrics.CONTENT_TYPE)
+                self.assertIn(b'battleship_max_streams 3.0\n',
+                              response.read())
+        finally:
+            server.shutdown()
+            server.server_close()
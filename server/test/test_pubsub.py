@@ -0,0 +1,87 @@
+import asyncio
+import queue
+import redis
+import time
+import unittest
+import redis.asyncio as aioredis
+from redis.backoff import NoBackoff
+from redis.retry import Retry
+from message import Message
+from pubsub import AsyncPubSubDispatcher, PubSubDispatcher
+
+REDIS_HOST = 'localhost'
+
+# The clients do not retry by themselves, so the dispatchers have to
+# connect again
+NO_RETRY = Retry(NoBackoff(), 0)
+
+# Seconds to wait for a message after the connection was killed
+TIMEOUT = 5
+
+
+class TestPubSubDispatcher(unittest.TestCase):
+    """Please note that the tests in this suite only work if a Redis
+    host is available (see REDIS_HOST above).
+    """
+    def setUp(self):
+        self.r = redis.Redis(host=REDIS_HOST, db=1, retry=NO_RETRY)
+        self.dispatcher = PubSubDispatcher(self.r)
+        self.dispatcher.start()
+
+    def tearDown(self):
+        self.dispatcher.stop()
+        self.r.close()
+
+    def test_reconnect(self):
+        """Losing the connection to Redis does not stop the messages of
+        the subscribed channels.
+        """
+        received = queue.Queue()
+        self.assertTrue(self.dispatcher.subscribe('game', received.put))
+        self.r.client_kill_filter(_type='pubsub')
+
+        msg = Message(Message.BEGIN, 'Bob', '')
+        deadline = time.monotonic() + TIMEOUT
+        while time.monotonic() < deadline:
+            self.dispatcher.publish('game', msg)
+            try:
+                self.assertEqual(received.get(timeout=0.1), msg)
+                return
+            except queue.Empty:
+                pass
+        self.fail('No message after reconnecting')
+
+
+class TestAsyncPubSubDispatcher(unittest.IsolatedAsyncioTestCase):
+    """Please note that the tests in this suite only work if a Redis
+    host is available (see REDIS_HOST above).
+    """
+    async def asyncSetUp(self):
+        self.r = aioredis.Redis(host=REDIS_HOST, db=1, retry=NO_RETRY)
+        self.dispatcher = AsyncPubSubDispatcher(self.r)
+        await self.dispatcher.start()
+
+    async def asyncTearDown(self):
+        await self.dispatcher.stop()
+        await self.r.aclose()
+
+    async def test_reconnect(self):
+        """Losing the connection to Redis does not stop the messages of
+        the subscribed channels.
+        """
+        received = asyncio.Queue()
+        self.assertTrue(
+            await self.dispatcher.subscribe('game', received.put_nowait))
+        await self.r.client_kill_filter(_type='pubsub')
+
+        msg = Message(Message.BEGIN, 'Bob', '')
+        deadline = time.monotonic() + TIMEOUT
+        while time.monotonic() < deadline:
+            await self.dispatcher.publish('game', msg)
+            try:
+                received_msg = await asyncio.wait_for(received.get(), 0.1)
+                self.assertEqual(received_msg, msg)
+                return
+            except asyncio.TimeoutError:
+                pass
+        self.fail('No message after reconnecting')
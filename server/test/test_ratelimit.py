@@ -0,0 +1,137 @@
+import unittest
+from ratelimit import (MAX_DELAY, RateLimiter, StreamLimit, TokenBucket,
+                       peer_address)
+
+
+class Clock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+class Context:
+    def __init__(self, peer):
+        self.__peer = peer
+
+    def peer(self):
+        return self.__peer
+
+
+class TestTokenBucket(unittest.TestCase):
+    def test_take(self):
+        """A full bucket allows a burst; after that, requests are delayed
+        until the rate refills it, and refused once they would have to
+        wait too long.
+        """
+        clock = Clock()
+        bucket = TokenBucket(10, 3, clock)
+        for _ in range(3):
+            self.assertEqual(bucket.take(), 0)
+
+        for i in range(1, int(10 * MAX_DELAY) + 1):
+            self.assertAlmostEqual(bucket.take(), i / 10)
+        self.assertIsNone(bucket.take())
+
+        # Refused requests take nothing
+        clock.now = 0.1
+        self.assertAlmostEqual(bucket.take(), MAX_DELAY)
+
+    def test_refill(self):
+        """The bucket refills at its rate, up to the burst.
+        """
+        clock = Clock()
+        bucket = TokenBucket(10, 2, clock)
+        bucket.take()
+        bucket.take()
+        clock.now = 0.1
+        self.assertEqual(bucket.take(), 0)
+        self.assertAlmostEqual(bucket.take(), 0.1)
+
+        clock.now = 100
+        self.assertEqual(bucket.take(), 0)
+        self.assertEqual(bucket.take(), 0)
+        self.assertGreater(bucket.take(), 0)
+
+
+class TestStreamLimit(unittest.TestCase):
+    def test_refund(self):
+        """A request that the budget of the address refuses takes nothing
+        from the budget of the stream.
+        """
+        clock = Clock()
+        limit = StreamLimit(TokenBucket(0.1, 3, clock),
+                            TokenBucket(1, 1, clock))
+        self.assertEqual(limit.take(), 0)
+        self.assertEqual(limit.take(), 1)
+        for _ in range(3):
+            self.assertIsNone(limit.take())
+
+        # The stream still has the token it had before the refusals
+        clock.now = 2
+        self.assertEqual(limit.take(), 0)
+
+
+class TestRateLimiter(unittest.TestCase):
+    def test_streams(self):
+        """Every stream has a budget of its own.
+        """
+        limiter = RateLimiter(1, 1, clock=Clock())
+        alice = limiter.connect(Context('ipv4:10.0.0.1:1000'))
+        bob = limiter.connect(Context('ipv4:10.0.0.1:1001'))
+        self.assertEqual(alice.take(), 0)
+        self.assertEqual(bob.take(), 0)
+        self.assertEqual(alice.take(), 1)
+        self.assertIsNone(alice.take())
+        self.assertEqual(limiter.addresses, 0)
+
+    def test_addresses(self):
+        """The streams from the same source address share a budget, which
+        is kept until the last of them has ended.
+        """
+        limiter = RateLimiter(address_rate=1, address_burst=2, clock=Clock())
+        alice = limiter.connect(Context('ipv4:10.0.0.1:1000'))
+        bob = limiter.connect(Context('ipv4:10.0.0.1:1001'))
+        carol = limiter.connect(Context('ipv4:10.0.0.2:1000'))
+        self.assertEqual(limiter.addresses, 2)
+
+        self.assertEqual(alice.take(), 0)
+        self.assertEqual(bob.take(), 0)
+        self.assertEqual(alice.take(), 1)
+        self.assertIsNone(bob.take())
+        self.assertEqual(carol.take(), 0)
+
+        alice.close()
+        alice.close()
+        dave = limiter.connect(Context('ipv4:10.0.0.1:1002'))
+        self.assertIsNone(dave.take())
+        bob.close()
+        dave.close()
+        carol.close()
+        self.assertEqual(limiter.addresses, 0)
+
+    def test_no_limits(self):
+        """With rates of 0 there are no budgets.
+        """
+        limiter = RateLimiter()
+        stream = limiter.connect({})
+        for _ in range(1000):
+            self.assertEqual(stream.take(), 0)
+        stream.close()
+
+        with self.assertRaises(ValueError):
+            RateLimiter(-1)
+        with self.assertRaises(ValueError):
+            RateLimiter(1, 0)
+
+    def test_peer_address(self):
+        """The port is not part of the source address.
+        """
+        self.assertEqual(peer_address(Context('ipv4:10.0.0.1:52314')),
+                         'ipv4:10.0.0.1')
+        self.assertEqual(peer_address(Context('ipv6:[::1]:52314')),
+                         'ipv6:[::1]')
+        self.assertEqual(peer_address(Context('unix:/tmp/socket')),
+                         'unix:/tmp/socket')
+        self.assertEqual(peer_address({}), '')
@@ -0,0 +1,90 @@
+import unittest
+from battleships_pb2 import GameEvent
+from message import Message
+from router import LocalRouter
+from watch import GameFeed
+
+
+class Dispatcher:
+    def __init__(self):
+        self.channels = {}
+
+    def handlers(self, channel):
+        return list(self.channels.get(channel, []))
+
+
+class TestLocalRouter(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = Dispatcher()
+        self.remote = []
+        self.router = LocalRouter(self.dispatcher, self.publish_remote)
+
+    def publish_remote(self, channel, message):
+        self.remote.append((channel, message))
+        return 1
+
+    def test_publish_remote(self):
+        """Messages go to the remote publisher if only one player of the
+        game is connected to this process.
+        """
+        received = []
+        self.dispatcher.channels['game'] = [received.append]
+
+        msg = Message(Message.BEGIN, 'Alice', '')
+        self.assertEqual(self.router.publish('game', msg), 1)
+        self.assertEqual(self.remote, [('game', msg)])
+        self.assertEqual(received, [])
+
+    def test_publish_local(self):
+        """Messages are delivered in memory if both players of the game
+        are connected to this process.
+        """
+        alice, bob = [], []
+        self.dispatcher.channels['game'] = [alice.append, bob.append]
+
+        msg = Message(Message.BEGIN, 'Alice', '')
+        self.assertEqual(self.router.publish('game', msg), 2)
+        self.assertEqual(self.remote, [])
+        self.assertEqual(alice, [msg])
+        self.assertEqual(bob, [msg])
+
+    def test_publish_watched(self):
+        """Feeds do not count as players, and messages of a game that is
+        watched on other servers go to the remote publisher.
+        """
+        alice, bob = [], []
+        feed = GameFeed('game')
+        self.dispatcher.channels['game'] = [alice.append, feed]
+        self.assertFalse(self.router.is_local('game'))
+
+        self.dispatcher.channels['game'].append(bob.append)
+        self.assertTrue(self.router.is_local('game'))
+        self.router.watch('game')
+        msg = Message(Message.BEGIN, 'Alice', '')
+        self.router.publish('game', msg)
+        self.assertEqual(self.remote, [('game', msg)])
+        self.assertEqual(alice, [])
+
+        self.router.forget('game')
+        self.router.publish('game', msg)
+        self.assertEqual(alice, [msg])
+        self.assertEqual(feed.events(0)[0].type, GameEvent.BEGIN)
+
+    def test_publish_local_order(self):
+        """Messages published by a handler are delivered after the
+        message that is being handled, to all handlers.
+        """
+        status = Message(Message.STATUS, 'Bob', '0')
+        stop_turn = Message(Message.STOP_TURN, 'Alice', '')
+        alice, bob = [], []
+
+        def handle_alice(message):
+            alice.append(message)
+            if message.type == Message.STATUS:
+                self.router.publish('game', stop_turn)
+
+        self.dispatcher.channels['game'] = [handle_alice, bob.append]
+
+        self.router.publish('game', status)
+        self.assertEqual(alice, [status, stop_turn])
+        self.assertEqual(bob, [status, stop_turn])
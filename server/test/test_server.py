@@ -1,3 +1,5 @@
+import threading
+import time
 import unittest
 import server
 
@@ -14,3 +16,46 @@ class TestServer(unittest.TestCase):
         """
         battleship = server.Battleship(REDIS_HOST, db=1)
         self.assertTrue(battleship.ping_redis())
+
+    def test_admission(self):
+        """The server admits streams up to its maximum and again once a
+        stream has ended.
+        """
+        battleship = server.Battleship(REDIS_HOST, db=1, max_streams=2)
+        try:
+            self.assertTrue(battleship.admit())
+            self.assertTrue(battleship.admit())
+            self.assertFalse(battleship.admit())
+            battleship.release()
+            self.assertTrue(battleship.admit())
+        finally:
+            battleship.close()
+
+    def test_idle_streams(self):
+        """Streams that wait for responses block on their queue: 1000 of
+        them use next to no CPU, and stopping them ends their responses
+        right away, after the responses that were queued before.
+        """
+        servers = [server._Server(None, None, None, None)
+                   for _ in range(1000)]
+        responses = [[] for _ in servers]
+        threads = [threading.Thread(target=r.extend, args=(s.get(),),
+                                    daemon=True)
+                   for s, r in zip(servers, responses)]
+        for t in threads:
+            t.start()
+        time.sleep(0.2)
+
+        cpu, start = time.process_time(), time.perf_counter()
+        time.sleep(1.0)
+        cpu = (time.process_time() - cpu) / (time.perf_counter() - start)
+        self.assertLess(cpu, 0.01)
+
+        for s in servers:
+            s.send('LOSE')
+            s.stop()
+            s.stop()
+        for t in threads:
+            t.join(1.0)
+            self.assertFalse(t.is_alive())
+        self.assertEqual(responses, [['LOSE']] * len(servers))
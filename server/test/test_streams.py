@@ -0,0 +1,135 @@
+import queue
+import redis
+import time
+import unittest
+from unittest import mock
+from message import Message
+from streams import MAXLEN, READERS_SUFFIX, STREAM_PREFIX, StreamDispatcher
+from watch import GameFeed
+
+REDIS_HOST = 'localhost'
+
+
+class TestStreamDispatcher(unittest.TestCase):
+    """Please note that the tests in this suite only work if a Redis
+    host is available (see REDIS_HOST above).
+    """
+    def setUp(self):
+        self.r = redis.Redis(host=REDIS_HOST, db=1)
+        self.r.delete(STREAM_PREFIX + 'game',
+                      STREAM_PREFIX + 'game' + READERS_SUFFIX)
+        # Two dispatchers stand in for two server processes
+        self.alice = StreamDispatcher(self.r)
+        self.bob = StreamDispatcher(self.r)
+        self.alice.start()
+        self.bob.start()
+
+    def tearDown(self):
+        self.alice.stop()
+        self.bob.stop()
+        self.r.delete(STREAM_PREFIX + 'game',
+                      STREAM_PREFIX + 'game' + READERS_SUFFIX)
+        self.r.close()
+
+    def test_publish(self):
+        """Every dispatcher that reads the stream of a game receives all
+        of its messages, in order.
+        """
+        alice, bob = queue.Queue(), queue.Queue()
+        self.assertTrue(self.alice.subscribe('game', alice.put))
+        self.assertTrue(self.bob.subscribe('game', bob.put))
+
+        begin = Message(Message.BEGIN, 'Bob', '')
+        attack = Message(Message.ATTACK, 'Alice', 'a1')
+        self.assertEqual(self.bob.publish('game', begin), 2)
+        self.assertEqual(self.alice.publish('game', attack), 2)
+
+        for q in (alice, bob):
+            self.assertEqual(q.get(timeout=5), begin)
+            self.assertEqual(q.get(timeout=5), attack)
+
+    def test_read_from_start(self):
+        """Messages that were added before a dispatcher subscribed are
+        not lost.
+        """
+        begin = Message(Message.BEGIN, 'Bob', '')
+        self.assertEqual(self.bob.publish('game', begin), 0)
+
+        alice = queue.Queue()
+        self.alice.subscribe('game', alice.put)
+        self.assertEqual(alice.get(timeout=5), begin)
+
+    def test_read_full_game(self):
+        """A stream keeps all messages of a game in which both players
+        attack every cell.
+        """
+        messages = [Message(Message.BEGIN, 'Bob', '')]
+        for i in range(2 * 100):
+            messages += [Message(Message.ATTACK, 'Alice', str(i)),
+                         Message(Message.STATUS, 'Bob', '0'),
+                         Message(Message.STOP_TURN, 'Alice', '')]
+        messages.append(Message(Message.LOST, 'Bob', ''))
+        self.assertLessEqual(len(messages), MAXLEN)
+        self.bob.publish_batch([('game', msg) for msg in messages])
+
+        alice = queue.Queue()
+        self.alice.subscribe('game', alice.put)
+        for msg in messages:
+            self.assertEqual(alice.get(timeout=5), msg)
+
+    def test_unsubscribe(self):
+        """A dispatcher no longer counts as a reader once its last
+        handler is gone.
+        """
+        handler = queue.Queue().put
+        self.alice.subscribe('game', handler)
+        self.alice.unsubscribe('game', handler)
+
+        msg = Message(Message.BEGIN, 'Bob', '')
+        self.assertEqual(self.bob.publish('game', msg), 0)
+        self.assertEqual(self.alice.handlers('game'), [])
+
+    def test_spectator(self):
+        """A dispatcher that reads a stream for a spectator only does not
+        count as a reader, as the spectator is no player.
+        """
+        feed = GameFeed('game')
+        self.alice.subscribe('game', feed)
+
+        msg = Message(Message.BEGIN, 'Bob', '')
+        self.assertEqual(self.bob.publish('game', msg), 0)
+
+        player = queue.Queue().put
+        self.alice.subscribe('game', player)
+        self.assertEqual(self.bob.publish('game', msg), 1)
+
+        self.alice.unsubscribe('game', player)
+        self.assertEqual(self.bob.publish('game', msg), 0)
+        self.assertEqual(self.alice.handlers('game'), [feed])
+        self.alice.unsubscribe('game', feed)
+
+    def test_dead_reader(self):
+        """A dispatcher whose heartbeat is overdue, e.g., because its
+        process died, no longer counts as a reader.
+        """
+        self.r.zadd(STREAM_PREFIX + 'game' + READERS_SUFFIX,
+                    {'dead': time.time() - 1})
+        self.alice.subscribe('game', queue.Queue().put)
+
+        msg = Message(Message.BEGIN, 'Bob', '')
+        self.assertEqual(self.bob.publish('game', msg), 1)
+
+    def test_heartbeat(self):
+        """A dispatcher keeps counting as a reader as long as it runs,
+        and stops counting once it is stopped.
+        """
+        with mock.patch('streams.READER_TTL', 0.3):
+            carol = StreamDispatcher(self.r)
+            carol.start()
+            carol.subscribe('game', queue.Queue().put)
+            time.sleep(0.6)
+
+            msg = Message(Message.BEGIN, 'Bob', '')
+            self.assertEqual(self.bob.publish('game', msg), 1)
+            carol.stop()
+            self.assertEqual(self.bob.publish('game', msg), 0)
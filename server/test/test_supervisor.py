@@ -0,0 +1,83 @@
+import time
+import types
+import unittest
+import metrics
+import supervisor
+from prometheus_client import CollectorRegistry, Counter, Histogram
+from prometheus_client import generate_latest
+
+
+def exit_worker(index, processes, ports):
+    """Server process that exits right away.
+    """
+
+
+def metrics_worker(index, processes, ports):
+    """Server process that only serves a counter of its index.
+    """
+    registry = CollectorRegistry()
+    Counter('test_total', 'Test', registry=registry).inc(index + 1)
+    server, _ = metrics.start_http_server(0, '127.0.0.1', registry)
+    ports.put((index, server.server_address[1]))
+    while True:
+        time.sleep(1)
+
+
+class TestSupervisor(unittest.TestCase):
+    def wait_for(self, predicate, timeout=10):
+        deadline = time.monotonic() + timeout
+        while not predicate():
+            self.assertLess(time.monotonic(), deadline)
+            time.sleep(0.05)
+
+    def test_aggregate(self):
+        """The samples of several processes are added up per name and
+        labels.
+        """
+        texts = []
+        for i in range(2):
+            registry = CollectorRegistry()
+            counter = Counter('test_total', 'Test', ['type'],
+                              registry=registry)
+            counter.labels('attack').inc(i + 1)
+            histogram = Histogram('test_seconds', 'Test', buckets=(0.1,),
+                                  registry=registry)
+            histogram.observe(0.05 * (i + 1))
+            texts.append(generate_latest(registry).decode('utf-8'))
+
+        total = types.SimpleNamespace(
+            collect=lambda: supervisor.aggregate(texts))
+        text = generate_latest(total).decode('utf-8')
+        self.assertEqual(text.count('# TYPE test_total counter'), 1)
+        self.assertIn('test_total{type="attack"} 3.0\n', text)
+        self.assertIn('test_seconds_bucket{le="0.1"} 2.0\n', text)
+        self.assertIn('test_seconds_count 2.0\n', text)
+        self.assertIn('test_seconds_sum 0.15', text)
+        self.assertEqual(supervisor.aggregate([]), [])
+
+    def test_restart(self):
+        """Processes that exit are restarted after the restart delay.
+        """
+        def restarts():
+            return supervisor.REGISTRY.get_sample_value(
+                'battleship_worker_restarts_total', {'worker': '0'}) or 0
+
+        before = restarts()
+        s = supervisor.Supervisor(1, exit_worker, restart_delay=0)
+        s.start()
+        try:
+            self.wait_for(lambda: s.check() == 1 and restarts() > before)
+        finally:
+            s.stop()
+
+    def test_collect(self):
+        """The metrics of all processes are served added up.
+        """
+        s = supervisor.Supervisor(2, metrics_worker)
+        s.start()
+        try:
+            self.wait_for(lambda: b'test_total 3.0\n' in generate_latest(s))
+            self.assertEqual(s.check(), 2)
+            self.assertIn(b'battleship_workers 2.0', generate_latest(s))
+        finally:
+            s.stop()
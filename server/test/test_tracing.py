@@ -0,0 +1,167 @@
+import asyncio
+import json
+import os
+import tempfile
+import unittest
+import tracing
+from aio_server import AsyncBattleship
+from battleships_pb2 import Attack, Request, Response, Status
+from message import Message
+
+REDIS_HOST = 'localhost'
+
+
+async def stream(q):
+    while True:
+        s = await q.get()
+        if s is None:
+            return
+        yield s
+
+
+async def read_incoming(responses, q):
+    async for response in responses:
+        await q.put(response)
+
+
+class Context:
+    def __init__(self, metadata):
+        self.metadata = metadata
+
+    def invocation_metadata(self):
+        return self.metadata
+
+
+class TestTracer(unittest.TestCase):
+    def test_disabled(self):
+        """Without an exporter no spans and no contexts are created.
+        """
+        span = tracing.Tracer().start_span('hop')
+        self.assertIs(span, tracing.NOOP_SPAN)
+        self.assertIsNone(span.context)
+
+    def test_propagation(self):
+        """A span started from a context belongs to the same trace as
+        the span that created the context.
+        """
+        exporter = tracing.InMemoryExporter()
+        tracer = tracing.Tracer(exporter)
+
+        parent = tracer.start_span('parent')
+        child = tracer.start_span('child', parent.context, 10.0, x=1)
+        child.finish()
+        child.finish()
+        parent.finish()
+
+        self.assertEqual([s.name for s in exporter.spans],
+                         ['child', 'parent'])
+        self.assertEqual(child.trace_id, parent.trace_id)
+        self.assertEqual(child.parent_id, parent.span_id)
+        self.assertEqual(child.start, 10.0)
+        self.assertEqual(child.attributes, {'x': 1})
+        self.assertIsNone(parent.parent_id)
+
+    def test_from_metadata(self):
+        context = '00-' + 'a' * 32 + '-' + 'b' * 16 + '-01'
+        self.assertEqual(tracing.from_metadata(
+            Context([('traceparent', context)])), context)
+        self.assertIsNone(tracing.from_metadata(Context([])))
+        self.assertIsNone(tracing.from_metadata({}))
+        self.assertIsNone(tracing.parse('garbage'))
+
+    def test_file_exporter(self):
+        with tempfile.TemporaryDirectory() as d:
+            path = os.path.join(d, 'spans.jsonl')
+            exporter = tracing.FileExporter(path)
+            tracing.Tracer(exporter).start_span('hop', player='p').finish()
+            exporter.close()
+
+            with open(path) as f:
+                span = json.loads(f.readline())
+        self.assertEqual(span['name'], 'hop')
+        self.assertEqual(span['attributes'], {'player': 'p'})
+        self.assertGreaterEqual(span['duration_ms'], 0)
+
+    def test_message_trace(self):
+        """The trace context survives both wire formats.
+        """
+        context = '00-' + 'a' * 32 + '-' + 'b' * 16 + '-01'
+        msg = Message(Message.ATTACK, 'Alice', 'a1', trace=context)
+        for s in (msg.encode(), msg.dumps()):
+            self.assertEqual(Message.recreate(s).trace, context)
+
+
+class TestGameTracing(unittest.IsolatedAsyncioTestCase):
+    """Please note that the tests in this suite only work if a Redis
+    host is available (see REDIS_HOST above).
+    """
+    async def asyncSetUp(self):
+        self.exporter = tracing.configure(tracing.InMemoryExporter())
+        self.alice_server = AsyncBattleship(REDIS_HOST, db=1)
+        self.bob_server = AsyncBattleship(REDIS_HOST, db=1)
+        await self.alice_server.start()
+        await self.bob_server.start()
+
+    async def asyncTearDown(self):
+        await self.alice_server.close()
+        await self.bob_server.close()
+        tracing.configure(None)
+
+    def connect(self, battleship, context):
+        requests, responses = asyncio.Queue(), asyncio.Queue()
+        task = asyncio.create_task(read_incoming(
+            battleship.Game(stream(requests), Context(context)), responses))
+        return requests, responses, task
+
+    async def expect(self, q, response):
+        self.assertEqual(await asyncio.wait_for(q.get(), 5), response)
+
+    async def test_move(self):
+        """A move played between two servers is traced from the attack
+        to the turn handoff, in the trace of the attacking client.
+        """
+        client = tracing.Tracer(self.exporter).start_span('client')
+        alice, alice_in, alice_task = self.connect(
+            self.alice_server, [('traceparent', client.context)])
+        bob, bob_in, bob_task = self.connect(self.bob_server, [])
+
+        await alice.put(Request(join=Request.Player(id='Alice')))
+        await asyncio.sleep(0.2)
+        await bob.put(Request(join=Request.Player(id='Bob')))
+        begin = await asyncio.wait_for(alice_in.get(), 5)
+        self.assertEqual(begin.turn, Response.State.BEGIN)
+        await self.expect(alice_in, Response(turn=Response.State.START_TURN))
+
+        await alice.put(Request(move=Attack(vector='a1')))
+        await self.expect(bob_in, begin)
+        await self.expect(bob_in, Response(turn=Response.State.STOP_TURN))
+        await self.expect(bob_in, Response(move=Attack(vector='a1')))
+        await bob.put(Request(report=Status(state=Status.State.MISS)))
+        await self.expect(alice_in, Response(report=Status(
+            state=Status.State.MISS)))
+        await self.expect(alice_in, Response(turn=Response.State.STOP_TURN))
+        await self.expect(bob_in, Response(turn=Response.State.START_TURN))
+
+        await bob.put(None)
+        await alice.put(None)
+        await asyncio.wait_for(asyncio.gather(alice_task, bob_task), 5)
+
+        spans = {}
+        for span in self.exporter.spans:
+            if span.trace_id == client.trace_id:
+                spans.setdefault(span.name, []).append(span)
+
+        game = spans['game'][0]
+        move = spans['grpc.move'][0]
+        attack = spans['pubsub.attack'][0]
+        report = spans['client.report'][0]
+        status = spans['pubsub.status'][0]
+        self.assertEqual(game.parent_id, client.span_id)
+        self.assertEqual(move.parent_id, game.span_id)
+        self.assertEqual(attack.parent_id, move.span_id)
+        self.assertEqual(report.parent_id, attack.span_id)
+        self.assertEqual(status.parent_id, report.span_id)
+        self.assertEqual(
+            {s.parent_id for s in spans['pubsub.stop_turn']},
+            {status.span_id})
+        self.assertEqual(len(spans['pubsub.stop_turn']), 2)
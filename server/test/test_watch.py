@@ -0,0 +1,175 @@
+import asyncio
+import threading
+import unittest
+import metrics
+from battleships_pb2 import GameEvent, Shot, Status
+from memory import MemoryDispatcher
+from message import Message
+from router import LocalRouter, players
+from watch import AsyncGameFeed, GameFeed, Spectators
+
+MISS = Status.State.MISS
+HIT = Status.State.HIT
+DEFEAT = Status.State.DEFEAT
+
+# Messages of a short game, in order, and the events a viewer gets
+MESSAGES = [
+    Message(Message.BEGIN, 'Bob', ''),
+    Message(Message.STOP_TURN, 'Bob', ''),
+    Message(Message.ATTACK, 'Alice', 'a1'),
+    Message(Message.STATUS, 'Bob', str(MISS)),
+    Message(Message.STOP_TURN, 'Alice', ''),
+    Message(Message.ATTACK, 'Bob', 'b2'),
+    Message(Message.STATUS, 'Alice', str(HIT)),
+    Message(Message.STOP_TURN, 'Bob', ''),
+    Message(Message.ATTACK, 'Alice', 'c3'),
+    Message(Message.LOST, 'Bob', ''),
+]
+EVENTS = [
+    GameEvent(type=GameEvent.BEGIN, player='Bob'),
+    GameEvent(type=GameEvent.STOP_TURN, player='Bob'),
+    GameEvent(type=GameEvent.ATTACK, player='Alice', vector='a1'),
+    GameEvent(type=GameEvent.REPORT, player='Bob', vector='a1', state=MISS),
+    GameEvent(type=GameEvent.STOP_TURN, player='Alice'),
+    GameEvent(type=GameEvent.ATTACK, player='Bob', vector='b2'),
+    GameEvent(type=GameEvent.REPORT, player='Alice', vector='b2', state=HIT),
+    GameEvent(type=GameEvent.STOP_TURN, player='Bob'),
+    GameEvent(type=GameEvent.ATTACK, player='Alice', vector='c3'),
+    GameEvent(type=GameEvent.END, player='Bob', vector='c3', state=DEFEAT),
+]
+for number, event in enumerate(EVENTS, 1):
+    event.sequence = number
+
+
+class TestGameFeed(unittest.TestCase):
+    def test_events(self):
+        """The messages of a game become numbered events, which every
+        viewer reads from the point it has got to.
+        """
+        feed = GameFeed('game')
+        self.assertEqual(feed.events(0), [])
+        for message in MESSAGES:
+            feed(message)
+
+        self.assertEqual(feed.events(0), EVENTS)
+        self.assertEqual(feed.events(7), EVENTS[7:])
+        self.assertEqual(feed.events(len(EVENTS)), [])
+
+    def test_snapshot(self):
+        """A viewer that has fallen behind the buffer gets a snapshot of
+        the game in place of the events it missed.
+        """
+        feed = GameFeed('game', size=3)
+        for message in MESSAGES[:7]:
+            feed(message)
+        skipped = metrics.REGISTRY.get_sample_value(
+            'battleship_watch_skipped_events_total')
+
+        snapshot = GameEvent(
+            type=GameEvent.SNAPSHOT, sequence=7, player='Bob',
+            shots=[Shot(player='Alice', vector='a1', state=MISS),
+                   Shot(player='Bob', vector='b2', state=HIT)])
+        self.assertEqual(feed.events(2), [snapshot])
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_watch_skipped_events_total'), skipped + 5)
+        self.assertEqual(feed.events(4), EVENTS[4:7])
+
+        # A new viewer is not counted as slow; the pending attack and
+        # the end of the game are part of the snapshot
+        feed(MESSAGES[7])
+        feed(MESSAGES[8])
+        snapshot.sequence = 9
+        snapshot.player = 'Alice'
+        snapshot.vector = 'c3'
+        self.assertEqual(feed.events(0), [snapshot])
+        feed(MESSAGES[9])
+        self.assertEqual(feed.events(5)[-1], EVENTS[-1])
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_watch_skipped_events_total'), skipped + 10)
+
+    def test_read(self):
+        """Reading waits for the next event, until the feed is closed,
+        the viewer is gone or the timeout has passed.
+        """
+        feed = GameFeed('game')
+        read = []
+        reader = threading.Thread(target=lambda: read.append(feed.read(0)))
+        reader.start()
+        feed(MESSAGES[0])
+        reader.join(5)
+        self.assertEqual(read, [EVENTS[:1]])
+
+        active = threading.Event()
+        active.set()
+        reader = threading.Thread(
+            target=lambda: read.append(feed.read(1, active.is_set)))
+        reader.start()
+        active.clear()
+        feed.changed()
+        reader.join(5)
+        self.assertEqual(read[-1], [])
+
+        self.assertIsNone(feed.read(1, timeout=0.01))
+        feed.close()
+        self.assertEqual(feed.read(1), [])
+
+    def test_read_async(self):
+        """Reading on the event loop waits for the next event, for at
+        most the timeout.
+        """
+        async def read():
+            feed = AsyncGameFeed('game')
+            reader = asyncio.create_task(feed.read(0, 5))
+            await asyncio.sleep(0)
+            feed(MESSAGES[0])
+            events = await reader
+            return events, await feed.read(1, 0.01)
+
+        self.assertEqual(asyncio.run(read()), (EVENTS[:1], None))
+
+
+class TestSpectators(unittest.TestCase):
+    def test_watch(self):
+        """The viewers of a game share a single subscription, which ends
+        with the last of them. Feeds do not count as players.
+        """
+        dispatcher = MemoryDispatcher()
+        remote = []
+        router = LocalRouter(dispatcher, lambda *args: remote.append(args))
+        spectators = Spectators(dispatcher, router)
+        watchers = metrics.REGISTRY.get_sample_value('battleship_watchers')
+
+        received = []
+        dispatcher.subscribe('game', received.append)
+        first = spectators.watch('game')
+        second = spectators.watch('game')
+        self.assertIs(first, second)
+        self.assertEqual(dispatcher.handlers('game'), [received.append, first])
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_watchers'), watchers + 2)
+
+        # The game is not local, so the servers of its players are told
+        # about the spectators, once
+        watch = Message(Message.WATCH, '', '')
+        self.assertEqual(received, [watch])
+        self.assertEqual(players(dispatcher.handlers('game')), 1)
+        self.assertEqual(dispatcher.publish('game', MESSAGES[0]), 1)
+        self.assertEqual(received, [watch, MESSAGES[0]])
+        self.assertEqual(first.events(0), EVENTS[:1])
+
+        spectators.unwatch(first)
+        self.assertEqual(len(dispatcher.handlers('game')), 2)
+        spectators.unwatch(second)
+        self.assertEqual(dispatcher.handlers('game'), [received.append])
+        self.assertEqual(metrics.REGISTRY.get_sample_value(
+            'battleship_watchers'), watchers)
+
+        # Both players are here: nobody needs to be told
+        dispatcher.subscribe('game', received.append)
+        third = spectators.watch('game')
+        self.assertIsNot(third, first)
+        self.assertEqual(len(received), 2)
+        spectators.close()
+        self.assertTrue(third.closed)
+        spectators.unwatch(third)
+        self.assertEqual(remote, [])
@@ -0,0 +1,98 @@
+import asyncio
+import threading
+import unittest
+from message import Message
+from writer import AsyncPublishWriter, PublishWriter
+
+
+class Dispatcher:
+    def __init__(self):
+        self.batches = []
+        self.released = threading.Event()
+
+    def publish_batch(self, items):
+        self.released.wait(5)
+        self.batches.append(items)
+
+
+class AsyncDispatcher:
+    def __init__(self):
+        self.batches = []
+
+    async def publish_batch(self, items):
+        self.batches.append(items)
+
+
+def messages(n):
+    return [('game', Message(Message.ATTACK, 'Alice', f'a{i}'))
+            for i in range(n)]
+
+
+class TestPublishWriter(unittest.TestCase):
+    def setUp(self):
+        self.dispatcher = Dispatcher()
+
+    def test_batch(self):
+        """Messages that are queued while a batch is being sent go out
+        together, in order and in batches of at most the batch size.
+        """
+        writer = PublishWriter(self.dispatcher, interval=0, batch=3)
+        writer.start()
+
+        items = messages(6)
+        for item in items:
+            writer.publish(*item)
+        self.dispatcher.released.set()
+        writer.stop()
+
+        self.assertEqual(sum(self.dispatcher.batches, []), items)
+        self.assertTrue(all(len(batch) <= 3
+                            for batch in self.dispatcher.batches))
+        self.assertLess(len(self.dispatcher.batches), len(items))
+
+    def test_interval(self):
+        """A batch that is not full waits for more messages within the
+        flush interval.
+        """
+        self.dispatcher.released.set()
+        writer = PublishWriter(self.dispatcher, interval=5, batch=4)
+        writer.start()
+
+        items = messages(4)
+        for item in items:
+            writer.publish(*item)
+        writer.stop()
+
+        self.assertEqual(self.dispatcher.batches, [items])
+
+    def test_stop(self):
+        """Stopping the writer sends the messages that are still queued
+        without waiting for the flush interval.
+        """
+        self.dispatcher.released.set()
+        writer = PublishWriter(self.dispatcher, interval=60, batch=100)
+        writer.start()
+
+        items = messages(2)
+        for item in items:
+            writer.publish(*item)
+        writer.stop(timeout=5)
+
+        self.assertEqual(self.dispatcher.batches, [items])
+
+
+class TestAsyncPublishWriter(unittest.IsolatedAsyncioTestCase):
+    async def test_batch(self):
+        """Messages that are queued while the task is busy go out in a
+        single batch, in order.
+        """
+        dispatcher = AsyncDispatcher()
+        writer = AsyncPublishWriter(dispatcher, interval=5, batch=3)
+        await writer.start()
+
+        items = messages(5)
+        for item in items:
+            writer.publish(*item)
+        await writer.stop(timeout=5)
+
+        self.assertEqual(dispatcher.batches, [items[:3], items[3:]])